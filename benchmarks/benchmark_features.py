@@ -0,0 +1,98 @@
+"""
+Benchmark the single-pass lag/rolling feature engine against the original
+groupby/apply implementation from preprocess_data.py.
+
+The new engine runs on the full synthetic weekly frame (1M series by default).
+The legacy implementation costs a Python-level call per series, so it is timed
+on a subset of series and extrapolated linearly to the full size.
+
+Usage:
+    python benchmarks/benchmark_features.py --series 1000000 --weeks 12
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.feature_engineering import add_lag_rolling_features
+
+
+def make_weekly_frame(n_series, n_weeks, n_stores=2000, seed=0):
+    """Synthetic long weekly frame with n_series product-store series of n_weeks each"""
+    rng = np.random.default_rng(seed)
+    n_stores = min(n_stores, n_series)
+    n_products = -(-n_series // n_stores)
+    series = np.repeat(np.arange(n_series), n_weeks)
+    weeks = pd.date_range('2022-01-03', periods=n_weeks, freq='W-MON')
+
+    frame = pd.DataFrame({
+        'Product_ID': pd.Categorical.from_codes(series // n_stores,
+                                                categories=[f'P{i:06d}' for i in range(n_products)]),
+        'Store_ID': pd.Categorical.from_codes(series % n_stores,
+                                              categories=[f'S{i:04d}' for i in range(n_stores)]),
+        'Week_Start': np.tile(weeks.values, n_series),
+        'Sales_Quantity': rng.poisson(50, size=n_series * n_weeks).astype(np.int64),
+    })
+    # Shuffle so both implementations have to sort
+    return frame.sample(frac=1.0, random_state=seed).reset_index(drop=True)
+
+
+def legacy_features(weekly_data):
+    """The original two-pass groupby/apply implementation"""
+    def create_lag_features(group, lags=[1, 2, 3, 4]):
+        for lag in lags:
+            group[f'Sales_Lag_{lag}'] = group['Sales_Quantity'].shift(lag)
+        return group
+
+    def create_rolling_features(group, windows=[2, 4, 8]):
+        for window in windows:
+            group[f'Sales_Rolling_{window}'] = group['Sales_Quantity'].shift(1).rolling(window=window, min_periods=1).mean()
+        return group
+
+    weekly_with_lags = weekly_data.sort_values(['Product_ID', 'Store_ID', 'Week_Start']).groupby(
+        ['Product_ID', 'Store_ID'], observed=True).apply(create_lag_features).reset_index(drop=True)
+    return weekly_with_lags.sort_values(['Product_ID', 'Store_ID', 'Week_Start']).groupby(
+        ['Product_ID', 'Store_ID'], observed=True).apply(create_rolling_features).reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--series', type=int, default=1_000_000, help="Number of product-store series")
+    parser.add_argument('--weeks', type=int, default=12, help="Weeks per series")
+    parser.add_argument('--legacy-series', type=int, default=2000,
+                        help="Series used to time the legacy implementation (0 to skip)")
+    args = parser.parse_args()
+
+    print(f"Building {args.series:,} series x {args.weeks} weeks...")
+    frame = make_weekly_frame(args.series, args.weeks)
+
+    start = time.perf_counter()
+    features = add_lag_rolling_features(frame)
+    engine_seconds = time.perf_counter() - start
+    print(f"Single-pass engine: {engine_seconds:.2f}s for {len(features):,} rows "
+          f"({args.series / engine_seconds:,.0f} series/s)")
+
+    if args.legacy_series:
+        n_subset = min(args.legacy_series, args.series)
+        subset = make_weekly_frame(n_subset, args.weeks)
+        start = time.perf_counter()
+        expected = legacy_features(subset)
+        legacy_seconds = time.perf_counter() - start
+        extrapolated = legacy_seconds * args.series / n_subset
+        print(f"Legacy groupby/apply: {legacy_seconds:.2f}s for {n_subset:,} series "
+              f"-> ~{extrapolated:,.0f}s extrapolated to {args.series:,} series")
+        print(f"Speed-up: ~{extrapolated / engine_seconds:,.0f}x")
+
+        actual = add_lag_rolling_features(subset)
+        columns = [col for col in expected.columns if col.startswith('Sales_')]
+        assert np.allclose(actual[columns].to_numpy(float), expected[columns].to_numpy(float), equal_nan=True)
+        print("Outputs match on the legacy subset.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Compare per-series Random Forests with one global model across all series.
+
+The global model is run with both multi-week strategies: recursive (one
+predict per week) and direct (one multi-output predict). All modes train on
+the processed train weeks, predict the test weeks and forecast the following
+weeks for every product-store series. The script reports total
+train+predict time and the test accuracy of each mode (median and mean of
+the per-series metrics).
+Run it from the project root after preprocessing:
+
+Usage:
+    python benchmarks/benchmark_global_model.py --weeks 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.forecast_model import forecast_all, forecast_global
+
+
+def summarize(name, metrics, stats):
+    print(f"{name:<12} {stats['series']:>6} series  {stats['seconds']:8.2f}s  "
+          f"{stats['series_per_second']:8.1f} series/s  "
+          f"median MAE {metrics['MAE'].median():7.2f}  median RMSE {metrics['RMSE'].median():7.2f}  "
+          f"mean MAE {metrics['MAE'].mean():7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weeks', type=int, default=4)
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes for the per-series mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        outputs = dict(output_path=None, metrics_path=None, verbose=False)
+        _, series_metrics, series_stats = forecast_all(n_weeks=args.weeks, n_workers=args.workers,
+                                                       registry_dir=tmp, **outputs)
+        _, global_metrics, global_stats = forecast_global(n_weeks=args.weeks, model_dir=tmp, **outputs)
+        _, direct_metrics, direct_stats = forecast_global(n_weeks=args.weeks, strategy='direct', model_dir=tmp,
+                                                          **outputs)
+
+    summarize('per-series', series_metrics, series_stats)
+    summarize('global', global_metrics, global_stats)
+    summarize('direct', direct_metrics, direct_stats)
+    for name, metrics, stats in [('global', global_metrics, global_stats), ('direct', direct_metrics, direct_stats)]:
+        print(f"{name}: speedup {series_stats['seconds'] / stats['seconds']:.1f}x, "
+              f"mean MAE change {(metrics['MAE'].mean() / series_metrics['MAE'].mean() - 1) * 100:+.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Compare plain ``pd.read_csv`` with the schema-driven loaders in src/data_loader.py.
+
+A synthetic raw sales CSV is generated into a temporary directory, then both
+approaches load it and run the product-store groupby used by preprocessing.
+Peak memory is measured with tracemalloc (NumPy and pandas buffers are traced).
+
+Usage:
+    python benchmarks/benchmark_loading.py --products 200 --stores 50 --days 365
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_generator import SalesDataGenerator
+from src.data_loader import load_sales_data
+from src.raw_data_writer import StreamingRawWriter
+
+
+def plain_load(path):
+    sales_data = pd.read_csv(path)
+    sales_data['Date'] = pd.to_datetime(sales_data['Date'])
+    return sales_data
+
+
+def measure(name, loader, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    sales_data = loader(path)
+    load_seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    sales_data.groupby(['Product_ID', 'Store_ID'], observed=True)['Sales_Quantity'].sum()
+    groupby_seconds = time.perf_counter() - start
+
+    frame_mb = sales_data.memory_usage(deep=True).sum() / 1e6
+    print(f"{name:<12} load {load_seconds:6.2f}s  peak {peak / 1e6:8.1f} MB  "
+          f"frame {frame_mb:8.1f} MB  groupby {groupby_seconds:6.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--stores', type=int, default=50)
+    parser.add_argument('--days', type=int, default=365)
+    args = parser.parse_args()
+
+    generator = SalesDataGenerator(n_products=args.products, n_stores=args.stores,
+                                   start_date='2022-01-01',
+                                   end_date=pd.Timestamp('2022-01-01') + pd.Timedelta(days=args.days - 1))
+    with tempfile.TemporaryDirectory() as tmp:
+        with StreamingRawWriter(tmp, columnar_format=None, sample_size=0) as writer:
+            for chunk in generator.iter_chunks():
+                writer.write(chunk)
+        print(f"{writer.rows_written:,} rows, {os.path.getsize(writer.csv_path) / 1e6:.1f} MB CSV")
+
+        measure('read_csv', plain_load, writer.csv_path)
+        measure('data_loader', load_sales_data, writer.csv_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare per-series, per-step recursive forecasting with the batched forecaster.
+
+A global model is trained on the processed sample data. The most recent
+sales histories are then tiled to ``--series`` series and forecast
+``--weeks`` ahead twice: once with one predict call per series and week
+(the old forecast_future_weeks pattern) and once with RecursiveForecaster,
+which makes one predict call per week for all series.
+
+Usage:
+    python benchmarks/benchmark_recursive_forecast.py --series 2000 --weeks 8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_loader import load_processed
+from src.global_model import GlobalForecaster
+from src.recursive_forecast import RecursiveForecaster, history_length, history_matrix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--series', type=int, default=2000)
+    parser.add_argument('--weeks', type=int, default=8)
+    args = parser.parse_args()
+
+    data = load_processed()
+    model = GlobalForecaster(max_iter=100).fit(data)
+    keys, history, last_weeks = history_matrix(data, history_length(model.features),
+                                               key_columns=model.id_features)
+    ids = np.column_stack([model._encode(keys[col], col) for col in model.id_features])
+
+    tiles = int(np.ceil(args.series / len(keys)))
+    history = np.tile(history, (tiles, 1))[:args.series]
+    last_weeks = np.tile(last_weeks, tiles)[:args.series]
+    ids = np.tile(ids, (tiles, 1))[:args.series]
+
+    start = time.perf_counter()
+    looped = np.empty((args.series, args.weeks))
+    for i in range(args.series):
+        forecaster = RecursiveForecaster(lambda X, i=i: model.model.predict(np.hstack([X, ids[i:i + 1]])),
+                                         model.features)
+        looped[i], _ = forecaster.forecast(history[i:i + 1], last_weeks[i:i + 1], args.weeks)
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    forecaster = RecursiveForecaster(lambda X: model.model.predict(np.hstack([X, ids])), model.features)
+    batched, _ = forecaster.forecast(history, last_weeks, args.weeks)
+    batch_seconds = time.perf_counter() - start
+
+    print(f"{args.series} series x {args.weeks} weeks")
+    print(f"per-series loop {loop_seconds:8.2f}s  ({args.series * args.weeks} predict calls)")
+    print(f"batched         {batch_seconds:8.2f}s  ({args.weeks} predict calls)")
+    print(f"speedup {loop_seconds / batch_seconds:.0f}x, max difference {np.abs(looped - batched).max():.2e}")
+
+
+if __name__ == "__main__":
+    main()
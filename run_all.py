@@ -5,7 +5,8 @@ This script will:
 1. Generate sample data
 2. Preprocess the data
 3. Train the forecasting model
-4. Generate the HTML report
+4. Materialize the forecasts of the registered models
+5. Generate the HTML report
 """
 
 import os
@@ -13,6 +14,9 @@ import subprocess
 import time
 import sys
 
+from src.generate_sample_data import main as generate_sample_data
+from src.preprocess_data import preprocess
+
 def run_script(script_name, description):
     """Run a Python script and display its output"""
     print(f"\n{'=' * 80}")
@@ -41,6 +45,24 @@ def run_script(script_name, description):
         print(e.stderr)
         return False
 
+def run_function(func, description, *args, **kwargs):
+    """Run a pipeline stage in-process and display its timing"""
+    print(f"\n{'=' * 80}")
+    print(f"Running: {description}")
+    print(f"{'=' * 80}\n")
+
+    start_time = time.time()
+
+    try:
+        func(*args, **kwargs)
+    except Exception as e:
+        print(f"Error in {description}: {e}")
+        return False
+
+    elapsed = time.time() - start_time
+    print(f"\nCompleted in {elapsed:.2f} seconds")
+    return True
+
 def main():
     """Run all components of the system"""
     # Ensure we're in the project root directory
@@ -54,11 +76,22 @@ def main():
     os.makedirs('images', exist_ok=True)
     os.makedirs('reports', exist_ok=True)
     
-    # Run each component
+    # Data generation and preprocessing run in-process through their Python APIs
+    in_process_steps = [
+        (generate_sample_data, 'Generating sample data', ([],), {}),
+        (preprocess, 'Preprocessing data', (), {'make_plots': True})
+    ]
+
+    for func, description, args, kwargs in in_process_steps:
+        success = run_function(func, description, *args, **kwargs)
+        if not success:
+            print(f"\nError in {description}. Stopping execution.")
+            return
+
+    # Run the remaining components as scripts
     steps = [
-        ('generate_sample_data.py', 'Generating sample data'),
-        ('preprocess_data.py', 'Preprocessing data'),
         ('forecast_model.py', 'Training forecasting model'),
+        ('forecast_store.py', 'Materializing forecasts'),
         ('generate_html_report.py', 'Generating HTML report')
     ]
     
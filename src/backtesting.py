@@ -0,0 +1,218 @@
+"""
+Rolling-origin backtesting over many cutoffs and all series.
+
+Each fold picks a cutoff week, fits a model per series on the weeks up to
+it, recursively forecasts the ``horizon`` weeks after it and compares them
+with the actual sales. Cutoffs step back from the end of the data, so the
+last fold ends at the most recent week.
+
+Features are never re-derived per fold: the lag and rolling features in the
+feature cache only look at earlier weeks, so a fold is just a row range of
+each series' memory-mapped slice. Folds are split into (fold, series chunk)
+tasks and run in a process pool whose workers open the cache once, like
+parallel_training.py.
+
+The results table has one row per fold and series with MAE, RMSE and MAPE.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+
+if __package__ in (None, ''):
+    # Allow running as `python src/backtesting.py` from the project root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.feature_cache import FeatureCache, load_feature_cache
+from src.feature_engineering import SERIES_KEYS
+from src.forecast_model import DEFAULT_RF_PARAMS, select_series
+from src.parallel_training import chunk_series, plan_workers
+from src.recursive_forecast import RecursiveForecaster, lag_columns, sales_history
+
+BACKTEST_PATH = 'data/processed/backtest_results.csv'
+# Series with fewer weeks before a cutoff are skipped in that fold
+MIN_TRAIN_WEEKS = 12
+
+_worker_state = {}
+
+
+def fit_random_forest(X, y, features, n_jobs=None, **params):
+    """Scaled Random Forest like forecast_series(); returns its predict function on raw features"""
+    scaler = StandardScaler().fit(X)
+    model = RandomForestRegressor(**{**DEFAULT_RF_PARAMS, **params}, n_jobs=n_jobs)
+    model.fit(scaler.transform(X), y)
+    return lambda X: model.predict(scaler.transform(X))
+
+
+def fit_naive(X, y, features, n_jobs=None):
+    """Last observed week's sales as the forecast for every week ahead"""
+    lag_1 = features.index('Sales_Lag_1')
+    return lambda X: X[:, lag_1]
+
+
+MODELS = {'random_forest': fit_random_forest, 'naive': fit_naive}
+
+
+def rolling_origins(weeks, n_folds=5, horizon=4, step=None):
+    """
+    Cutoff weeks of ``n_folds`` folds, oldest first.
+
+    The last cutoff leaves exactly ``horizon`` weeks after it and earlier
+    cutoffs are ``step`` weeks apart (``horizon`` by default, so the
+    evaluation windows don't overlap).
+    """
+    weeks = np.unique(np.asarray(weeks, dtype='datetime64[ns]'))
+    step = horizon if step is None else step
+    positions = len(weeks) - 1 - horizon - step * np.arange(n_folds)[::-1]
+    if positions[0] < MIN_TRAIN_WEEKS - 1:
+        raise ValueError(f"Not enough weeks for {n_folds} folds of {horizon} weeks every {step} weeks")
+    return pd.DatetimeIndex(weeks[positions])
+
+
+def backtest_series(feature_cache, product_id, store_id, cutoff, horizon=4, model='random_forest',
+                    n_jobs=None, **params):
+    """
+    Fit on one series' weeks up to ``cutoff`` and forecast the ``horizon`` weeks after it.
+
+    Returns (horizons, actual, predicted) for the forecast weeks that have
+    actual sales, or None when the series has too few weeks before the cutoff.
+    """
+    features = feature_cache.features
+    X, y, weeks = feature_cache.get(product_id, store_id)
+    n_train = np.searchsorted(weeks, np.datetime64(cutoff, 'ns'), side='right')
+    if n_train < MIN_TRAIN_WEEKS:
+        return None
+
+    predict_fn = MODELS[model](X[:n_train], y[:n_train], features, n_jobs=n_jobs, **params)
+    forecaster = RecursiveForecaster(predict_fn, features)
+    history = sales_history(y[:n_train], X[0, lag_columns(features)], forecaster.length)
+    predictions, _ = forecaster.forecast(history[None, :], weeks[n_train - 1:n_train], horizon)
+
+    # Match the forecast weeks with the observed weeks after the last training week
+    ahead = (weeks[n_train:] - weeks[n_train - 1]) // np.timedelta64(7, 'D')
+    observed = ahead <= horizon
+    horizons = ahead[observed].astype(np.int64)
+    return horizons, y[n_train:][observed].astype(np.float64), predictions[0, horizons - 1]
+
+
+def run_fold(feature_cache, fold, cutoff, pairs, horizon, model, params, n_jobs=None):
+    """Long table of (Fold, series, Horizon, Actual, Predicted) for one fold and chunk of series"""
+    rows = []
+    for product_id, store_id in pairs:
+        result = backtest_series(feature_cache, product_id, store_id, cutoff, horizon, model, n_jobs, **params)
+        if result is not None:
+            horizons, actual, predicted = result
+            rows.append(pd.DataFrame({'Fold': fold, 'Product_ID': product_id, 'Store_ID': store_id,
+                                      'Horizon': horizons, 'Actual': actual, 'Predicted': predicted}))
+    return pd.concat(rows, ignore_index=True) if rows else None
+
+
+def init_fold_worker(cache_dir):
+    """Process-pool initializer: open the feature cache once per worker"""
+    _worker_state['cache'] = FeatureCache(cache_dir).open()
+
+
+def run_fold_task(fold, cutoff, pairs, horizon, model, params, n_jobs):
+    """run_fold() on the worker's feature cache (see init_fold_worker())"""
+    return run_fold(_worker_state['cache'], fold, cutoff, pairs, horizon, model, params, n_jobs)
+
+
+def fold_metrics(predictions, cutoffs, model):
+    """Per-fold, per-series Weeks, MAE, RMSE and MAPE of the backtest predictions"""
+    errors = predictions.assign(abs_error=(predictions['Actual'] - predictions['Predicted']).abs())
+    errors['sq_error'] = errors['abs_error'] ** 2
+    # Weeks with zero actual sales make MAPE infinite, as in evaluate()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        errors['pct_error'] = errors['abs_error'] / errors['Actual'].abs() * 100
+    metrics = errors.groupby(['Fold'] + SERIES_KEYS, sort=True).agg(
+        Weeks=('abs_error', 'size'), MAE=('abs_error', 'mean'), RMSE=('sq_error', 'mean'),
+        MAPE=('pct_error', 'mean')).reset_index()
+    metrics['RMSE'] = np.sqrt(metrics['RMSE'])
+    metrics.insert(0, 'Model', model)
+    metrics.insert(2, 'Cutoff', cutoffs[metrics['Fold'].to_numpy()])
+    return metrics.astype({'Fold': 'int16', 'Weeks': 'int16',
+                           'MAE': 'float32', 'RMSE': 'float32', 'MAPE': 'float32'})
+
+
+def backtest(products=None, stores=None, model='random_forest', n_folds=5, horizon=4, step=None, n_workers=1,
+             output_path=BACKTEST_PATH, verbose=True, **params):
+    """
+    Rolling-origin backtest of ``model`` over every selected series.
+
+    Args:
+        products, stores: only backtest these product / store IDs (all when None)
+        model: name in MODELS
+        n_folds, horizon, step: see rolling_origins()
+        n_workers: run folds in a process pool with this many workers (-1 for one per core);
+            1 runs in-process
+        output_path: results CSV (skipped when None)
+        params: passed to the model's fit function
+
+    Returns:
+        (results, stats) where ``results`` has one row per fold and series
+    """
+    if model not in MODELS:
+        raise ValueError(f"model must be one of {sorted(MODELS)}")
+    log = print if verbose else (lambda *args, **kwargs: None)
+    feature_cache = load_feature_cache()
+    pairs = select_series(feature_cache.keys(), products, stores)
+    if not pairs:
+        raise ValueError("No product-store series match the given filters")
+    cutoffs = rolling_origins(feature_cache.week_start, n_folds, horizon, step)
+
+    log(f"Backtesting {model} on {len(pairs)} series over {n_folds} folds "
+        f"({cutoffs[0]:%Y-%m-%d} to {cutoffs[-1]:%Y-%m-%d})...")
+    start = time.perf_counter()
+    workers, n_jobs = plan_workers(n_workers, len(pairs) * n_folds)
+    tasks = [(fold, cutoff, chunk) for fold, cutoff in enumerate(cutoffs)
+             for _, chunk in chunk_series(pairs, workers)]
+    if n_workers == 1:
+        parts = [run_fold(feature_cache, fold, cutoff, chunk, horizon, model, params)
+                 for fold, cutoff, chunk in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_fold_worker,
+                                 initargs=(feature_cache.cache_dir,)) as pool:
+            futures = [pool.submit(run_fold_task, fold, cutoff, chunk, horizon, model, params, n_jobs)
+                       for fold, cutoff, chunk in tasks]
+            parts = [future.result() for future in as_completed(futures)]
+
+    results = fold_metrics(pd.concat([part for part in parts if part is not None], ignore_index=True),
+                           cutoffs, model)
+    elapsed = time.perf_counter() - start
+    if output_path is not None:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        results.to_csv(output_path, index=False, float_format='%.4f')
+
+    stats = {'folds': n_folds, 'series': len(pairs), 'fits': len(results), 'seconds': elapsed}
+    log(results.groupby('Cutoff')[['MAE', 'RMSE']].mean().astype(np.float64).round(3).to_string())
+    log(f"Backtested {stats['fits']} fold-series fits in {elapsed:.2f}s")
+    return results, stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the forecasting model")
+    parser.add_argument('--products', nargs='+', help="Only backtest these product IDs")
+    parser.add_argument('--stores', nargs='+', help="Only backtest these store IDs")
+    parser.add_argument('--model', choices=sorted(MODELS), default='random_forest')
+    parser.add_argument('--folds', type=int, default=5, help="Number of cutoffs")
+    parser.add_argument('--horizon', type=int, default=4, help="Weeks forecast after each cutoff")
+    parser.add_argument('--step', type=int, help="Weeks between cutoffs (default: the horizon)")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes (-1 for one per CPU core)")
+    parser.add_argument('--output', default=BACKTEST_PATH, help="Results CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    backtest(args.products, args.stores, args.model, args.folds, args.horizon, args.step, args.workers,
+             args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Cheap baseline forecasters for low-volume series.
+
+All baselines work on the weekly sales matrix (one row per series, weeks in
+columns, NaN-padded on the left for shorter series) and forecast every
+series at once with array operations:
+
+- seasonal naive: the sales of the same week one season (52 weeks) earlier,
+  or the last week when the series is shorter than a season,
+- moving average: the mean of the last ``window`` weeks,
+- simple exponential smoothing: the smoothed level in closed form, a
+  weighted sum with weights alpha * (1 - alpha)^k, without a per-week loop.
+
+Each series gets the baseline with the lowest MAE on its last ``holdout``
+weeks (forecast_baselines()), or one picked elsewhere (forecast_chosen()). route_by_volume() splits the catalog so that only high-volume series
+go to the per-series Random Forest in forecast_model.py.
+"""
+import numpy as np
+
+from src.recursive_forecast import history_matrix, lag_columns
+
+SEASON_WEEKS = 52
+MA_WINDOW = 4
+SES_ALPHA = 0.3
+HOLDOUT_WEEKS = 8
+# Share of series (by recent average weekly sales) below which the baselines are used
+VOLUME_QUANTILE = 0.8
+VOLUME_WEEKS = 13
+
+
+def sales_matrix(data):
+    """
+    Weekly sales of every series in ``data`` as one matrix.
+
+    Returns (keys, sales, last_weeks) like history_matrix(), with as many
+    columns as the longest series has weeks (including the weeks before its
+    first row that only its lag features know).
+    """
+    length = data['Week_Start'].nunique() + len(lag_columns(list(data.columns)))
+    return history_matrix(data, length)
+
+
+def _last_value(sales):
+    """Most recent non-missing value of each row"""
+    observed = ~np.isnan(sales)
+    last = sales.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+    return sales[np.arange(len(sales)), last]
+
+
+def seasonal_naive(sales, n_weeks, season=SEASON_WEEKS):
+    """Same week one season earlier; the last week for series shorter than a season"""
+    if sales.shape[1] < season:
+        return np.repeat(_last_value(sales)[:, None], n_weeks, axis=1)
+    # Forecast week h repeats the week one season before it (cycling for horizons beyond a season)
+    columns = sales.shape[1] - season + np.arange(n_weeks) % season
+    forecast = sales[:, columns]
+    missing = np.isnan(forecast)
+    forecast[missing] = np.broadcast_to(_last_value(sales)[:, None], forecast.shape)[missing]
+    return forecast
+
+
+def moving_average(sales, n_weeks, window=MA_WINDOW):
+    """Mean of the last ``window`` observed weeks"""
+    recent = sales[:, -window:]
+    mean = np.nansum(recent, axis=1) / np.maximum((~np.isnan(recent)).sum(axis=1), 1)
+    return np.repeat(mean[:, None], n_weeks, axis=1)
+
+
+def exponential_smoothing(sales, n_weeks, alpha=SES_ALPHA):
+    """
+    Simple exponential smoothing level, flat over the horizon.
+
+    Starting from the first observed week, the recursion
+    level = alpha * y + (1 - alpha) * level unrolls to a weighted sum:
+    weight alpha * (1 - alpha)^k for the week k weeks back and
+    (1 - alpha)^k for the first observed week. Missing weeks get no weight.
+    """
+    observed = ~np.isnan(sales)
+    n_columns = sales.shape[1]
+    first = np.argmax(observed, axis=1)
+    decay = (1 - alpha) ** np.arange(n_columns - 1, -1, -1, dtype=np.float64)
+    weights = np.broadcast_to(alpha * decay, sales.shape).copy()
+    rows = np.arange(len(sales))
+    weights[rows, first] = decay[first]
+    weights[np.arange(n_columns) < first[:, None]] = 0
+    weights[~observed] = 0
+    level = np.nansum(weights * sales, axis=1) / np.maximum(weights.sum(axis=1), np.finfo(float).tiny)
+    return np.repeat(level[:, None], n_weeks, axis=1)
+
+
+BASELINES = {
+    'seasonal_naive': seasonal_naive,
+    'moving_average': moving_average,
+    'exponential_smoothing': exponential_smoothing,
+}
+
+
+def holdout_errors(sales, holdout=HOLDOUT_WEEKS, methods=BASELINES):
+    """
+    MAE of each baseline on the last ``holdout`` weeks of every series.
+
+    Returns (errors, predictions): errors has one column per method and
+    predictions one (n_series, holdout) array per method.
+    """
+    history, actual = sales[:, :-holdout], sales[:, -holdout:]
+    predictions = {name: method(history, holdout) for name, method in methods.items()}
+    observed = ~np.isnan(actual)
+    errors = np.column_stack([
+        np.nansum(np.abs(actual - predicted), axis=1) / np.maximum(observed.sum(axis=1), 1)
+        for predicted in predictions.values()])
+    return errors, predictions
+
+
+def forecast_baselines(sales, n_weeks, holdout=HOLDOUT_WEEKS, methods=BASELINES):
+    """
+    Forecast every series with the baseline that did best on its holdout weeks.
+
+    Returns (predictions, chosen, holdout_predictions): the forecast after
+    the last week, the chosen method name per series and that method's
+    predictions of the holdout weeks.
+    """
+    errors, holdout_predictions = holdout_errors(sales, holdout, methods)
+    best = np.argmin(errors, axis=1)
+    backtests = np.stack(list(holdout_predictions.values()), axis=1)
+    chosen = np.array(list(methods))[best]
+    return forecast_chosen(sales, n_weeks, chosen, methods), chosen, backtests[np.arange(len(sales)), best]
+
+
+def forecast_chosen(sales, n_weeks, chosen, methods=BASELINES):
+    """Forecast every series with its own baseline, ``chosen`` naming the method of each series"""
+    forecasts = np.stack([method(sales, n_weeks) for method in methods.values()], axis=1)
+    best = np.argmax(np.asarray(chosen)[:, None] == np.array(list(methods)), axis=1)
+    return forecasts[np.arange(len(sales)), best]
+
+
+def route_by_volume(sales, quantile=VOLUME_QUANTILE, recent_weeks=VOLUME_WEEKS, min_volume=None):
+    """
+    True for the high-volume series that get a Random Forest.
+
+    A series is high-volume when its average weekly sales over the last
+    ``recent_weeks`` reach ``min_volume``, or by default the ``quantile``
+    of that average across the series.
+    """
+    recent = sales[:, -recent_weeks:]
+    volume = np.nansum(recent, axis=1) / np.maximum((~np.isnan(recent)).sum(axis=1), 1)
+    threshold = np.quantile(volume, quantile) if min_volume is None else min_volume
+    return volume >= threshold
+
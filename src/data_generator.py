@@ -0,0 +1,161 @@
+"""
+Vectorized synthetic sales data generator.
+
+Builds the same demand model as the original row-by-row loop in
+generate_sample_data.py (seasonal sine curve, product and store scale factors,
+weekend and holiday uplifts, Gaussian noise) but evaluates it with broadcast
+NumPy arrays over date x product x store blocks. Chunks are yielded one at a
+time, so arbitrarily large datasets can be produced at constant memory.
+"""
+import numpy as np
+import pandas as pd
+
+CATEGORIES = ['Electronics', 'Clothing', 'Home Goods', 'Food', 'Toys']
+REGIONS = ['North', 'South', 'East', 'West', 'Central']
+STORE_SIZES = ['Small', 'Medium', 'Large']
+
+SALES_COLUMNS = ['Date', 'Product_ID', 'Store_ID', 'Sales_Quantity', 'Inventory_Level']
+
+
+def make_product_ids(n_products):
+    """Return product IDs P001, P002, ... widened when there are more than 999 products"""
+    width = max(3, len(str(n_products)))
+    return [f'P{i:0{width}d}' for i in range(1, n_products + 1)]
+
+
+def make_store_ids(n_stores):
+    """Return store IDs S01, S02, ... widened when there are more than 99 stores"""
+    width = max(2, len(str(n_stores)))
+    return [f'S{i:0{width}d}' for i in range(1, n_stores + 1)]
+
+
+def daily_demand_factor(dates):
+    """Seasonal base sales multiplied by the weekend and holiday effects for each date"""
+    dates = pd.DatetimeIndex(dates)
+    base_sales = 50 + 30 * np.sin(2 * np.pi * dates.dayofyear.values / 365)
+    weekend_factor = np.where(dates.dayofweek.values >= 5, 1.2, 1.0)
+    is_holiday = ((dates.month.values == 12) & (dates.day.values >= 15)) | \
+                 ((dates.month.values == 11) & (dates.day.values >= 25))
+    holiday_factor = np.where(is_holiday, 1.5, 1.0)
+    return base_sales * weekend_factor * holiday_factor
+
+
+class SalesDataGenerator:
+    """
+    Chunked generator for the synthetic sales & inventory dataset.
+
+    Rows are produced in date x product x store order, exactly like the
+    original loop. Each chunk covers a contiguous date range (or, when a single
+    day is larger than ``chunk_rows``, a block of products within one day), so
+    peak memory is bounded by ``chunk_rows`` regardless of the dataset size.
+    """
+
+    def __init__(self, n_products=10, n_stores=5, start_date='2022-01-01',
+                 end_date='2023-12-31', seed=42, chunk_rows=2_000_000):
+        if n_products < 1 or n_stores < 1:
+            raise ValueError("n_products and n_stores must be at least 1")
+        if chunk_rows < 1:
+            raise ValueError("chunk_rows must be at least 1")
+
+        self.dates = pd.date_range(start=start_date, end=end_date, freq='D')
+        self.product_ids = make_product_ids(n_products)
+        self.store_ids = make_store_ids(n_stores)
+        self.seed = seed
+        self.chunk_rows = chunk_rows
+
+        # Independent streams so metadata does not depend on how sales are chunked
+        sales_seq, product_seq = np.random.SeedSequence(seed).spawn(2)
+        self._sales_seed = sales_seq
+        self._product_seed = product_seq
+
+        self._product_factor = np.arange(1, n_products + 1) / 10
+        self._store_factor = np.arange(1, n_stores + 1) / 5
+
+    @property
+    def n_products(self):
+        return len(self.product_ids)
+
+    @property
+    def n_stores(self):
+        return len(self.store_ids)
+
+    @property
+    def n_rows(self):
+        """Total number of rows the generator will produce"""
+        return len(self.dates) * self.n_products * self.n_stores
+
+    def _blocks(self):
+        """Yield (date slice, product slice) pairs that each hold at most chunk_rows rows"""
+        rows_per_day = self.n_products * self.n_stores
+        if rows_per_day <= self.chunk_rows:
+            days_per_chunk = self.chunk_rows // rows_per_day
+            for start in range(0, len(self.dates), days_per_chunk):
+                yield slice(start, start + days_per_chunk), slice(0, self.n_products)
+        else:
+            products_per_chunk = max(1, self.chunk_rows // self.n_stores)
+            for day in range(len(self.dates)):
+                for start in range(0, self.n_products, products_per_chunk):
+                    yield slice(day, day + 1), slice(start, start + products_per_chunk)
+
+    def iter_chunks(self):
+        """Yield the sales & inventory data as a sequence of DataFrames"""
+        rng = np.random.default_rng(self._sales_seed)
+        product_categories = pd.CategoricalDtype(self.product_ids)
+        store_categories = pd.CategoricalDtype(self.store_ids)
+
+        for date_slice, product_slice in self._blocks():
+            dates = self.dates[date_slice]
+            product_idx = np.arange(self.n_products)[product_slice]
+            n_days, n_prod, n_stores = len(dates), len(product_idx), self.n_stores
+            shape = (n_days, n_prod, n_stores)
+
+            # Broadcast the multiplicative demand model over the (date, product, store) block
+            expected = (daily_demand_factor(dates)[:, None, None]
+                        * self._product_factor[product_idx][None, :, None]
+                        * self._store_factor[None, None, :])
+            sales_qty = (expected + rng.normal(0, 10, size=shape)).astype(np.int64)
+            np.maximum(sales_qty, 0, out=sales_qty)
+
+            inventory_level = (sales_qty * 1.5 + rng.normal(0, 20, size=shape)).astype(np.int64)
+            np.maximum(inventory_level, 0, out=inventory_level)
+
+            product_codes = np.broadcast_to(product_idx[None, :, None], shape).ravel()
+            store_codes = np.broadcast_to(np.arange(n_stores)[None, None, :], shape).ravel()
+
+            yield pd.DataFrame({
+                'Date': np.repeat(dates.values, n_prod * n_stores),
+                'Product_ID': pd.Categorical.from_codes(product_codes, dtype=product_categories),
+                'Store_ID': pd.Categorical.from_codes(store_codes, dtype=store_categories),
+                'Sales_Quantity': sales_qty.ravel().astype(np.int32),
+                'Inventory_Level': inventory_level.ravel().astype(np.int32),
+            })
+
+    def generate(self):
+        """Return the full dataset as a single DataFrame (only sensible for small configurations)"""
+        return pd.concat(self.iter_chunks(), ignore_index=True)
+
+    def product_metadata(self):
+        """Product metadata table with category, price, cost and weight"""
+        rng = np.random.default_rng(self._product_seed)
+        product_num = np.arange(1, self.n_products + 1)
+        price = 10 + (product_num * 5) + rng.normal(0, 5, size=self.n_products)
+        cost = price * 0.6
+        return pd.DataFrame({
+            'Product_ID': self.product_ids,
+            'Product_Name': [f'Product {num}' for num in product_num],
+            'Category': np.array(CATEGORIES)[product_num % len(CATEGORIES)],
+            'Price': np.round(np.maximum(5, price), 2),
+            'Cost': np.round(np.maximum(3, cost), 2),
+            'Weight_kg': np.round(0.5 + (product_num / 10), 2),
+        })
+
+    def store_metadata(self):
+        """Store metadata table with region, size and opening date"""
+        store_num = np.arange(1, self.n_stores + 1)
+        return pd.DataFrame({
+            'Store_ID': self.store_ids,
+            'Store_Name': [f'Store {num}' for num in store_num],
+            'Region': np.array(REGIONS)[(store_num - 1) % len(REGIONS)],
+            'Size': np.array(STORE_SIZES)[store_num % len(STORE_SIZES)],
+            'Opening_Date': [f"2020-{(num * 2) % 12 + 1:02d}-01" for num in store_num],
+        })
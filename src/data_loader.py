@@ -0,0 +1,173 @@
+"""
+Shared, dtype-optimized loaders for the raw and processed data files.
+
+Every script reads its CSVs through these functions so that the same explicit
+schema is applied everywhere: identifiers and low-cardinality labels become
+categoricals, counts become int32 (or smaller), model features become float32
+and the date columns are parsed on load. Monetary metadata (Price, Cost) stays
+float64 so derived margins keep their exact values.
+
+Processed weekly features are read with load_processed(), which uses the
+columnar store (see processed_store.py) when it exists and falls back to the
+legacy weekly/train/test CSVs otherwise.
+"""
+import os
+
+import pandas as pd
+
+from src.processed_store import METADATA_FILE, STORE_DIR, WeeklyStore
+
+SALES_PATH = 'data/raw/sales_inventory_data.csv'
+PRODUCT_PATH = 'data/raw/product_data.csv'
+STORE_PATH = 'data/raw/store_data.csv'
+WEEKLY_PATH = 'data/processed/weekly_data.csv'
+TRAIN_PATH = 'data/processed/train_data.csv'
+TEST_PATH = 'data/processed/test_data.csv'
+
+SALES_DTYPES = {
+    'Product_ID': 'category',
+    'Store_ID': 'category',
+    'Sales_Quantity': 'int32',
+    'Inventory_Level': 'int32',
+}
+
+PRODUCT_DTYPES = {
+    'Product_ID': 'category',
+    'Product_Name': 'string',
+    'Category': 'category',
+    'Price': 'float64',
+    'Cost': 'float64',
+    'Weight_kg': 'float32',
+}
+
+STORE_DTYPES = {
+    'Store_ID': 'category',
+    'Store_Name': 'string',
+    'Region': 'category',
+    'Size': 'category',
+}
+
+WEEKLY_DTYPES = {
+    'Year': 'int16',
+    'WeekOfYear': 'int8',
+    'Product_ID': 'category',
+    'Store_ID': 'category',
+    'Category': 'category',
+    'Region': 'category',
+    'Sales_Quantity': 'int32',
+    'Inventory_Level': 'float32',
+    'Price': 'float32',
+    'Cost': 'float32',
+    'Sales_Lag_1': 'float32',
+    'Sales_Lag_2': 'float32',
+    'Sales_Lag_3': 'float32',
+    'Sales_Lag_4': 'float32',
+    'Sales_Rolling_2': 'float32',
+    'Sales_Rolling_4': 'float32',
+    'Sales_Rolling_8': 'float32',
+    'Inventory_Turnover': 'float32',
+    'Gross_Margin': 'float32',
+}
+
+FORECAST_DTYPES = {
+    'Product_ID': 'category',
+    'Store_ID': 'category',
+    'Forecasted_Sales': 'float32',
+    'P10': 'float32',
+    'P50': 'float32',
+    'P90': 'float32',
+    'Optimal_Inventory': 'int32',
+    # Only Random Forest rows have quantiles; baseline rows of a tiered forecast are empty
+    'Optimal_Inventory_P90': 'Int32',
+}
+
+
+def _read_csv(path, dtypes, date_columns=(), usecols=None, **kwargs):
+    """read_csv with the schema restricted to the columns actually present"""
+    header = pd.read_csv(path, nrows=0).columns
+    columns = [col for col in header if usecols is None or col in usecols]
+    return pd.read_csv(
+        path,
+        usecols=columns,
+        dtype={col: dtype for col, dtype in dtypes.items() if col in columns},
+        parse_dates=[col for col in date_columns if col in columns],
+        **kwargs
+    )
+
+
+def load_sales_data(path=SALES_PATH, usecols=None, **kwargs):
+    """Daily sales & inventory records"""
+    return _read_csv(path, SALES_DTYPES, ['Date'], usecols, **kwargs)
+
+
+def load_product_data(path=PRODUCT_PATH):
+    """Product metadata"""
+    return _read_csv(path, PRODUCT_DTYPES)
+
+
+def load_store_data(path=STORE_PATH):
+    """Store metadata"""
+    return _read_csv(path, STORE_DTYPES, ['Opening_Date'])
+
+
+def load_weekly_data(path=WEEKLY_PATH, usecols=None):
+    """Weekly feature data (weekly_data.csv, train_data.csv or test_data.csv)"""
+    return _read_csv(path, WEEKLY_DTYPES, ['Week_Start'], usecols)
+
+
+def load_forecast_results(path):
+    """Forecast output written by forecast_model.py"""
+    return _read_csv(path, FORECAST_DTYPES, ['Week_Start'])
+
+
+def apply_schema(frame, dtypes=WEEKLY_DTYPES):
+    """Cast the columns of ``frame`` that appear in ``dtypes``"""
+    return frame.astype({col: dtype for col, dtype in dtypes.items() if col in frame.columns})
+
+
+def load_processed(split=None, columns=None, start=None, end=None, products=None, stores=None,
+                   store_dir=STORE_DIR):
+    """
+    Weekly features with the weekly schema applied.
+
+    Args:
+        split: 'train', 'test' or None for all weeks
+        columns: columns to load; all when None
+        start, end: inclusive Week_Start bounds
+        products, stores: only load these product / store IDs
+        store_dir: location of the columnar processed store
+    """
+    if os.path.exists(os.path.join(store_dir, METADATA_FILE)):
+        frame = WeeklyStore(store_dir).read(columns=columns, split=split, start=start, end=end,
+                                            products=products, stores=stores)
+        return apply_schema(frame)
+
+    paths = {None: WEEKLY_PATH, 'train': TRAIN_PATH, 'test': TEST_PATH}
+    if split not in paths:
+        raise ValueError("split must be 'train', 'test' or None")
+    frame = load_weekly_data(paths[split])
+    mask = pd.Series(True, index=frame.index)
+    if start is not None:
+        mask &= frame['Week_Start'] >= pd.Timestamp(start)
+    if end is not None:
+        mask &= frame['Week_Start'] <= pd.Timestamp(end)
+    if products is not None:
+        mask &= frame['Product_ID'].isin(products)
+    if stores is not None:
+        mask &= frame['Store_ID'].isin(stores)
+    frame = frame[mask]
+    return frame if columns is None else frame[list(columns)]
+
+
+def align_categories(frame, reference, columns):
+    """
+    Cast ``columns`` of ``frame`` to the categorical dtypes used in ``reference``.
+
+    Intended for left merges from ``reference``: merging on categoricals only
+    keeps the categorical dtype (and joins on the integer codes) when both
+    sides share the same categories. Values of ``frame`` that do not occur in
+    ``reference`` become NaN, which a left merge would drop anyway.
+    """
+    dtypes = {col: reference[col].dtype for col in columns
+              if col in frame.columns and isinstance(reference[col].dtype, pd.CategoricalDtype)}
+    return frame.astype(dtypes) if dtypes else frame
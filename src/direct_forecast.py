@@ -0,0 +1,94 @@
+"""
+Direct multi-horizon forecasting.
+
+The recursive forecaster needs H sequential predict calls because week k
+depends on the prediction for week k-1. The direct strategy removes that
+chain: one multi-output Random Forest maps the features of the first
+forecast week straight to the sales of weeks 1..H. It is trained on shifted
+targets, where every weekly row's features are paired with the sales of that
+week and the H-1 weeks after it in the same series. Forecasting all horizons
+for all series is then a single batched predict.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+from src.feature_cache import MODEL_FEATURES, TARGET
+from src.feature_engineering import series_positions, sort_series_frame
+from src.global_model import ID_FEATURES, GlobalForecaster
+from src.recursive_forecast import feature_matrix, history_length, history_matrix
+
+DEFAULT_DIRECT_PARAMS = {'n_estimators': 100, 'min_samples_leaf': 5, 'random_state': 42}
+
+
+def shifted_targets(data, horizon):
+    """
+    Targets for weeks 1..``horizon`` of every row of ``data`` (sorted by series and week).
+
+    Column h-1 holds the sales h-1 weeks after the row in the same series;
+    entries without a consecutive week that far ahead are NaN.
+    """
+    sales = data[TARGET].to_numpy(dtype=np.float64)
+    weeks = data['Week_Start'].to_numpy()
+    positions = series_positions(data)
+    targets = np.full((len(data), horizon), np.nan)
+    targets[:, 0] = sales
+    for h in range(1, horizon):
+        ahead = np.arange(h, len(data))
+        consecutive = (positions[ahead] >= h) & (weeks[ahead] - weeks[ahead - h] == np.timedelta64(7 * h, 'D'))
+        targets[ahead[consecutive] - h, h] = sales[ahead[consecutive]]
+    return targets
+
+
+class DirectForecaster(GlobalForecaster):
+    """Multi-output Random Forest predicting weeks 1..horizon in one call for all series"""
+
+    def __init__(self, horizon=4, features=MODEL_FEATURES, id_features=ID_FEATURES, **params):
+        super().__init__(features, id_features)
+        self.horizon = horizon
+        self.params = {**DEFAULT_DIRECT_PARAMS, **params}
+
+    def _encode(self, values, col):
+        # Random Forests can't take missing values; unseen IDs get their own code
+        return np.nan_to_num(super()._encode(values, col), nan=-1)
+
+    def fit(self, data):
+        """Fit on the rows of ``data`` that have all ``horizon`` shifted targets"""
+        data = sort_series_frame(data)
+        targets = shifted_targets(data, self.horizon)
+        complete = ~np.isnan(targets).any(axis=1)
+        self.categories = {col: np.sort(data[col].astype(str).unique()) for col in self.id_features}
+        self.model = RandomForestRegressor(**self.params)
+        self.model.fit(self.design_matrix(data[complete]), targets[complete])
+        return self
+
+    def predict_horizons(self, data):
+        """Sales for weeks 1..horizon starting at each row's week"""
+        return self.model.predict(self.design_matrix(data)).reshape(len(data), self.horizon)
+
+    def predict(self, data):
+        """One-week-ahead predictions, comparable with the other models' test predictions"""
+        return self.predict_horizons(data)[:, 0]
+
+    def forecast(self, data, n_weeks=None):
+        """
+        Forecast up to ``horizon`` weeks after the last week of every series in ``data``
+        with one predict call. Returns the same layout as GlobalForecaster.forecast().
+        """
+        n_weeks = self.horizon if n_weeks is None else n_weeks
+        if n_weeks > self.horizon:
+            raise ValueError(f"n_weeks={n_weeks} exceeds the trained horizon of {self.horizon} weeks")
+
+        keys, history, last_weeks = history_matrix(data, history_length(self.features),
+                                                   key_columns=self.id_features)
+        weeks = np.asarray(last_weeks, dtype='datetime64[ns]')[:, None] + \
+            np.arange(1, n_weeks + 1) * np.timedelta64(7, 'D')
+        ids = np.column_stack([self._encode(keys[col], col) for col in self.id_features])
+        X = np.hstack([feature_matrix(history, weeks[:, 0], self.features), ids])
+        predictions = self.model.predict(X).reshape(len(X), self.horizon)[:, :n_weeks]
+        return pd.DataFrame({
+            'Product_ID': np.repeat(keys['Product_ID'].astype(str).to_numpy(), n_weeks),
+            'Store_ID': np.repeat(keys['Store_ID'].astype(str).to_numpy(), n_weeks),
+            'Week_Start': weeks.ravel(),
+            'Forecasted_Sales': predictions.ravel(),
+        })
@@ -0,0 +1,156 @@
+"""
+Memory-mapped feature-matrix cache for model training.
+
+The model features of every product-store series are stored once as a
+contiguous float32 matrix (``X.npy``) next to the target (``y.npy``) and the
+week dates (``week_start.npy``). Rows are ordered by series and week, and
+``index.csv`` records for each (Product_ID, Store_ID) the row offsets (from
+SeriesIndex) where its train rows start, where its test rows start and where
+the series ends. The
+arrays are opened with ``np.load(mmap_mode='r')``, so selecting a series is a
+zero-copy slice of the mapped file instead of a scan of the full tables.
+
+The cache remembers the size and modification time of the processed data it
+was built from and is rebuilt automatically when that data changes.
+"""
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from src.data_loader import TEST_PATH, TRAIN_PATH, load_processed
+from src.feature_engineering import SERIES_KEYS, sort_series_frame
+from src.processed_store import METADATA_FILE, STORE_DIR
+from src.series_index import SeriesIndex
+
+CACHE_DIR = 'data/processed/feature_cache'
+CACHE_METADATA_FILE = 'cache.json'
+INDEX_FILE = 'index.csv'
+
+MODEL_FEATURES = ['Sales_Lag_1', 'Sales_Lag_2', 'Sales_Lag_3', 'Sales_Lag_4',
+                  'Sales_Rolling_2', 'Sales_Rolling_4', 'Sales_Rolling_8',
+                  'Month', 'WeekOfYear', 'IsWeekend']
+TARGET = 'Sales_Quantity'
+
+
+def add_calendar_features(data):
+    """Add the Month, WeekOfYear and IsWeekend model features when they are missing"""
+    data = data.copy()
+    if 'Month' not in data.columns:
+        data['Month'] = data['Week_Start'].dt.month
+    if 'WeekOfYear' not in data.columns:
+        data['WeekOfYear'] = data['Week_Start'].dt.isocalendar().week
+    if 'IsWeekend' not in data.columns:
+        data['IsWeekend'] = 0  # Weekly rows never fall on a single weekend day
+    return data
+
+
+def source_signature(store_dir=STORE_DIR):
+    """Size and mtime of the processed data files the cache is built from"""
+    store_metadata = os.path.join(store_dir, METADATA_FILE)
+    paths = [store_metadata] if os.path.exists(store_metadata) else [TRAIN_PATH, TEST_PATH]
+    signature = {}
+    for path in paths:
+        stat = os.stat(path)
+        signature[path] = [stat.st_size, stat.st_mtime_ns]
+    return signature
+
+
+class FeatureCache:
+    """Contiguous float32 feature matrix with per-series row offsets"""
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.X = None
+        self.y = None
+        self.week_start = None
+        self.index = None
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def exists(self):
+        return os.path.exists(self._path(CACHE_METADATA_FILE))
+
+    def metadata(self):
+        with open(self._path(CACHE_METADATA_FILE)) as f:
+            return json.load(f)
+
+    @property
+    def features(self):
+        return self.metadata()['features']
+
+    def build(self, train_data, test_data, features=MODEL_FEATURES, signature=None):
+        """Write the cache from the train and test feature frames"""
+        if os.path.isdir(self.cache_dir):
+            shutil.rmtree(self.cache_dir)
+        os.makedirs(self.cache_dir)
+
+        data = pd.concat([train_data.assign(_Test=False), test_data.assign(_Test=True)], ignore_index=True)
+        data = sort_series_frame(add_calendar_features(data))
+
+        # Stream the matrix into the .npy file column by column
+        X = np.lib.format.open_memmap(self._path('X.npy'), mode='w+', dtype=np.float32,
+                                      shape=(len(data), len(features)))
+        for j, col in enumerate(features):
+            X[:, j] = data[col].to_numpy(dtype=np.float32)
+        X.flush()
+        del X
+        np.save(self._path('y.npy'), data[TARGET].to_numpy(dtype=np.float32))
+        np.save(self._path('week_start.npy'), data['Week_Start'].to_numpy(dtype='datetime64[ns]'))
+
+        # Row offsets of each series: [start, split) are train rows, [split, end) test rows
+        index = SeriesIndex(data, presorted=True).offsets()
+        train_rows = np.add.reduceat((~data['_Test']).to_numpy(dtype=np.int64), index['start'].to_numpy())
+        index['split'] = index['start'] + train_rows
+        index[SERIES_KEYS + ['start', 'split', 'end']].to_csv(self._path(INDEX_FILE), index=False)
+
+        with open(self._path(CACHE_METADATA_FILE), 'w') as f:
+            json.dump({'features': list(features), 'rows': len(data),
+                       'source': signature or {}}, f, indent=2)
+        return self
+
+    def open(self):
+        """Memory-map the arrays and load the series index"""
+        self.X = np.load(self._path('X.npy'), mmap_mode='r')
+        self.y = np.load(self._path('y.npy'), mmap_mode='r')
+        self.week_start = np.load(self._path('week_start.npy'), mmap_mode='r')
+        index = pd.read_csv(self._path(INDEX_FILE), dtype={'Product_ID': str, 'Store_ID': str})
+        self.index = {(p, s): (start, split, end) for p, s, start, split, end in
+                      index[SERIES_KEYS + ['start', 'split', 'end']].itertuples(index=False)}
+        return self
+
+    def keys(self):
+        """(Product_ID, Store_ID) pairs in cache order"""
+        return list(self.index)
+
+    def rows(self, product_id, store_id, split=None):
+        """Row slice of one series: 'train', 'test' or None for all of its weeks"""
+        start, split_row, end = self.index[(str(product_id), str(store_id))]
+        if split == 'train':
+            return slice(start, split_row)
+        if split == 'test':
+            return slice(split_row, end)
+        if split is None:
+            return slice(start, end)
+        raise ValueError("split must be 'train', 'test' or None")
+
+    def get(self, product_id, store_id, split=None):
+        """Zero-copy (X, y, week_start) views of one series"""
+        rows = self.rows(product_id, store_id, split)
+        return self.X[rows], self.y[rows], self.week_start[rows]
+
+
+def load_feature_cache(cache_dir=CACHE_DIR, store_dir=STORE_DIR, rebuild=False):
+    """Open the feature cache, (re)building it when missing or older than the processed data"""
+    cache = FeatureCache(cache_dir)
+    signature = source_signature(store_dir)
+    if rebuild or not cache.exists() or cache.metadata()['source'] != signature:
+        columns = ['Product_ID', 'Store_ID', 'Week_Start', TARGET] + \
+                  [col for col in MODEL_FEATURES if col not in ('Month', 'IsWeekend')]
+        cache.build(load_processed('train', columns=columns, store_dir=store_dir),
+                    load_processed('test', columns=columns, store_dir=store_dir),
+                    signature=signature)
+    return cache.open()
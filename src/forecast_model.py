@@ -2,14 +2,33 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
-from sklearn.linear_model import LinearRegression
 from sklearn.ensemble import RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
-from datetime import datetime, timedelta
+import argparse
+import json
 import os
+import sys
+import time
 import pickle
 
+if __package__ in (None, ''):
+    # Allow running as `python src/forecast_model.py` from the project root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.baseline_models import (HOLDOUT_WEEKS, VOLUME_QUANTILE, forecast_baselines, forecast_chosen,
+                                  route_by_volume, sales_matrix)
+from src.data_loader import load_processed
+from src.feature_cache import MODEL_FEATURES, TARGET, load_feature_cache
+from src.feature_engineering import SERIES_KEYS
+from src.direct_forecast import DirectForecaster
+from src.global_model import ID_FEATURES, GlobalForecaster
+from src.inventory_optimization import calculate_optimal_inventory
+from src.model_registry import REGISTRY_DIR, ModelRegistry
+from src.recursive_forecast import RecursiveForecaster, lag_columns, sales_history
+from src.parallel_training import train_parallel
+from src.quantile_forecast import QUANTILE_COLUMNS, forecast_quantiles
+
 # Set random seed for reproducibility
 np.random.seed(42)
 
@@ -23,85 +42,389 @@ plt.rcParams['font.size'] = 12
 os.makedirs('models', exist_ok=True)
 os.makedirs('images', exist_ok=True)
 
-def main():
-    print("Loading processed data...")
-    # Load the training and testing data
-    train_data = pd.read_csv('data/processed/train_data.csv')
-    test_data = pd.read_csv('data/processed/test_data.csv')
+MODEL_DIR = 'models'
+GLOBAL_MODEL = 'global_model.pkl'
+DIRECT_MODEL = 'direct_model.pkl'
+STRATEGIES = ('recursive', 'direct')
+FORECAST_PATH = 'data/processed/forecast_results.csv'
+METRICS_PATH = 'data/processed/forecast_metrics.csv'
+# Random Forest settings of the per-series models; tuning.py searches alternatives
+DEFAULT_RF_PARAMS = {'n_estimators': 100, 'random_state': 42}
+
+
+def evaluate(y_true, y_pred):
+    """MAE, RMSE, R² and MAPE of the test predictions"""
+    # Weeks with zero actual sales make MAPE infinite, as before; don't warn for every series
+    with np.errstate(divide='ignore'):
+        mape = np.mean(np.abs((y_true - y_pred) / y_true)) * 100
+    return {
+        'MAE': mean_absolute_error(y_true, y_pred),
+        'RMSE': np.sqrt(mean_squared_error(y_true, y_pred)),
+        'R2': r2_score(y_true, y_pred),
+        'MAPE': mape,
+    }
+
+
+def forecast_series(feature_cache, product_id, store_id, n_weeks=4, n_jobs=None, **rf_params):
+    """
+    Train a Random Forest for one product-store series, evaluate it on the
+    test weeks and forecast the ``n_weeks`` after them.
+
+    Returns a dict with the 'model', 'scaler', test 'y_pred', 'metrics', the
+    'training_window' and the 'forecast' DataFrame (Week_Start,
+    Forecasted_Sales, the P10/P50/P90 quantiles of the forest's trees,
+    Optimal_Inventory with the fixed safety factor and Optimal_Inventory_P90
+    sized from the P90).
+    ``n_jobs`` and ``rf_params`` (overriding DEFAULT_RF_PARAMS) are passed
+    to the Random Forest.
+    """
+    X_train, y_train, train_weeks = feature_cache.get(product_id, store_id, 'train')
+    X_test, y_test, test_weeks = feature_cache.get(product_id, store_id, 'test')
+
+    # Scale the features
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    model = RandomForestRegressor(**{**DEFAULT_RF_PARAMS, **rf_params}, n_jobs=n_jobs)
+    model.fit(X_train_scaled, y_train)
+    y_pred = model.predict(X_test_scaled)
+
+    # Forecast the weeks after the test set from the series' most recent sales
+    forecaster = RecursiveForecaster(lambda X: model.predict(scaler.transform(X)), feature_cache.features)
+    first_lags = (X_train if len(X_train) else X_test)[0, lag_columns(feature_cache.features)]
+    history = sales_history(np.concatenate([y_train, y_test]), first_lags, forecaster.length)
+    future_predictions, future_weeks = forecaster.forecast(history[None, :], test_weeks[-1:], n_weeks)
+    quantiles, _ = forecast_quantiles(model, scaler, feature_cache.features, history[None, :], test_weeks[-1:],
+                                      n_weeks)
+    forecast_df = pd.DataFrame({
+        'Week_Start': future_weeks[0],
+        'Forecasted_Sales': future_predictions[0],
+        **{name: values[0] for name, values in quantiles.items()},
+        'Optimal_Inventory': calculate_optimal_inventory(future_predictions[0]),
+        'Optimal_Inventory_P90': calculate_optimal_inventory(future_predictions[0], upper_demand=quantiles['P90'][0]),
+    })
+
+    return {
+        'model': model,
+        'scaler': scaler,
+        'y_pred': y_pred,
+        'metrics': evaluate(y_test, y_pred),
+        'training_window': {'start': f'{pd.Timestamp(train_weeks[0]):%Y-%m-%d}',
+                            'end': f'{pd.Timestamp(train_weeks[-1]):%Y-%m-%d}',
+                            'rows': len(train_weeks)},
+        'forecast': forecast_df,
+    }
+
+
+def evaluate_by_series(data, y_pred):
+    """Per-series MAE, RMSE, R² and MAPE of predictions for the rows of ``data``"""
+    y_true = data[TARGET].to_numpy(dtype=np.float64)
+    errors = pd.DataFrame({'Product_ID': data['Product_ID'].astype(str).to_numpy(),
+                           'Store_ID': data['Store_ID'].astype(str).to_numpy(),
+                           'y': y_true,
+                           'abs_error': np.abs(y_true - y_pred),
+                           'sq_error': (y_true - y_pred) ** 2})
+    with np.errstate(divide='ignore', invalid='ignore'):
+        errors['pct_error'] = errors['abs_error'] / np.abs(y_true) * 100
+    errors['sq_dev'] = (errors['y'] - errors.groupby(SERIES_KEYS)['y'].transform('mean')) ** 2
+    grouped = errors.groupby(SERIES_KEYS, sort=False)
+    metrics = grouped.agg(MAE=('abs_error', 'mean'), RMSE=('sq_error', 'mean'), SSE=('sq_error', 'sum'),
+                          SST=('sq_dev', 'sum'), MAPE=('pct_error', 'mean')).reset_index()
+    metrics['RMSE'] = np.sqrt(metrics['RMSE'])
+    metrics['R2'] = 1 - metrics['SSE'] / metrics['SST']
+    return metrics[SERIES_KEYS + ['MAE', 'RMSE', 'R2', 'MAPE']]
+
+
+def select_series(keys, products=None, stores=None):
+    """Filter (Product_ID, Store_ID) pairs to the given products and stores"""
+    products = None if products is None else set(products)
+    stores = None if stores is None else set(stores)
+    return [(p, s) for p, s in keys
+            if (products is None or p in products) and (stores is None or s in stores)]
+
+
+def forecast_all(products=None, stores=None, n_weeks=4, registry_dir=REGISTRY_DIR,
+                 output_path=FORECAST_PATH, metrics_path=METRICS_PATH, n_workers=1, verbose=True, rf_params=None,
+                 pairs=None):
+    """
+    Train and forecast every product-store series (or those matching the filters).
+
+    Args:
+        products, stores: only forecast these product / store IDs (all when None)
+        n_weeks: forecast horizon in weeks
+        registry_dir: model registry the trained models and their scalers are saved to
+        output_path, metrics_path: consolidated forecast and test-metric CSVs (skipped when None)
+        n_workers: train in a process pool with this many workers (-1 for one per core);
+            1 trains in-process
+        rf_params: Random Forest settings overriding DEFAULT_RF_PARAMS (e.g. tuned ones)
+        pairs: (Product_ID, Store_ID) pairs to forecast instead of filtering by products and stores
+
+    Returns:
+        (forecasts, metrics, stats) where ``stats`` holds the series count,
+        elapsed seconds and throughput in series per second.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    feature_cache = load_feature_cache()
+    if pairs is None:
+        pairs = select_series(feature_cache.keys(), products, stores)
+    if not pairs:
+        raise ValueError("No product-store series match the given filters")
+
+    log(f"Forecasting {len(pairs)} product-store series...")
+    start = time.perf_counter()
+    if n_workers == 1:
+        results = [forecast_series(feature_cache, product_id, store_id, n_weeks=n_weeks, **(rf_params or {}))
+                   for product_id, store_id in pairs]
+    else:
+        results = train_parallel(forecast_series, pairs, feature_cache.cache_dir, n_workers, n_weeks=n_weeks,
+                                 **(rf_params or {}))
+
+    registry = ModelRegistry(registry_dir)
+    forecasts, metrics = [], []
+    for (product_id, store_id), result in zip(pairs, results):
+        forecasts.append(result['forecast'].assign(Product_ID=product_id, Store_ID=store_id))
+        metrics.append({'Product_ID': product_id, 'Store_ID': store_id, **result['metrics']})
+        registry.save(product_id, store_id, result['model'], result['scaler'], feature_cache.features,
+                      result['training_window'], result['metrics'], flush=False)
+    registry.flush()
+    elapsed = time.perf_counter() - start
+
+    forecasts = pd.concat(forecasts, ignore_index=True)[
+        ['Product_ID', 'Store_ID', 'Week_Start', 'Forecasted_Sales'] + QUANTILE_COLUMNS +
+        ['Optimal_Inventory', 'Optimal_Inventory_P90']]
+    metrics = pd.DataFrame(metrics)
+
+    for path, table in [(output_path, forecasts), (metrics_path, metrics)]:
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            table.to_csv(path, index=False)
+
+    stats = {'series': len(pairs), 'seconds': elapsed, 'series_per_second': len(pairs) / elapsed}
+    log(f"Trained and forecast {stats['series']} series in {elapsed:.2f}s "
+        f"({stats['series_per_second']:.2f} series/s)")
+    return forecasts, metrics, stats
+
+
+def forecast_global(products=None, stores=None, n_weeks=4, model_dir=MODEL_DIR,
+                    output_path=FORECAST_PATH, metrics_path=METRICS_PATH, strategy='recursive',
+                    verbose=True, **params):
+    """
+    Train one global model on all selected series and forecast them in batches.
+
+    Takes the same filters and outputs as forecast_all(). With the
+    'recursive' strategy a GlobalForecaster predicts one week at a time and
+    is saved as ``global_model.pkl``; with 'direct' a DirectForecaster
+    predicts all ``n_weeks`` at once and is saved as ``direct_model.pkl``.
+    ``params`` are passed to the model. Returns (forecasts, metrics, stats).
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"strategy must be one of {STRATEGIES}")
+    log = print if verbose else (lambda *args, **kwargs: None)
+    columns = SERIES_KEYS + ['Week_Start', TARGET] + \
+        [col for col in ID_FEATURES + MODEL_FEATURES if col not in SERIES_KEYS + ['Month', 'IsWeekend']]
+    train_data = load_processed('train', columns=columns, products=products, stores=stores)
+    test_data = load_processed('test', columns=columns, products=products, stores=stores)
+    if train_data.empty or test_data.empty:
+        raise ValueError("No product-store series match the given filters")
+
+    n_series = len(test_data[SERIES_KEYS].drop_duplicates())
+    log(f"Training one global model on {len(train_data)} rows of {n_series} series...")
+    start = time.perf_counter()
+    if strategy == 'direct':
+        model = DirectForecaster(horizon=n_weeks, **params).fit(train_data)
+    else:
+        model = GlobalForecaster(**params).fit(train_data)
+    metrics = evaluate_by_series(test_data, model.predict(test_data))
+    forecasts = model.forecast(pd.concat([train_data, test_data], ignore_index=True), n_weeks=n_weeks)
+    forecasts['Optimal_Inventory'] = calculate_optimal_inventory(forecasts['Forecasted_Sales'])
+    elapsed = time.perf_counter() - start
+
+    os.makedirs(model_dir, exist_ok=True)
+    with open(os.path.join(model_dir, DIRECT_MODEL if strategy == 'direct' else GLOBAL_MODEL), 'wb') as f:
+        pickle.dump(model, f)
+    for path, table in [(output_path, forecasts), (metrics_path, metrics)]:
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            table.to_csv(path, index=False)
+
+    stats = {'series': n_series, 'seconds': elapsed, 'series_per_second': n_series / elapsed}
+    log(f"Trained and forecast {n_series} series with one global model in {elapsed:.2f}s "
+        f"({stats['series_per_second']:.2f} series/s)")
+    return forecasts, metrics, stats
+
+
+def forecast_tiered(products=None, stores=None, n_weeks=4, registry_dir=REGISTRY_DIR,
+                    output_path=FORECAST_PATH, metrics_path=METRICS_PATH, volume_quantile=VOLUME_QUANTILE,
+                    n_workers=1, verbose=True, rf_params=None):
+    """
+    Forecast high-volume series with per-series Random Forests and the rest with baselines.
+
+    Series are routed by their recent average weekly sales (see
+    route_by_volume()); only those at or above the ``volume_quantile`` go
+    through forecast_all(). All other series get the baseline (seasonal
+    naive, moving average or exponential smoothing) with the lowest MAE on
+    the weeks before their last HOLDOUT_WEEKS, computed for every series in
+    one pass over the weekly sales matrix; their metrics are that baseline's
+    forecasts of the last HOLDOUT_WEEKS, which played no part in the choice.
+
+    Takes the same filters and outputs as forecast_all(); both tables get a
+    Model column. Returns (forecasts, metrics, stats).
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    lags = [col for col in MODEL_FEATURES if col.startswith('Sales_Lag_')]
+    data = load_processed(columns=SERIES_KEYS + ['Week_Start', TARGET] + lags, products=products, stores=stores)
+    if data.empty:
+        raise ValueError("No product-store series match the given filters")
 
-    # Convert date columns to datetime
-    train_data['Week_Start'] = pd.to_datetime(train_data['Week_Start'])
-    test_data['Week_Start'] = pd.to_datetime(test_data['Week_Start'])
+    start = time.perf_counter()
+    keys, sales, last_weeks = sales_matrix(data)
+    high_volume = route_by_volume(sales, volume_quantile)
+    keys = keys.astype({'Product_ID': str, 'Store_ID': str})
+    log(f"Routing {high_volume.sum()} high-volume series to Random Forests "
+        f"and {(~high_volume).sum()} to baselines...")
+
+    forecasts, metrics = [], []
+    if high_volume.any():
+        pairs = list(keys[high_volume].itertuples(index=False, name=None))
+        rf_forecasts, rf_metrics, _ = forecast_all(n_weeks=n_weeks, registry_dir=registry_dir, output_path=None,
+                                                   metrics_path=None, n_workers=n_workers, verbose=verbose,
+                                                   rf_params=rf_params, pairs=pairs)
+        forecasts.append(rf_forecasts.assign(Model='random_forest'))
+        metrics.append(rf_metrics.assign(Model='random_forest'))
+
+    if (~high_volume).any():
+        low_keys, low_sales = keys[~high_volume], sales[~high_volume]
+        # Pick each series' baseline on the weeks before the test window and score it on
+        # the test weeks, so the metrics are out of sample like the Random Forests'
+        holdout = HOLDOUT_WEEKS
+        holdout_predictions, chosen, _ = forecast_baselines(low_sales[:, :-holdout], holdout, holdout)
+        predictions = forecast_chosen(low_sales, n_weeks, chosen)
+        weeks = np.asarray(last_weeks[~high_volume], dtype='datetime64[ns]')[:, None] + \
+            np.arange(1, n_weeks + 1) * np.timedelta64(7, 'D')
+        forecasts.append(pd.DataFrame({
+            'Product_ID': np.repeat(low_keys['Product_ID'].to_numpy(), n_weeks),
+            'Store_ID': np.repeat(low_keys['Store_ID'].to_numpy(), n_weeks),
+            'Week_Start': weeks.ravel(),
+            'Forecasted_Sales': predictions.ravel(),
+            'Optimal_Inventory': calculate_optimal_inventory(predictions.ravel()),
+            'Model': np.repeat(chosen, n_weeks),
+        }))
+        actual = pd.DataFrame({'Product_ID': np.repeat(low_keys['Product_ID'].to_numpy(), holdout),
+                               'Store_ID': np.repeat(low_keys['Store_ID'].to_numpy(), holdout),
+                               TARGET: low_sales[:, -holdout:].ravel()})
+        observed = actual[TARGET].notna().to_numpy()
+        baseline_metrics = evaluate_by_series(actual[observed], holdout_predictions.ravel()[observed])
+        metrics.append(baseline_metrics.merge(low_keys.assign(Model=chosen), on=SERIES_KEYS))
+    elapsed = time.perf_counter() - start
+
+    forecasts = pd.concat(forecasts, ignore_index=True).sort_values(SERIES_KEYS + ['Week_Start'], ignore_index=True)
+    metrics = pd.concat(metrics, ignore_index=True).sort_values(SERIES_KEYS, ignore_index=True)
+    for path, table in [(output_path, forecasts), (metrics_path, metrics)]:
+        if path is not None:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            table.to_csv(path, index=False)
+
+    n_series = len(keys)
+    stats = {'series': n_series, 'random_forest': int(high_volume.sum()), 'baseline': int((~high_volume).sum()),
+             'seconds': elapsed, 'series_per_second': n_series / elapsed}
+    log(f"Forecast {n_series} series ({stats['random_forest']} Random Forests, {stats['baseline']} baselines) "
+        f"in {elapsed:.2f}s ({stats['series_per_second']:.2f} series/s)")
+    return forecasts, metrics, stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Train sales forecasting models and forecast future demand")
+    parser.add_argument('--all', action='store_true',
+                        help="Forecast every product-store combination instead of only the first one")
+    parser.add_argument('--products', nargs='+', help="Only forecast these product IDs (implies --all)")
+    parser.add_argument('--stores', nargs='+', help="Only forecast these store IDs (implies --all)")
+    parser.add_argument('--weeks', type=int, default=4, help="Forecast horizon in weeks")
+    parser.add_argument('--global', dest='global_model', action='store_true',
+                        help="Train one global model across all series instead of one model per series")
+    parser.add_argument('--strategy', choices=STRATEGIES, default='recursive',
+                        help="Multi-week strategy of the global model: recursive one-step predictions "
+                             "or direct prediction of every week at once")
+    parser.add_argument('--tiered', action='store_true',
+                        help="Use Random Forests only for high-volume series and cheap baselines for the rest")
+    parser.add_argument('--volume-quantile', type=float, default=VOLUME_QUANTILE,
+                        help="Series below this quantile of recent weekly sales get a baseline (with --tiered)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes for batch training (-1 for one per CPU core)")
+    parser.add_argument('--output', default=FORECAST_PATH, help="Consolidated forecast CSV for batch mode")
+    parser.add_argument('--params', help="JSON file of Random Forest settings, e.g. models/best_params.json "
+                                         "written by tuning.py")
+    return parser.parse_args(argv)
+
+
+def load_rf_params(path):
+    """Random Forest settings from a JSON file (empty when ``path`` is None)"""
+    if path is None:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(argv=()):
+    # Programmatic calls default to no options; only the command line parses sys.argv
+    args = parse_args(argv)
+    rf_params = load_rf_params(args.params)
+    if args.global_model:
+        forecast_global(args.products, args.stores, n_weeks=args.weeks, output_path=args.output,
+                        strategy=args.strategy)
+        print("Global model forecasting complete!")
+        print(f"Results saved to {args.output}")
+        return
+
+    if args.tiered:
+        forecast_tiered(args.products, args.stores, n_weeks=args.weeks, output_path=args.output,
+                        volume_quantile=args.volume_quantile, n_workers=args.workers, rf_params=rf_params)
+        print("Tiered forecasting complete!")
+        print(f"Results saved to {args.output}")
+        return
+
+    if args.all or args.products or args.stores:
+        forecast_all(args.products, args.stores, n_weeks=args.weeks, output_path=args.output,
+                     n_workers=args.workers, rf_params=rf_params)
+        print("Batch forecasting complete!")
+        print(f"Results saved to {args.output}")
+        return
+
+    print("Loading processed data...")
+    # Memory-mapped feature matrix; each series is a zero-copy slice of it
+    feature_cache = load_feature_cache()
 
     # Get unique product-store combinations
-    product_store_combinations = train_data[['Product_ID', 'Store_ID']].drop_duplicates().values
-    
+    product_store_combinations = feature_cache.keys()
+
     # For demonstration, select one product-store combination
     selected_idx = 0  # Can be changed to train different combinations
     product_id, store_id = product_store_combinations[selected_idx]
-    
+
     print(f"Training model for Product: {product_id}, Store: {store_id}")
-    
-    # Filter data for the specific product and store
-    train_product_store = train_data[(train_data['Product_ID'] == product_id) & 
-                                    (train_data['Store_ID'] == store_id)].sort_values('Week_Start')
-    test_product_store = test_data[(test_data['Product_ID'] == product_id) & 
-                                   (test_data['Store_ID'] == store_id)].sort_values('Week_Start')
-    
-    # Select features
-    features = ['Sales_Lag_1', 'Sales_Lag_2', 'Sales_Lag_3', 'Sales_Lag_4',
-                'Sales_Rolling_2', 'Sales_Rolling_4', 'Sales_Rolling_8', 
-                'Month', 'WeekOfYear', 'IsWeekend']
-    
-    # Add month and week features if not present
-    if 'Month' not in train_product_store.columns:
-        train_product_store['Month'] = train_product_store['Week_Start'].dt.month
-        test_product_store['Month'] = test_product_store['Week_Start'].dt.month
-    
-    if 'WeekOfYear' not in train_product_store.columns:
-        train_product_store['WeekOfYear'] = train_product_store['Week_Start'].dt.isocalendar().week
-        test_product_store['WeekOfYear'] = test_product_store['Week_Start'].dt.isocalendar().week
-    
-    if 'IsWeekend' not in train_product_store.columns:
-        train_product_store['IsWeekend'] = 0  # Assuming weekly data, set to 0
-        test_product_store['IsWeekend'] = 0
-    
-    # Prepare features and target
-    X_train = train_product_store[features]
-    y_train = train_product_store['Sales_Quantity']
-    
-    X_test = test_product_store[features]
-    y_test = test_product_store['Sales_Quantity']
-    
-    # Scale the features
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    X_test_scaled = scaler.transform(X_test)
-    
-    # Train Random Forest model
+
+    # Prepare features and target (see MODEL_FEATURES for the feature columns)
+    _, y_train, train_weeks = feature_cache.get(product_id, store_id, 'train')
+    _, y_test, test_weeks = feature_cache.get(product_id, store_id, 'test')
+    train_weeks = pd.to_datetime(train_weeks)
+    test_weeks = pd.to_datetime(test_weeks)
+
+    # Train Random Forest model, evaluate it and forecast future demand
     print("Training Random Forest model...")
-    rf_model = RandomForestRegressor(n_estimators=100, random_state=42)
-    rf_model.fit(X_train_scaled, y_train)
-    
-    # Make predictions
-    print("Making predictions...")
-    y_pred = rf_model.predict(X_test_scaled)
-    
-    # Calculate evaluation metrics
-    mae = mean_absolute_error(y_test, y_pred)
-    rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-    r2 = r2_score(y_test, y_pred)
-    mape = np.mean(np.abs((y_test - y_pred) / y_test)) * 100
-    
-    print(f"Mean Absolute Error (MAE): {mae:.2f}")
-    print(f"Root Mean Squared Error (RMSE): {rmse:.2f}")
-    print(f"R² Score: {r2:.4f}")
-    print(f"Mean Absolute Percentage Error (MAPE): {mape:.2f}%")
-    
+    result = forecast_series(feature_cache, product_id, store_id, n_weeks=args.weeks, **rf_params)
+    rf_model = result['model']
+    y_pred = result['y_pred']
+    metrics = result['metrics']
+
+    print(f"Mean Absolute Error (MAE): {metrics['MAE']:.2f}")
+    print(f"Root Mean Squared Error (RMSE): {metrics['RMSE']:.2f}")
+    print(f"R² Score: {metrics['R2']:.4f}")
+    print(f"Mean Absolute Percentage Error (MAPE): {metrics['MAPE']:.2f}%")
+
     # Plot actual vs predicted values
     plt.figure(figsize=(12, 6))
-    plt.plot(test_product_store['Week_Start'], y_test, label='Actual Sales')
-    plt.plot(test_product_store['Week_Start'], y_pred, label='Predicted Sales')
+    plt.plot(test_weeks, y_test, label='Actual Sales')
+    plt.plot(test_weeks, y_pred, label='Predicted Sales')
     plt.title(f'Actual vs Predicted Sales for {product_id} at {store_id}')
     plt.xlabel('Week')
     plt.ylabel('Sales Quantity')
@@ -110,98 +433,37 @@ def main():
     plt.xticks(rotation=45)
     plt.tight_layout()
     plt.savefig(f'images/actual_vs_predicted_{product_id}_{store_id}.png')
-    
-    # Save the model
-    with open(f'models/rf_model_{product_id}_{store_id}.pkl', 'wb') as f:
-        pickle.dump(rf_model, f)
-    
-    # Forecast future demand
-    print("Forecasting future demand...")
-    
-    # Function to forecast next n weeks
-    def forecast_future_weeks(model, last_data, scaler, n_weeks=4):
-        future_predictions = []
-        current_features = last_data.copy()
-        
-        for i in range(n_weeks):
-            # Scale the features
-            current_features_scaled = scaler.transform([current_features])
-            
-            # Predict the next value
-            next_sales = model.predict(current_features_scaled)[0]
-            future_predictions.append(next_sales)
-            
-            # Update features for next prediction
-            # Shift lag values
-            current_features[0] = next_sales  # Sales_Lag_1 becomes the prediction
-            current_features[1] = current_features[0]  # Sales_Lag_2 becomes previous Sales_Lag_1
-            current_features[2] = current_features[1]  # Sales_Lag_3 becomes previous Sales_Lag_2
-            current_features[3] = current_features[2]  # Sales_Lag_4 becomes previous Sales_Lag_3
-            
-            # Update rolling averages (simplified)
-            current_features[4] = (current_features[0] + next_sales) / 2  # Sales_Rolling_2
-            current_features[5] = (current_features[0] + current_features[1] + current_features[2] + next_sales) / 4  # Sales_Rolling_4
-            # Keep Sales_Rolling_8 the same (simplified)
-            
-            # Update month and week (simplified)
-            # For a real implementation, would need to properly increment date features
-        
-        return future_predictions
-    
-    # Get the last data point from test set
-    last_data = X_test_scaled[-1].copy()
-    
-    # Forecast future weeks
-    future_predictions = forecast_future_weeks(rf_model, last_data, scaler, n_weeks=4)
-    
-    # Create dates for the future predictions
-    last_date = test_product_store['Week_Start'].iloc[-1]
-    future_dates = [last_date + timedelta(weeks=i+1) for i in range(len(future_predictions))]
-    
-    # Calculate optimal inventory levels
-    def calculate_optimal_inventory(forecasted_demand, safety_stock_factor=1.5, lead_time_days=3):
-        # Convert lead time from days to weeks (assuming 7 days per week)
-        lead_time_weeks = lead_time_days / 7
-        
-        # Calculate optimal inventory levels
-        optimal_inventory = []
-        for demand in forecasted_demand:
-            # Base inventory = forecasted demand + safety stock
-            base_inventory = demand * (1 + safety_stock_factor * lead_time_weeks)
-            optimal_inventory.append(round(base_inventory))
-        
-        return optimal_inventory
-    
-    optimal_inventory = calculate_optimal_inventory(future_predictions)
-    
-    # Create forecast dataframe
-    forecast_df = pd.DataFrame({
-        'Week_Start': future_dates,
-        'Forecasted_Sales': future_predictions,
-        'Optimal_Inventory': optimal_inventory
-    })
-    
+
+    # Save the model together with its scaler
+    ModelRegistry().save(product_id, store_id, rf_model, result['scaler'], feature_cache.features,
+                         result['training_window'], metrics)
+
+    forecast_df = result['forecast']
+    future_dates = list(forecast_df['Week_Start'])
+    future_predictions = list(forecast_df['Forecasted_Sales'])
+    last_date = test_weeks[-1]
+
     print("Forecast Results:")
     print(forecast_df)
-    
+
     # Save forecast results
     forecast_df.to_csv(f'data/processed/forecast_results_{product_id}_{store_id}.csv', index=False)
-    
+
     # Plot historical and forecasted sales
     plt.figure(figsize=(15, 6))
-    
+
     # Historical data
-    historical_dates = list(train_product_store['Week_Start']) + list(test_product_store['Week_Start'])
-    historical_sales = list(train_product_store['Sales_Quantity']) + list(test_product_store['Sales_Quantity'])
+    historical_dates = list(train_weeks) + list(test_weeks)
+    historical_sales = list(y_train) + list(y_test)
     plt.plot(historical_dates, historical_sales, label='Historical Sales', color='blue')
-    
+
     # Forecasted data
     plt.plot(future_dates, future_predictions, label='Forecasted Sales', color='red', linestyle='--', marker='o')
-    
+
     # Add vertical line to separate historical and forecasted data
     plt.axvline(x=last_date, color='gray', linestyle='--')
     plt.text(last_date, max(historical_sales), 'Forecast Start', ha='right', va='top')
-    
+
     plt.title(f'Historical and Forecasted Sales for {product_id} at {store_id}')
     plt.xlabel('Date')
     plt.ylabel('Sales Quantity')
@@ -210,16 +472,16 @@ def main():
     plt.xticks(rotation=45)
     plt.tight_layout()
     plt.savefig(f'images/historical_and_forecasted_sales_{product_id}_{store_id}.png')
-    
+
     # Plot forecasted sales and optimal inventory levels
     plt.figure(figsize=(12, 6))
-    
+
     # Bar chart for forecasted sales
     plt.bar(forecast_df['Week_Start'], forecast_df['Forecasted_Sales'], color='skyblue', label='Forecasted Sales')
-    
+
     # Line chart for optimal inventory
     plt.plot(forecast_df['Week_Start'], forecast_df['Optimal_Inventory'], color='red', marker='o', label='Optimal Inventory')
-    
+
     plt.title(f'Forecasted Sales and Optimal Inventory for {product_id} at {store_id}')
     plt.xlabel('Week')
     plt.ylabel('Quantity')
@@ -228,10 +490,10 @@ def main():
     plt.xticks(rotation=45)
     plt.tight_layout()
     plt.savefig(f'images/forecasted_sales_and_optimal_inventory_{product_id}_{store_id}.png')
-    
+
     print("Model training and forecasting complete!")
     print(f"Results saved to data/processed/forecast_results_{product_id}_{store_id}.csv")
     print(f"Visualizations saved to images/")
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
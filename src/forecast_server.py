@@ -0,0 +1,363 @@
+"""
+Local HTTP service for sales forecasts and inventory levels.
+
+The service answers from models that are already trained: per-series models
+come from the model registry (kept in its LRU cache once loaded) or a single
+global model is loaded from its pickle. The latest weekly sales history of
+every series is built once at startup, so a request only runs the batched
+recursive forecaster.
+
+Concurrent single-series requests are micro-batched: requests that arrive
+within ``batch_window`` seconds of each other are forecast together, with one
+predict call per horizon step for the global model (or per series model).
+
+Endpoints:
+    GET  /forecast?product=P001&store=S01&horizon=4
+    POST /forecast/batch   {"series": [{"product": "P001", "store": "S01"}, ...], "horizon": 4}
+    GET  /inventory?product=P001&store=S01&horizon=4&service_level=0.95&lead_time_days=3
+    GET  /stats            request counts and p50/p99 latency per endpoint
+    GET  /health
+
+ForecastService.handle() implements the routing without any networking, so
+the API can be exercised in-process; ``python src/forecast_server.py`` serves
+it with the standard library's ThreadingHTTPServer.
+"""
+import argparse
+import json
+import os
+import pickle
+import queue
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):
+    # Allow running as `python src/forecast_server.py` from the project root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_loader import load_processed
+from src.feature_cache import MODEL_FEATURES, TARGET
+from src.feature_engineering import SERIES_KEYS
+from src.inventory_optimization import (DEFAULT_SERVICE_LEVEL, calculate_optimal_inventory, inventory_plan,
+                                         store_lead_times)
+from src.model_registry import REGISTRY_DIR, ModelRegistry
+from src.recursive_forecast import RecursiveForecaster, history_length, history_matrix
+
+MAX_HORIZON = 52
+LATENCY_SAMPLES = 10000
+
+
+class ServiceError(Exception):
+    """Request error carrying the HTTP status to answer with"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class MicroBatcher:
+    """Collect concurrent forecast requests and run them as one batch"""
+
+    def __init__(self, forecast_batch, batch_window=0.002, max_batch=256):
+        """
+        Args:
+            forecast_batch: function (keys, horizon) -> (predictions, weeks) arrays,
+                one row per key
+            batch_window: seconds to wait for more requests after the first one
+            max_batch: maximum number of requests per batch
+        """
+        self.forecast_batch = forecast_batch
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self._requests = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, key, horizon):
+        """Queue one request; returns a Future of (predictions, weeks) for the key"""
+        future = Future()
+        self._requests.put((key, horizon, future))
+        return future
+
+    def _collect(self):
+        batch = [self._requests.get()]
+        deadline = time.perf_counter() + self.batch_window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            keys = list(dict.fromkeys(key for key, _, _ in batch))
+            horizon = max(h for _, h, _ in batch)
+            try:
+                predictions, weeks = self.forecast_batch(keys, horizon)
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            rows = {key: i for i, key in enumerate(keys)}
+            for key, h, future in batch:
+                future.set_result((predictions[rows[key], :h], weeks[rows[key], :h]))
+
+
+class ForecastService:
+    """Forecasts from pre-trained models and in-memory sales histories"""
+
+    def __init__(self, registry_dir=REGISTRY_DIR, global_model_path=None, cache_size=128,
+                 batch_window=0.002, max_batch=256, store_dir=None):
+        """
+        Args:
+            registry_dir: model registry with the per-series models
+            global_model_path: pickled GlobalForecaster to use for every series instead
+            cache_size: number of per-series models kept loaded
+            batch_window, max_batch: micro-batching settings
+            store_dir: processed store to read the sales histories from (default location when None)
+        """
+        self.registry = ModelRegistry(registry_dir, cache_size=cache_size)
+        self.global_model = None
+        if global_model_path is not None:
+            with open(global_model_path, 'rb') as f:
+                self.global_model = pickle.load(f)
+        self.features = self.global_model.features if self.global_model else MODEL_FEATURES
+        self.store_dir = store_dir
+        self.load_histories()
+        self.batcher = MicroBatcher(self.forecast_batch, batch_window, max_batch)
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_SAMPLES))
+        self._lock = threading.Lock()
+
+    def load_histories(self):
+        """(Re)build the most recent sales window of every series from the processed data"""
+        lags = [col for col in self.features if col.startswith('Sales_Lag_')]
+        kwargs = {} if self.store_dir is None else {'store_dir': self.store_dir}
+        data = load_processed(columns=SERIES_KEYS + ['Category', 'Region', 'Week_Start', TARGET] + lags, **kwargs)
+        keys, self.history, self.last_weeks = history_matrix(data, history_length(self.features),
+                                                             key_columns=['Category', 'Region'])
+        self.series = keys
+        self._rows = {(p, s): i for i, (p, s) in
+                      enumerate(zip(keys['Product_ID'].astype(str), keys['Store_ID'].astype(str)))}
+        stores = keys['Store_ID'].astype(str).unique()
+        self.lead_times = dict(zip(stores, store_lead_times(stores)))
+        self.registry.reload()
+
+    def _row(self, key):
+        if key not in self._rows:
+            raise ServiceError(404, f"Unknown product-store series {key[0]}/{key[1]}")
+        if self.global_model is None and key not in self.registry:
+            raise ServiceError(404, f"No trained model for {key[0]}/{key[1]}")
+        return self._rows[key]
+
+    def forecast_batch(self, keys, horizon):
+        """Forecast ``horizon`` weeks for each key; returns (predictions, weeks) with one row per key"""
+        rows = np.array([self._row(key) for key in keys])
+        history, last_weeks = self.history[rows], self.last_weeks[rows]
+        if self.global_model is not None:
+            model = self.global_model
+            keys_frame = self.series.iloc[rows]
+            ids = np.column_stack([model._encode(keys_frame[col], col) for col in model.id_features])
+            forecaster = RecursiveForecaster(lambda X: model.model.predict(np.hstack([X, ids])), self.features)
+            return forecaster.forecast(history, last_weeks, horizon)
+
+        # Per-series models: one predict call per step for each distinct series
+        predictions = np.empty((len(keys), horizon))
+        weeks = np.empty((len(keys), horizon), dtype='datetime64[ns]')
+        for i, key in enumerate(keys):
+            forecaster = RecursiveForecaster(self.registry.predictor(*key), self.features)
+            predictions[i:i + 1], weeks[i:i + 1] = forecaster.forecast(history[i:i + 1], last_weeks[i:i + 1],
+                                                                       horizon)
+        return predictions, weeks
+
+    @staticmethod
+    def _records(key, predictions, weeks):
+        return {'product': key[0], 'store': key[1],
+                'forecast': [{'Week_Start': f'{pd.Timestamp(week):%Y-%m-%d}', 'Forecasted_Sales': float(value)}
+                             for week, value in zip(weeks, predictions)]}
+
+    def forecast(self, product, store, horizon=4):
+        """Forecast one series through the micro-batcher"""
+        key = (product, store)
+        self._row(key)
+        predictions, weeks = self.batcher.submit(key, horizon).result()
+        return self._records(key, predictions, weeks)
+
+    def forecast_many(self, series, horizon=4):
+        """Forecast a list of (product, store) pairs in one batch"""
+        keys = [tuple(key) for key in series]
+        predictions, weeks = self.forecast_batch(keys, horizon)
+        return [self._records(key, predictions[i], weeks[i]) for i, key in enumerate(keys)]
+
+    def inventory(self, product, store, horizon=4, safety_stock_factor=1.5, lead_time_days=None,
+                  service_level=DEFAULT_SERVICE_LEVEL):
+        """
+        Forecast plus the inventory plan of each week.
+
+        Optimal_Inventory is the fixed safety-factor level; when the series'
+        model has a recorded test RMSE, the service-level safety stock,
+        reorder point, order-up-to level and order quantity (starting from
+        an empty position) are added too. The lead time defaults to the store's.
+        """
+        result = self.forecast(product, store, horizon)
+        lead_time_days = self.lead_times[store] if lead_time_days is None else lead_time_days
+        demand = np.array([week['Forecasted_Sales'] for week in result['forecast']])
+        plan = {'Optimal_Inventory': calculate_optimal_inventory(demand, safety_stock_factor, lead_time_days)}
+        if self.global_model is None and 'RMSE' in self.registry.entry(product, store)['metrics']:
+            sigma = self.registry.entry(product, store)['metrics']['RMSE']
+            plan.update({name: values[0] for name, values in
+                         inventory_plan(demand, sigma, lead_time_days, service_level).items()})
+        for i, week in enumerate(result['forecast']):
+            week.update({name: int(values[i]) for name, values in plan.items()})
+        result['lead_time_days'] = float(lead_time_days)
+        return result
+
+    def record_latency(self, endpoint, seconds):
+        with self._lock:
+            self._latencies[endpoint].append(seconds)
+
+    def stats(self):
+        """Request count and p50/p99 latency in milliseconds per endpoint (recent requests)"""
+        with self._lock:
+            samples = {endpoint: np.array(values) for endpoint, values in self._latencies.items()}
+        return {endpoint: {'count': len(values),
+                           'p50_ms': float(np.percentile(values, 50) * 1000),
+                           'p99_ms': float(np.percentile(values, 99) * 1000)}
+                for endpoint, values in samples.items() if len(values)}
+
+    def handle(self, method, path, query=None, body=None):
+        """
+        Route one request. ``query`` maps parameter names to values and
+        ``body`` is the decoded JSON body. Returns (status, payload).
+        """
+        query = query or {}
+        start = time.perf_counter()
+        try:
+            status, payload = 200, self._dispatch(method, path, query, body)
+        except ServiceError as e:
+            status, payload = e.status, {'error': str(e)}
+        except Exception as e:
+            # Model loading or prediction failures still answer with JSON and count in /stats
+            status, payload = 500, {'error': f"{type(e).__name__}: {e}"}
+        if path not in ('/stats', '/health'):
+            self.record_latency(path, time.perf_counter() - start)
+        return status, payload
+
+    def _dispatch(self, method, path, query, body):
+        if method == 'GET' and path == '/health':
+            return {'status': 'ok', 'series': len(self._rows)}
+        if method == 'GET' and path == '/stats':
+            return self.stats()
+        if method == 'GET' and path == '/forecast':
+            return self.forecast(*_series_param(query), horizon=_horizon(query.get('horizon', 4)))
+        if method == 'GET' and path == '/inventory':
+            service_level = _number(query, 'service_level', DEFAULT_SERVICE_LEVEL)
+            if not 0 < service_level < 1:
+                raise ServiceError(400, "'service_level' must be between 0 and 1")
+            return self.inventory(*_series_param(query), horizon=_horizon(query.get('horizon', 4)),
+                                  safety_stock_factor=_number(query, 'safety_stock_factor', 1.5),
+                                  lead_time_days=_number(query, 'lead_time_days', None),
+                                  service_level=service_level)
+        if method == 'POST' and path == '/forecast/batch':
+            if not isinstance(body, dict) or not isinstance(body.get('series'), list):
+                raise ServiceError(400, "Body must be a JSON object with a 'series' list")
+            series = [_series_param(item) for item in body['series']]
+            return {'forecasts': self.forecast_many(series, _horizon(body.get('horizon', 4)))}
+        raise ServiceError(404, f"No route for {method} {path}")
+
+
+def _series_param(params):
+    if not isinstance(params, dict) or not params.get('product') or not params.get('store'):
+        raise ServiceError(400, "'product' and 'store' are required")
+    return str(params['product']), str(params['store'])
+
+
+def _horizon(value):
+    try:
+        horizon = int(value)
+    except (TypeError, ValueError):
+        raise ServiceError(400, "'horizon' must be an integer")
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ServiceError(400, f"'horizon' must be between 1 and {MAX_HORIZON}")
+    return horizon
+
+
+def _number(query, name, default):
+    if name not in query:
+        return default
+    try:
+        return float(query[name])
+    except (TypeError, ValueError):
+        raise ServiceError(400, f"'{name}' must be a number")
+
+
+def make_handler(service):
+    """BaseHTTPRequestHandler class serving ``service``"""
+
+    class ForecastRequestHandler(BaseHTTPRequestHandler):
+        def _respond(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+            self._respond(*service.handle('GET', url.path, query))
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                body = json.loads(self.rfile.read(length) or b'null')
+            except json.JSONDecodeError:
+                self._respond(400, {'error': "Body must be valid JSON"})
+                return
+            self._respond(*service.handle('POST', url.path, body=body))
+
+        def log_message(self, format, *args):
+            pass  # Latency is tracked by the service; keep stderr quiet
+
+    return ForecastRequestHandler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve sales forecasts over HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--registry', default=REGISTRY_DIR, help="Model registry with the per-series models")
+    parser.add_argument('--global-model', help="Pickled global model to serve every series with instead")
+    parser.add_argument('--batch-window-ms', type=float, default=2.0,
+                        help="How long to wait for concurrent requests to batch together")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    service = ForecastService(args.registry, args.global_model, batch_window=args.batch_window_ms / 1000)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Serving forecasts for {len(service._rows)} series on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+Materialized forecasts for every product-store series.
+
+Forecasts are kept in one Parquet table keyed by (Product_ID, Store_ID,
+As_Of_Week, Horizon) and sorted in that order, where As_Of_Week is the last
+observed week the forecast starts from and Horizon counts weeks ahead of it.
+Every row is tagged with the series' data watermark (its last week plus a
+hash of its weekly sales, so revised history changes it too) and the
+version of the registry model that produced it.
+
+refresh() compares the current watermarks and model versions with the
+latest stored forecast of each series and re-forecasts only the series
+where one of them changed, using the registered models (no retraining).
+Readers such as the dashboards call ForecastStore.read() and get the stored
+rows directly.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):
+    # Allow running as `python src/forecast_store.py` from the project root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_loader import load_forecast_results, load_processed
+from src.feature_cache import MODEL_FEATURES, TARGET
+from src.feature_engineering import SERIES_KEYS, series_starts, sort_series_frame
+from src.inventory_optimization import calculate_optimal_inventory
+from src.model_registry import REGISTRY_DIR, ModelRegistry
+from src.recursive_forecast import RecursiveForecaster, history_length, history_matrix
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+FORECAST_STORE_DIR = 'data/processed/forecast_store'
+FORECAST_FILE = 'forecasts.parquet'
+ROW_KEYS = SERIES_KEYS + ['As_Of_Week', 'Horizon']
+LAG_FEATURES = [col for col in MODEL_FEATURES if col.startswith('Sales_Lag_')]
+COLUMNS = ROW_KEYS + ['Week_Start', 'Forecasted_Sales', 'Optimal_Inventory', 'Watermark', 'Model_Version']
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for the forecast store (pip install pyarrow)")
+
+
+def series_watermarks(data):
+    """
+    Data watermark of every series in ``data`` (weekly rows with Week_Start and the target).
+
+    Returns one row per series with Product_ID, Store_ID, As_Of_Week (its
+    last week) and Watermark, a string that changes when a week is added or
+    any weekly sales value of the series changes.
+    """
+    data = sort_series_frame(data)
+    starts = np.flatnonzero(series_starts(data))
+    ends = np.append(starts[1:], len(data))
+    row_hashes = pd.util.hash_pandas_object(data[['Week_Start', TARGET]], index=False).to_numpy()
+    # Summing uint64 hashes wraps around, which is fine for a fingerprint
+    series_hashes = np.add.reduceat(row_hashes, starts) if len(data) else row_hashes
+    last_weeks = pd.DatetimeIndex(data['Week_Start'].to_numpy()[ends - 1])
+    watermarks = data.iloc[ends - 1][SERIES_KEYS].astype(str).reset_index(drop=True)
+    watermarks['As_Of_Week'] = last_weeks
+    watermarks['Watermark'] = [f'{week:%Y-%m-%d}/{h:016x}' for week, h in zip(last_weeks, series_hashes)]
+    return watermarks
+
+
+class ForecastStore:
+    """Parquet table of materialized forecasts keyed by series, as-of week and horizon"""
+
+    def __init__(self, root=FORECAST_STORE_DIR):
+        _require_pyarrow()
+        self.root = root
+
+    @property
+    def path(self):
+        return os.path.join(self.root, FORECAST_FILE)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def read(self, products=None, stores=None, as_of=None, latest=True):
+        """
+        Stored forecasts sorted by series, as-of week and horizon.
+
+        Args:
+            products, stores: only read these product / store IDs
+            as_of: only forecasts made from this last observed week
+            latest: keep only each series' most recent as-of week (ignored when ``as_of`` is given)
+        """
+        if not self.exists():
+            return pd.DataFrame(columns=COLUMNS)
+        filters = []
+        for col, values in [('Product_ID', products), ('Store_ID', stores)]:
+            if values is not None:
+                filters.append((col, 'in', [str(value) for value in values]))
+        if as_of is not None:
+            filters.append(('As_Of_Week', '=', pd.Timestamp(as_of)))
+        frame = pq.read_table(self.path, filters=filters or None).to_pandas()
+        if latest and as_of is None and len(frame):
+            newest = frame.groupby(SERIES_KEYS)['As_Of_Week'].transform('max')
+            frame = frame[frame['As_Of_Week'] == newest]
+        return frame.reset_index(drop=True)
+
+    def write(self, forecasts):
+        """Replace the table contents with ``forecasts``"""
+        os.makedirs(self.root, exist_ok=True)
+        table = pa.Table.from_pandas(forecasts.sort_values(ROW_KEYS)[COLUMNS], preserve_index=False)
+        tmp_path = self.path + '.tmp'
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, self.path)
+
+    def upsert(self, forecasts):
+        """Insert ``forecasts``, replacing stored rows of the same series and as-of week"""
+        existing = self.read(latest=False)
+        if len(existing):
+            replaced = pd.MultiIndex.from_frame(forecasts[SERIES_KEYS + ['As_Of_Week']].drop_duplicates())
+            stale = pd.MultiIndex.from_frame(existing[SERIES_KEYS + ['As_Of_Week']]).isin(replaced)
+            forecasts = pd.concat([existing[~stale], forecasts], ignore_index=True)
+        self.write(forecasts)
+
+    def stale(self, current, n_weeks):
+        """
+        Series of ``current`` whose latest stored forecast is missing or out of date.
+
+        ``current`` has Product_ID, Store_ID, As_Of_Week, Watermark and
+        Model_Version per series; a stored forecast is up to date when its
+        watermark and model version match and it covers ``n_weeks`` horizons.
+        """
+        stored = self.read(products=current['Product_ID'].unique(), stores=current['Store_ID'].unique())
+        stored = stored.groupby(SERIES_KEYS + ['Watermark', 'Model_Version'], as_index=False)['Horizon'].max()
+        merged = current.merge(stored, on=SERIES_KEYS, how='left', suffixes=('', '_stored'))
+        fresh = ((merged['Watermark_stored'] == merged['Watermark'])
+                 & (merged['Model_Version_stored'] == merged['Model_Version'])
+                 & (merged['Horizon'] >= n_weeks))
+        return current[~fresh.to_numpy()].reset_index(drop=True)
+
+
+def load_series_forecast(product_id, store_id, root=FORECAST_STORE_DIR, fallback_path=None):
+    """
+    Latest materialized forecast of one series, falling back to a forecast CSV.
+
+    Returns None when neither the store nor ``fallback_path`` has it.
+    """
+    if pa is not None and ForecastStore(root).exists():
+        forecast = ForecastStore(root).read(products=[product_id], stores=[store_id])
+        if len(forecast):
+            return forecast
+    if fallback_path is not None and os.path.exists(fallback_path):
+        return load_forecast_results(fallback_path)
+    return None
+
+
+def refresh(products=None, stores=None, n_weeks=4, registry_dir=REGISTRY_DIR, root=FORECAST_STORE_DIR,
+            verbose=True, **load_kwargs):
+    """
+    Bring the stored forecasts up to date with the processed data and the model registry.
+
+    Only series with a registered model are materialized; series whose
+    watermark and model version are unchanged are served from the store.
+
+    Args:
+        products, stores: only refresh these product / store IDs (all when None)
+        n_weeks: forecast horizon in weeks
+        registry_dir: model registry to forecast with
+        root: forecast store directory
+        load_kwargs: passed to load_processed (e.g. store_dir)
+
+    Returns:
+        dict with the number of series, cache hits and refreshed series
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    registry = ModelRegistry(registry_dir)
+    store = ForecastStore(root)
+    data = load_processed(columns=SERIES_KEYS + ['Week_Start', TARGET] + LAG_FEATURES,
+                          products=products, stores=stores, **load_kwargs)
+
+    current = series_watermarks(data)
+    registered = np.array([key in registry for key in zip(current['Product_ID'], current['Store_ID'])],
+                          dtype=bool)
+    if (~registered).any():
+        log(f"Skipping {(~registered).sum()} series without a registered model (run forecast_model.py --all)")
+    current = current[registered].reset_index(drop=True)
+    current['Model_Version'] = [registry.entry(p, s)['version']
+                                for p, s in zip(current['Product_ID'], current['Store_ID'])]
+
+    start = time.perf_counter()
+    stale = store.stale(current, n_weeks)
+    if len(stale):
+        stale_keys = pd.MultiIndex.from_frame(stale[SERIES_KEYS].astype(str))
+        stale_rows = data[pd.MultiIndex.from_frame(data[SERIES_KEYS].astype(str)).isin(stale_keys)]
+        keys, history, last_weeks = history_matrix(stale_rows, history_length(MODEL_FEATURES))
+        rows = {key: i for i, key in enumerate(zip(keys['Product_ID'].astype(str), keys['Store_ID'].astype(str)))}
+
+        forecasts = []
+        for series in stale.itertuples(index=False):
+            i = rows[(series.Product_ID, series.Store_ID)]
+            features = registry.entry(series.Product_ID, series.Store_ID)['features']
+            forecaster = RecursiveForecaster(registry.predictor(series.Product_ID, series.Store_ID), features)
+            predictions, weeks = forecaster.forecast(history[i:i + 1], last_weeks[i:i + 1], n_weeks)
+            forecasts.append(pd.DataFrame({
+                'Product_ID': series.Product_ID,
+                'Store_ID': series.Store_ID,
+                'As_Of_Week': series.As_Of_Week,
+                'Horizon': np.arange(1, n_weeks + 1),
+                'Week_Start': weeks[0],
+                'Forecasted_Sales': predictions[0],
+                'Optimal_Inventory': calculate_optimal_inventory(predictions[0]),
+                'Watermark': series.Watermark,
+                'Model_Version': series.Model_Version,
+            }))
+        store.upsert(pd.concat(forecasts, ignore_index=True))
+
+    stats = {'series': len(current), 'hits': len(current) - len(stale), 'refreshed': len(stale)}
+    log(f"Forecast store: {stats['hits']} of {stats['series']} series up to date, "
+        f"refreshed {stats['refreshed']} in {time.perf_counter() - start:.2f}s")
+    return stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Materialize forecasts of the registered models")
+    parser.add_argument('--products', nargs='+', help="Only refresh these product IDs")
+    parser.add_argument('--stores', nargs='+', help="Only refresh these store IDs")
+    parser.add_argument('--weeks', type=int, default=4, help="Forecast horizon in weeks")
+    parser.add_argument('--registry', default=REGISTRY_DIR, help="Model registry to forecast with")
+    parser.add_argument('--output', default=FORECAST_STORE_DIR, help="Forecast store directory")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    refresh(args.products, args.stores, args.weeks, args.registry, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,18 @@
 import os
-import pandas as pd
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 
+if __package__ in (None, ''):
+    # Allow running as `python src/generate_html_report.py` from the project root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_loader import load_processed
+from src.forecast_store import load_series_forecast
+from src.sales_tensor import SalesTensor
+
 # Set plotting style
 plt.style.use('seaborn-v0_8-whitegrid')
 sns.set_palette('Set2')
@@ -21,21 +29,14 @@ def generate_visualizations():
     print("Loading data...")
     # Load data
     try:
-        weekly_data = pd.read_csv("data/processed/weekly_data.csv")
-        weekly_data['Week_Start'] = pd.to_datetime(weekly_data['Week_Start'])
-        
-        train_data = pd.read_csv("data/processed/train_data.csv")
-        train_data['Week_Start'] = pd.to_datetime(train_data['Week_Start'])
+        weekly_data = load_processed(columns=['Product_ID', 'Store_ID', 'Week_Start',
+                                              'Sales_Quantity', 'Inventory_Level'])
+        # Dense product x store x week arrays; aggregates are array sums, not groupbys
+        sales_tensor = SalesTensor.from_frame(weekly_data, value_columns=('Sales_Quantity', 'Inventory_Level'))
         
-        test_data = pd.read_csv("data/processed/test_data.csv")
-        test_data['Week_Start'] = pd.to_datetime(test_data['Week_Start'])
-        
-        forecast_path = "data/processed/forecast_results_P001_S01.csv"
-        if os.path.exists(forecast_path):
-            forecast_data = pd.read_csv(forecast_path)
-            forecast_data['Week_Start'] = pd.to_datetime(forecast_data['Week_Start'])
-        else:
-            forecast_data = None
+        # Materialized forecasts when available; the single-series CSV otherwise
+        forecast_data = load_series_forecast('P001', 'S01',
+                                             fallback_path="data/processed/forecast_results_P001_S01.csv")
     except Exception as e:
         print(f"Error loading data: {e}")
         return
@@ -44,7 +45,7 @@ def generate_visualizations():
     
     # 1. Weekly sales trend
     plt.figure(figsize=(10, 5))
-    sales_by_date = weekly_data.groupby('Week_Start')['Sales_Quantity'].sum().reset_index()
+    sales_by_date = sales_tensor.weekly_totals().reset_index()
     plt.plot(sales_by_date['Week_Start'], sales_by_date['Sales_Quantity'], marker='o', linestyle='-')
     plt.title('Weekly Sales Trend')
     plt.xlabel('Date')
@@ -57,8 +58,8 @@ def generate_visualizations():
     
     # 2. Top products by sales
     plt.figure(figsize=(10, 5))
-    product_sales = weekly_data.groupby('Product_ID')['Sales_Quantity'].sum().sort_values(ascending=False).head(5)
-    sns.barplot(x=product_sales.index, y=product_sales.values)
+    product_sales = sales_tensor.product_totals().sort_values(ascending=False).head(5)
+    sns.barplot(x=product_sales.index.astype(str), y=product_sales.values)
     plt.title('Top 5 Products by Sales')
     plt.xlabel('Product ID')
     plt.ylabel('Total Sales')
@@ -70,8 +71,8 @@ def generate_visualizations():
     
     # 3. Top stores by sales
     plt.figure(figsize=(10, 5))
-    store_sales = weekly_data.groupby('Store_ID')['Sales_Quantity'].sum().sort_values(ascending=False).head(5)
-    sns.barplot(x=store_sales.index, y=store_sales.values)
+    store_sales = sales_tensor.store_totals().sort_values(ascending=False).head(5)
+    sns.barplot(x=store_sales.index.astype(str), y=store_sales.values)
     plt.title('Top 5 Stores by Sales')
     plt.xlabel('Store ID')
     plt.ylabel('Total Sales')
@@ -94,31 +95,36 @@ def generate_visualizations():
     # 5. Forecast visualization (if available)
     if forecast_data is not None:
         # Get historical data for P001 and S01
-        historical_data = weekly_data[(weekly_data['Product_ID'] == 'P001') & 
-                                     (weekly_data['Store_ID'] == 'S01')].sort_values('Week_Start')
-        
-        plt.figure(figsize=(10, 5))
-        # Plot historical data
-        plt.plot(historical_data['Week_Start'].tail(12), historical_data['Sales_Quantity'].tail(12), 
-                marker='o', linestyle='-', color='blue', label='Historical Sales')
+        try:
+            historical_data = sales_tensor.series('P001', 'S01')
+        except KeyError:
+            historical_data = None
+        has_history = historical_data is not None and not historical_data.empty
+        if not has_history:
+            print("No sales history for Product P001 at Store S01, skipping the forecast plot")
+        else:
+            plt.figure(figsize=(10, 5))
+            # Plot historical data
+            plt.plot(historical_data['Week_Start'].tail(12), historical_data['Sales_Quantity'].tail(12), 
+                    marker='o', linestyle='-', color='blue', label='Historical Sales')
         
-        # Plot forecast
-        plt.plot(forecast_data['Week_Start'], forecast_data['Forecasted_Sales'], 
-                marker='s', linestyle='--', color='red', label='Forecasted Sales')
+            # Plot forecast
+            plt.plot(forecast_data['Week_Start'], forecast_data['Forecasted_Sales'], 
+                    marker='s', linestyle='--', color='red', label='Forecasted Sales')
         
-        # Add vertical line to separate historical and forecasted data
-        last_historical_date = historical_data['Week_Start'].max()
-        plt.axvline(x=last_historical_date, color='gray', linestyle='--')
+            # Add vertical line to separate historical and forecasted data
+            last_historical_date = historical_data['Week_Start'].max()
+            plt.axvline(x=last_historical_date, color='gray', linestyle='--')
         
-        plt.title('Sales Forecast for Product P001 at Store S01')
-        plt.xlabel('Date')
-        plt.ylabel('Sales Quantity')
-        plt.legend()
-        plt.grid(True)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig('reports/html_images/sales_forecast.png', dpi=300)
-        plt.close()
+            plt.title('Sales Forecast for Product P001 at Store S01')
+            plt.xlabel('Date')
+            plt.ylabel('Sales Quantity')
+            plt.legend()
+            plt.grid(True)
+            plt.xticks(rotation=45)
+            plt.tight_layout()
+            plt.savefig('reports/html_images/sales_forecast.png', dpi=300)
+            plt.close()
         
         # 6. Optimal inventory visualization
         plt.figure(figsize=(10, 5))
@@ -0,0 +1,88 @@
+"""
+Global forecasting model shared by all product-store series.
+
+Instead of one Random Forest per series, a single gradient-boosted model is
+trained on the rows of every series at once. Product_ID, Store_ID, Category
+and Region are encoded as integer codes and passed alongside the lag, rolling
+and calendar features, so the model can learn per-series levels while pooling
+the seasonal and autoregressive patterns across series. Prediction and the
+multi-week forecast run on all series in one batched call per step.
+"""
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+from src.feature_cache import MODEL_FEATURES, TARGET, add_calendar_features
+from src.recursive_forecast import RecursiveForecaster, history_length, history_matrix
+
+ID_FEATURES = ['Product_ID', 'Store_ID', 'Category', 'Region']
+
+# HistGradientBoosting handles at most this many categories per native categorical feature;
+# ID columns with more distinct values are passed as ordinal codes instead
+MAX_NATIVE_CATEGORIES = 255
+
+DEFAULT_PARAMS = {'max_iter': 300, 'learning_rate': 0.05, 'min_samples_leaf': 20, 'random_state': 42}
+
+
+class GlobalForecaster:
+    """One HistGradientBoostingRegressor over all series with encoded ID features"""
+
+    def __init__(self, features=MODEL_FEATURES, id_features=ID_FEATURES, **params):
+        self.features = list(features)
+        self.id_features = list(id_features)
+        self.params = {**DEFAULT_PARAMS, **params}
+        self.categories = {}
+        self.model = None
+
+    @property
+    def columns(self):
+        return self.features + self.id_features
+
+    def _encode(self, values, col):
+        codes = pd.Categorical(values.astype(str), categories=self.categories[col]).codes.astype(np.float64)
+        codes[codes < 0] = np.nan  # IDs unseen in training are treated as missing
+        return codes
+
+    def design_matrix(self, data):
+        """2-D float array of the model features followed by the encoded ID features"""
+        data = add_calendar_features(data)
+        X = np.empty((len(data), len(self.columns)), dtype=np.float64)
+        for j, col in enumerate(self.features):
+            X[:, j] = data[col].to_numpy(dtype=np.float64)
+        for j, col in enumerate(self.id_features, start=len(self.features)):
+            X[:, j] = self._encode(data[col], col)
+        return X
+
+    def fit(self, data):
+        """Fit on weekly feature rows of any number of series"""
+        self.categories = {col: np.sort(data[col].astype(str).unique()) for col in self.id_features}
+        native = [len(self.categories[col]) <= MAX_NATIVE_CATEGORIES for col in self.id_features]
+        self.model = HistGradientBoostingRegressor(
+            categorical_features=[False] * len(self.features) + native, **self.params)
+        self.model.fit(self.design_matrix(data), data[TARGET].to_numpy(dtype=np.float64))
+        return self
+
+    def predict(self, data):
+        return self.model.predict(self.design_matrix(data))
+
+    def forecast(self, data, n_weeks=4):
+        """
+        Recursively forecast ``n_weeks`` after the last week of every series in ``data``.
+
+        ``data`` holds the weekly feature rows of the series (at least their
+        most recent weeks). Each step predicts all series in one call; see
+        RecursiveForecaster for how the features are rolled forward. Returns
+        one row per series and week with Product_ID, Store_ID, Week_Start and
+        Forecasted_Sales.
+        """
+        keys, history, last_weeks = history_matrix(data, history_length(self.features),
+                                                   key_columns=self.id_features)
+        ids = np.column_stack([self._encode(keys[col], col) for col in self.id_features])
+        forecaster = RecursiveForecaster(lambda X: self.model.predict(np.hstack([X, ids])), self.features)
+        predictions, weeks = forecaster.forecast(history, last_weeks, n_weeks)
+        return pd.DataFrame({
+            'Product_ID': np.repeat(keys['Product_ID'].astype(str).to_numpy(), n_weeks),
+            'Store_ID': np.repeat(keys['Store_ID'].astype(str).to_numpy(), n_weeks),
+            'Week_Start': weeks.ravel(),
+            'Forecasted_Sales': predictions.ravel(),
+        })
@@ -0,0 +1,234 @@
+"""
+Hierarchical forecasting across products, categories, stores and regions.
+
+The leaves are the product-store series. Every product belongs to one
+Category and every store to one Region, which gives the aggregation levels
+
+    Total, Category, Region, Category x Region, Product, Store, Series
+
+and a sparse 0/1 summing matrix S (one row per node, one column per leaf)
+with y_node = S @ y_leaf. Sales of every node come from the dense weekly
+tensor (sales_tensor.py) as one sparse-dense product, and all nodes are
+forecast in one batch by the baselines of baseline_models.py.
+
+Base forecasts of different levels don't add up. Reconciliation maps them
+to coherent ones, y~ = S b with
+
+    b = argmin (S b - y^)' W (S b - y^)   i.e.   (S' W S) b = S' W y^
+
+- bottom_up: b = the leaves' base forecasts,
+- ols: W = I,
+- mint_diag: W = diag(1 / sigma^2), the inverse of each node's base-forecast
+  error variance on the holdout weeks (MinT with a diagonal covariance).
+
+S' W S is never formed: the Total, Category and Region rows touch many
+leaves, so it would be nearly dense. Because S is the aggregate rows A on
+top of an identity, the Woodbury identity reduces the normal equations to a
+sparse system over the aggregate nodes only (a few per product and store),
+which is LU-factored once and solved for all forecast weeks together. Work
+and memory grow with the number of non-zeros of S, i.e. linearly with the
+number of leaf series.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import splu
+
+if __package__ in (None, ''):
+    # Allow running as `python src/hierarchical.py` from the project root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.baseline_models import HOLDOUT_WEEKS, forecast_baselines
+from src.feature_engineering import SERIES_KEYS
+from src.sales_tensor import WEEK, SalesTensor
+
+HIERARCHY_PATH = 'data/processed/hierarchical_forecasts.csv'
+# Aggregation levels from the top down and the leaf attributes that key them
+LEVELS = {
+    'Total': [],
+    'Category': ['Category'],
+    'Region': ['Region'],
+    'Category_Region': ['Category', 'Region'],
+    'Product': ['Product_ID'],
+    'Store': ['Store_ID'],
+    'Series': SERIES_KEYS,
+}
+METHODS = ('bottom_up', 'ols', 'mint_diag')
+
+
+def hierarchy(leaves, levels=LEVELS):
+    """
+    Nodes and summing matrix of a hierarchy over ``leaves``.
+
+    Args:
+        leaves: one row per leaf series with the columns ``levels`` refer to
+        levels: level name -> key columns; the last level must have one node per leaf
+
+    Returns:
+        (nodes, S) where ``nodes`` has Level and Key per node and ``S`` is a
+        CSR matrix of shape (n_nodes, n_leaves)
+    """
+    leaves = leaves.reset_index(drop=True).astype(str)
+    n_leaves = len(leaves)
+    rows, names, keys = [], [], []
+    n_nodes = 0
+    for i, (level, columns) in enumerate(levels.items()):
+        if not columns:
+            codes, labels = np.zeros(n_leaves, dtype=np.int64), pd.Series(['Total'])
+        else:
+            codes = leaves.groupby(columns, sort=True).ngroup().to_numpy()
+            first = leaves.iloc[np.unique(codes, return_index=True)[1]]
+            labels = first[columns[0]].str.cat([first[column] for column in columns[1:]], sep='/')
+        if i == len(levels) - 1:
+            if len(labels) != n_leaves:
+                raise ValueError("The last level must have one node per leaf")
+            # Bottom rows in leaf order, so that they line up with the columns of S
+            labels = labels.iloc[np.argsort(np.unique(codes, return_index=True)[1])]
+            codes = np.arange(n_leaves)
+        rows.append(n_nodes + codes)
+        names.append(np.full(len(labels), level, dtype=object))
+        keys.append(labels.to_numpy(dtype=object))
+        n_nodes += len(labels)
+
+    S = sparse.csr_matrix(
+        (np.ones(n_leaves * len(levels)), (np.concatenate(rows), np.tile(np.arange(n_leaves), len(levels)))),
+        shape=(n_nodes, n_leaves))
+    nodes = pd.DataFrame({'Level': np.concatenate(names), 'Key': np.concatenate(keys)})
+    return nodes, S
+
+
+def aggregate(S, leaf_values):
+    """
+    Values of every node from the leaves' values, shape (n_leaves, n_weeks).
+
+    Missing leaf weeks count as zero; a node's week is NaN only when none of
+    its leaves has it.
+    """
+    observed = ~np.isnan(leaf_values)
+    totals = np.asarray(S @ np.where(observed, leaf_values, 0.0))
+    counts = np.asarray(S @ observed.astype(np.float64))
+    return np.where(counts > 0, totals, np.nan)
+
+
+def reconcile(base, S, method='mint_diag', variances=None):
+    """
+    Coherent forecasts of every node from base forecasts of every node.
+
+    Args:
+        base: base forecasts, shape (n_nodes, n_weeks); the last n_leaves
+            rows are the leaves
+        S: summing matrix (n_nodes, n_leaves), see hierarchy()
+        method: one of METHODS
+        variances: base-forecast error variance per node (mint_diag only)
+
+    Returns:
+        reconciled forecasts shaped like ``base``
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    S = sparse.csr_matrix(S)
+    base = np.asarray(base, dtype=np.float64)
+    n_nodes, n_leaves = S.shape
+    if method == 'bottom_up':
+        return np.asarray(S @ base[n_nodes - n_leaves:])
+
+    if method == 'ols':
+        weights = np.ones(n_nodes)
+    else:
+        if variances is None:
+            raise ValueError("mint_diag needs the base-forecast error variance of every node")
+        variances = np.asarray(variances, dtype=np.float64)
+        variances = np.where(np.isnan(variances), np.nanmean(variances), variances)
+        # Nodes forecast perfectly on the holdout would get infinite weight
+        weights = 1 / np.maximum(variances, 1e-6 * max(np.nanmean(variances), 1.0))
+
+    # S stacks the aggregate rows A on the identity of the leaves, so
+    # S' W S = D + A' Wa A with D the leaves' weights. By the Woodbury identity
+    # (D + A' Wa A)^-1 = D^-1 - D^-1 A' K^-1 A D^-1,  K = Wa^-1 + A D^-1 A',
+    # where K is a sparse system over the aggregate nodes only, factored once
+    # for all forecast weeks.
+    n_aggregates = n_nodes - n_leaves
+    if n_aggregates == 0:
+        return base.copy()
+    A = S[:n_aggregates]
+    leaf_weights, aggregate_weights = weights[n_aggregates:], weights[:n_aggregates]
+    K = sparse.diags(1 / aggregate_weights) + A @ sparse.diags(1 / leaf_weights) @ A.T
+    solver = splu(sparse.csc_matrix(K))
+
+    rhs = leaf_weights[:, None] * base[n_aggregates:] + A.T @ (aggregate_weights[:, None] * base[:n_aggregates])
+    scaled = rhs / leaf_weights[:, None]
+    leaves = scaled - (A.T @ solver.solve(np.asarray(A @ scaled))) / leaf_weights[:, None]
+    return np.asarray(S @ leaves)
+
+
+def forecast_hierarchy(data, n_weeks=4, method='mint_diag', holdout=HOLDOUT_WEEKS, levels=LEVELS):
+    """
+    Base and reconciled forecasts of every node of the hierarchy.
+
+    Args:
+        data: weekly rows with Product_ID, Store_ID, Category, Region,
+            Week_Start and Sales_Quantity
+        n_weeks: forecast horizon
+        method: reconciliation method, see reconcile()
+        holdout: weeks used to pick each node's baseline and estimate its error variance
+
+    Returns:
+        (forecasts, nodes, S): long forecasts with Level, Key, Week_Start,
+        Base_Forecast and Reconciled_Forecast, plus the hierarchy
+    """
+    tensor = SalesTensor.from_frame(data)
+    products, stores = np.nonzero(tensor.mask.any(axis=2))
+    leaves = pd.DataFrame({'Product_ID': tensor.products[products], 'Store_ID': tensor.stores[stores]})
+    for key, column in [('Product_ID', 'Category'), ('Store_ID', 'Region')]:
+        attributes = data[[key, column]].astype(str).drop_duplicates(key)
+        leaves[column] = leaves[key].map(dict(zip(attributes[key], attributes[column])))
+
+    nodes, S = hierarchy(leaves, levels)
+    sales = aggregate(S, tensor.values['Sales_Quantity'][products, stores])
+    base, _, backtest = forecast_baselines(sales, n_weeks, holdout)
+    variances = np.nanmean((sales[:, -holdout:] - backtest) ** 2, axis=1)
+    reconciled = reconcile(base, S, method, variances)
+
+    weeks = tensor.weeks[-1] + np.arange(1, n_weeks + 1) * pd.Timedelta(WEEK)
+    forecasts = pd.DataFrame({
+        'Level': np.repeat(nodes['Level'].to_numpy(), n_weeks),
+        'Key': np.repeat(nodes['Key'].to_numpy(), n_weeks),
+        'Week_Start': np.tile(weeks, len(nodes)),
+        'Base_Forecast': base.ravel(),
+        'Reconciled_Forecast': reconciled.ravel(),
+    })
+    return forecasts, nodes, S
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast every level of the product/store hierarchy and reconcile")
+    parser.add_argument('--weeks', type=int, default=4, help="Weeks to forecast")
+    parser.add_argument('--method', choices=METHODS, default='mint_diag', help="Reconciliation method")
+    parser.add_argument('--output', default=HIERARCHY_PATH)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from src.data_loader import load_processed
+
+    args = parse_args(argv)
+    data = load_processed(columns=SERIES_KEYS + ['Category', 'Region', 'Week_Start', 'Sales_Quantity'])
+    forecasts, nodes, S = forecast_hierarchy(data, args.weeks, args.method)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    forecasts.to_csv(args.output, index=False, float_format='%.4f')
+
+    # How far the base forecasts were from adding up, per level
+    base = forecasts['Base_Forecast'].to_numpy().reshape(len(nodes), args.weeks)
+    incoherence = np.abs(base - S @ base[-S.shape[1]:]).mean(axis=1)
+    print(pd.Series(incoherence, index=nodes['Level']).groupby(level=0, sort=False).mean()
+          .round(2).rename('Base incoherence').to_string())
+    print(f"{args.method} forecasts for {len(nodes)} nodes ({S.shape[1]} series, {S.nnz} non-zeros) "
+          f"saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Incremental preprocessing: fold only the new days of raw sales into the weekly dataset.
+
+The first run bootstraps from the full history. It then keeps a small state
+next to the processed data:
+
+- ``watermark.json``: the last processed date and the byte offset reached in
+  the append-only raw sales CSV, so later runs parse only the new bytes.
+  Everything after the offset is new, including late rows for past dates.
+- ``tail_aggregates.csv``: for every product-store series, the most recent
+  weeks of additive weekly aggregates (sums and day counts). That is enough to
+  merge new days into partially filled weeks and to recompute the lag and
+  rolling features of the affected weeks.
+
+Each incremental run aggregates the new daily rows, merges them into the tail
+state, recomputes features only for the affected weeks of each series (using
+the preceding weeks as context) and upserts those rows into the processed
+store, which rewrites only the touched week partitions. Runtime scales with
+the new data instead of the whole history. Rows for weeks too old to have
+their context in the tail, or a raw file that shrank, trigger a full rebuild.
+
+Usage:
+    python src/incremental_preprocess.py
+"""
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+if __package__ in (None, ''):
+    # Allow running as `python src/incremental_preprocess.py` from the project root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_loader import SALES_DTYPES, load_product_data, load_store_data
+from src.feature_engineering import DEFAULT_LAGS, DEFAULT_WINDOWS, SERIES_KEYS, week_start_from_year_week
+from src.preprocess_data import DEFAULT_RAW_PATHS, WEEKLY_KEYS, build_features, join_metadata
+from src.processed_store import STORE_DIRNAME, WeeklyStore
+
+STATE_DIRNAME = '_state'
+WATERMARK_FILE = 'watermark.json'
+TAIL_FILE = 'tail_aggregates.csv'
+
+# Additive weekly aggregates; means are derived from them when features are built
+SUM_COLUMNS = ['Sales_Quantity', 'Inventory_Sum', 'Price_Sum', 'Cost_Sum', 'Day_Count']
+
+
+def history_weeks(lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS):
+    """Number of preceding weeks a row's lag and rolling features depend on"""
+    return max(max(lags), max(windows))
+
+
+def read_new_sales(sales_path, raw_offset=0):
+    """
+    Read the raw sales rows after byte ``raw_offset`` of the append-only CSV.
+
+    Rows are new by position, not by date: a late or backfilled row appended
+    after the last run is returned even if its date is before the watermark.
+    Returns (new rows, byte offset reached).
+    """
+    file_size = os.path.getsize(sales_path)
+    with open(sales_path, 'rb') as f:
+        header = f.readline()
+        columns = header.decode().strip().split(',')
+        f.seek(max(raw_offset, len(header)))
+        if f.tell() >= file_size:
+            new_sales = pd.DataFrame(columns=columns)
+        else:
+            new_sales = pd.read_csv(f, names=columns, header=None, dtype=SALES_DTYPES)
+
+    new_sales['Date'] = pd.to_datetime(new_sales['Date'])
+    return new_sales, file_size
+
+
+def aggregate_weekly_sums(sales_data):
+    """Weekly additive aggregates of joined daily sales, keyed like aggregate_weekly()"""
+    weekly = sales_data.assign(Day_Count=1).groupby(WEEKLY_KEYS, observed=True).agg(
+        Sales_Quantity=('Sales_Quantity', 'sum'),
+        Inventory_Sum=('Inventory_Level', 'sum'),
+        Price_Sum=('Price', 'sum'),
+        Cost_Sum=('Cost', 'sum'),
+        Day_Count=('Day_Count', 'sum'),
+    ).reset_index()
+    weekly['Week_Start'] = week_start_from_year_week(weekly['Year'], weekly['WeekOfYear'])
+    return weekly
+
+
+def finalize_weekly(weekly_sums):
+    """Turn additive aggregates back into the aggregate_weekly() layout"""
+    counts = weekly_sums['Day_Count']
+    weekly = weekly_sums[WEEKLY_KEYS].copy()
+    weekly['Sales_Quantity'] = weekly_sums['Sales_Quantity']
+    weekly['Inventory_Level'] = weekly_sums['Inventory_Sum'] / counts
+    weekly['Price'] = weekly_sums['Price_Sum'] / counts
+    weekly['Cost'] = weekly_sums['Cost_Sum'] / counts
+    weekly['Week_Start'] = weekly_sums['Week_Start']
+    return weekly
+
+
+def trim_tail(weekly_sums, keep_weeks):
+    """Keep the most recent ``keep_weeks`` weeks of every series"""
+    data = weekly_sums.sort_values(SERIES_KEYS + ['Week_Start'], kind='stable').reset_index(drop=True)
+    rows_after = data.groupby(SERIES_KEYS, sort=False, observed=True).cumcount(ascending=False)
+    return data[rows_after < keep_weeks].reset_index(drop=True)
+
+
+def merge_into_tail(tail, new_sums):
+    """Add new weekly sums to the tail state; returns (merged tail, keys that changed)"""
+    keys = WEEKLY_KEYS + ['Week_Start']
+    merged = pd.concat([tail, new_sums], ignore_index=True)
+    merged = merged.groupby(keys, sort=False, observed=True)[SUM_COLUMNS].sum().reset_index()
+    return merged, new_sums[keys].drop_duplicates()
+
+
+class IncrementalPreprocessor:
+    """Maintain the processed weekly store and its train/test cutoff incrementally"""
+
+    def __init__(self, raw_paths=None, out_dir='data/processed', state_dir=None, test_weeks=8,
+                 lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS, verbose=True):
+        self.raw_paths = {**DEFAULT_RAW_PATHS, **(raw_paths or {})}
+        self.out_dir = out_dir
+        self.state_dir = state_dir or os.path.join(out_dir, STATE_DIRNAME)
+        self.store = WeeklyStore(os.path.join(out_dir, STORE_DIRNAME))
+        self.test_weeks = test_weeks
+        self.lags = list(lags)
+        self.windows = list(windows)
+        self.context_weeks = history_weeks(lags, windows)
+        # Keep a margin beyond the context so reopened weeks still have full history
+        self.tail_weeks = 2 * self.context_weeks + 1
+        self.log = print if verbose else (lambda *args, **kwargs: None)
+
+    @property
+    def watermark_path(self):
+        return os.path.join(self.state_dir, WATERMARK_FILE)
+
+    @property
+    def tail_path(self):
+        return os.path.join(self.state_dir, TAIL_FILE)
+
+    def load_watermark(self):
+        if not (os.path.exists(self.watermark_path) and os.path.exists(self.tail_path)
+                and self.store.exists()):
+            return None
+        with open(self.watermark_path) as f:
+            return json.load(f)
+
+    def _load_metadata(self):
+        return load_product_data(self.raw_paths['products']), load_store_data(self.raw_paths['stores'])
+
+    def _save_state(self, tail, last_date, raw_offset):
+        os.makedirs(self.state_dir, exist_ok=True)
+        tail.to_csv(self.tail_path, index=False)
+        with open(self.watermark_path, 'w') as f:
+            json.dump({
+                'last_date': pd.Timestamp(last_date).strftime('%Y-%m-%d'),
+                'raw_offset': int(raw_offset),
+                'raw_path': self.raw_paths['sales'],
+            }, f, indent=2)
+
+    def bootstrap(self):
+        """Process the full history and initialise the state"""
+        new_sales, raw_offset = read_new_sales(self.raw_paths['sales'])
+        product_data, store_data = self._load_metadata()
+        weekly_sums = aggregate_weekly_sums(join_metadata(new_sales, product_data, store_data))
+
+        weekly_features = build_features(finalize_weekly(weekly_sums), self.lags, self.windows)
+        self.store.write(weekly_features, self.test_weeks)
+        self._save_state(trim_tail(weekly_sums, self.tail_weeks), new_sales['Date'].max(), raw_offset)
+        return {'mode': 'bootstrap', 'new_rows': len(new_sales), 'updated_rows': len(weekly_features),
+                'watermark': new_sales['Date'].max()}
+
+    def update(self):
+        """Fold the raw rows appended since the last run into the weekly dataset"""
+        watermark = self.load_watermark()
+        if watermark is None:
+            self.log("No incremental state found; processing the full history...")
+            return self.bootstrap()
+
+        if watermark['raw_offset'] > os.path.getsize(self.raw_paths['sales']):
+            self.log("The raw sales file shrank since the last run; rebuilding from scratch...")
+            return self.bootstrap()
+
+        new_sales, raw_offset = read_new_sales(self.raw_paths['sales'], watermark['raw_offset'])
+        if new_sales.empty:
+            self.log(f"No new sales after {watermark['last_date']}.")
+            self._save_state(pd.read_csv(self.tail_path, parse_dates=['Week_Start']),
+                             watermark['last_date'], raw_offset)
+            return {'mode': 'noop', 'new_rows': 0, 'updated_rows': 0,
+                    'watermark': pd.Timestamp(watermark['last_date'])}
+
+        self.log(f"Processing {len(new_sales)} new daily rows...")
+        product_data, store_data = self._load_metadata()
+        new_sums = aggregate_weekly_sums(join_metadata(new_sales, product_data, store_data))
+
+        tail = pd.read_csv(self.tail_path, parse_dates=['Week_Start'])
+        # A changed week needs context_weeks of retained history before it to have its
+        # features recomputed locally. Series with a shorter tail hold their whole history.
+        series_tail = tail.groupby(SERIES_KEYS, observed=True)['Week_Start'].agg(['min', 'size'])
+        earliest_mergeable = series_tail['min'] + pd.Timedelta(weeks=self.context_weeks)
+        earliest_mergeable[series_tail['size'] < self.tail_weeks] = pd.Timestamp.min
+        affected_oldest = new_sums.groupby(SERIES_KEYS, observed=True)['Week_Start'].min()
+        joined = affected_oldest.to_frame('new').join(earliest_mergeable.rename('mergeable'), how='inner')
+        if (joined['new'] < joined['mergeable']).any():
+            self.log("New rows fall before the retained history; rebuilding from scratch...")
+            return self.bootstrap()
+
+        tail, changed_keys = merge_into_tail(tail, new_sums)
+        updated_features = self._recompute_affected(tail, changed_keys)
+        self.store.upsert(updated_features, self.test_weeks)
+
+        last_date = max(pd.Timestamp(watermark['last_date']), new_sales['Date'].max())
+        self._save_state(trim_tail(tail, self.tail_weeks), last_date, raw_offset)
+        return {'mode': 'incremental', 'new_rows': len(new_sales), 'updated_rows': len(updated_features),
+                'watermark': last_date}
+
+    def _recompute_affected(self, tail, changed_keys):
+        """Rebuild features for changed weeks and the weeks after them in each affected series"""
+        affected_series = changed_keys[SERIES_KEYS].drop_duplicates()
+        series_tail = tail.merge(affected_series, on=SERIES_KEYS, how='inner')
+        features = build_features(finalize_weekly(series_tail), self.lags, self.windows)
+
+        first_changed = changed_keys.groupby(SERIES_KEYS, observed=True)['Week_Start'].min().rename('First_Changed')
+        first_changed = features.join(first_changed, on=SERIES_KEYS)['First_Changed']
+        return features[features['Week_Start'] >= first_changed].reset_index(drop=True)
+
+
+def preprocess_incremental(raw_paths=None, out_dir='data/processed', *, state_dir=None, test_weeks=8,
+                           lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS, verbose=True):
+    """
+    Bring the processed weekly dataset up to date with the raw sales.
+
+    Returns a dict with the run 'mode' ('bootstrap', 'incremental' or 'noop'),
+    the number of 'new_rows' read, the number of weekly 'updated_rows', the new
+    'watermark' date and the run time in 'seconds'.
+    """
+    start = time.perf_counter()
+    preprocessor = IncrementalPreprocessor(raw_paths, out_dir, state_dir, test_weeks, lags, windows, verbose)
+    result = preprocessor.update()
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def main():
+    result = preprocess_incremental()
+    print(f"Incremental preprocessing ({result['mode']}): {result['new_rows']} new daily rows, "
+          f"{result['updated_rows']} weekly rows updated in {result['seconds']:.2f}s")
+    print(f"Data processed up to {pd.Timestamp(result['watermark']).date()}")
+
+
+if __name__ == "__main__":
+    main()
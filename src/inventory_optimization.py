@@ -0,0 +1,229 @@
+"""
+Inventory optimization for the whole catalog.
+
+Works on arrays of shape (n_series, n_weeks) of forecasted weekly demand.
+Safety stock follows from the forecast error and a target service level:
+
+    safety stock   = z(service level) * sigma * sqrt(L + R)
+    reorder point  = demand * L + safety stock
+    order-up-to    = demand * (L + R) + safety stock
+
+where sigma is the standard deviation of a series' one-week forecast error,
+L its store's lead time and R the review period, both in weeks. Sigma comes
+from the spread of the forecast quantiles (P10 to P90 of the Random Forest's
+trees, see quantile_forecast.py) for each week when the forecasts have them,
+and from the series' test RMSE otherwise.
+
+Order quantities come from a periodic-review order-up-to policy that starts
+from each series' current inventory: every week the inventory position is
+topped up to the order-up-to level and then drawn down by the forecasted
+demand. All series are processed together; only the short horizon is
+iterated.
+
+Per-store lead times are read from ``data/store_lead_times.csv``
+(Store_ID, Lead_Time_Days) when it exists; other stores use the default.
+"""
+import argparse
+import os
+import sys
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ''):
+    # Allow running as `python src/inventory_optimization.py` from the project root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.feature_cache import TARGET
+from src.feature_engineering import SERIES_KEYS
+
+DEFAULT_SERVICE_LEVEL = 0.95
+DEFAULT_LEAD_TIME_DAYS = 3
+REVIEW_PERIOD_DAYS = 7
+LEAD_TIMES_PATH = 'data/store_lead_times.csv'
+FORECAST_PATH = 'data/processed/forecast_results.csv'
+METRICS_PATH = 'data/processed/forecast_metrics.csv'
+INVENTORY_PATH = 'data/processed/inventory_plan.csv'
+PLAN_COLUMNS = ['Safety_Stock', 'Reorder_Point', 'Order_Up_To', 'Order_Quantity']
+
+
+def calculate_optimal_inventory(forecasted_demand, safety_stock_factor=1.5, lead_time_days=3, upper_demand=None):
+    """
+    Inventory level covering the forecasted demand plus safety stock over the lead time.
+
+    The weekly safety stock is ``safety_stock_factor`` times the demand, or,
+    when an upper forecast quantile (e.g. P90) is given, the gap between it
+    and the demand, held for the week and the lead time.
+    """
+    lead_time_weeks = lead_time_days / 7
+    demand = np.asarray(forecasted_demand, dtype=np.float64)
+    if upper_demand is None:
+        # Base inventory = forecasted demand + safety stock over the lead time in weeks
+        return np.rint(demand * (1 + safety_stock_factor * lead_time_weeks)).astype(np.int64)
+    gap = np.maximum(np.asarray(upper_demand, dtype=np.float64) - demand, 0)
+    return np.rint(demand + gap * (1 + lead_time_weeks)).astype(np.int64)
+
+
+def z_score(service_level):
+    """Standard normal quantile of the service level (scalar or array)"""
+    service_level = np.asarray(service_level, dtype=np.float64)
+    if ((service_level <= 0) | (service_level >= 1)).any():
+        raise ValueError("service_level must be between 0 and 1")
+    levels, inverse = np.unique(service_level, return_inverse=True)
+    quantiles = np.array([NormalDist().inv_cdf(level) for level in levels])
+    return quantiles[inverse].reshape(service_level.shape)
+
+
+def quantile_sigma(lower, upper, lower_level=0.1, upper_level=0.9):
+    """Standard deviation of a normal distribution with the given forecast quantiles"""
+    spread = np.asarray(upper, dtype=np.float64) - np.asarray(lower, dtype=np.float64)
+    return np.maximum(spread, 0) / (z_score(upper_level) - z_score(lower_level))
+
+
+def store_lead_times(store_ids, lead_times=None, default=DEFAULT_LEAD_TIME_DAYS):
+    """
+    Lead time in days for each entry of ``store_ids``.
+
+    Args:
+        store_ids: store ID of each series
+        lead_times: mapping of Store_ID to lead time in days; read from
+            LEAD_TIMES_PATH when None and the file exists
+        default: lead time of stores without one
+    """
+    if lead_times is None:
+        lead_times = {}
+        if os.path.exists(LEAD_TIMES_PATH):
+            table = pd.read_csv(LEAD_TIMES_PATH, dtype={'Store_ID': str})
+            lead_times = dict(zip(table['Store_ID'], table['Lead_Time_Days']))
+    return pd.Series(np.asarray(store_ids).astype(str)).map(lead_times).fillna(default).to_numpy(np.float64)
+
+
+def forecast_error_sigma(data, y_pred):
+    """
+    Standard deviation of the one-week forecast error of every series.
+
+    ``data`` holds the rows that ``y_pred`` predicts, with the series keys
+    and the target. Returns one row per series with Product_ID, Store_ID and Sigma.
+    """
+    errors = data[SERIES_KEYS].assign(Squared_Error=(data[TARGET].to_numpy() - np.asarray(y_pred)) ** 2)
+    sigma = errors.groupby(SERIES_KEYS, observed=True, sort=True)['Squared_Error'].mean() ** 0.5
+    return sigma.rename('Sigma').reset_index()
+
+
+def inventory_plan(demand, sigma, lead_time_days=DEFAULT_LEAD_TIME_DAYS, service_level=DEFAULT_SERVICE_LEVEL,
+                   review_period_days=REVIEW_PERIOD_DAYS, on_hand=None):
+    """
+    Safety stock, reorder points, order-up-to levels and order quantities.
+
+    Args:
+        demand: forecasted weekly demand, shape (n_series, n_weeks)
+        sigma: one-week forecast error standard deviation per series, or per
+            series and week (shaped like ``demand``)
+        lead_time_days: lead time per series (or one for all)
+        service_level: target probability of not stocking out, per series or one for all
+        review_period_days: days between orders
+        on_hand: inventory position of each series before the first week (0 when None)
+
+    Returns:
+        dict of arrays shaped like ``demand`` named like PLAN_COLUMNS, in
+        whole units rounded up
+    """
+    demand = np.atleast_2d(np.asarray(demand, dtype=np.float64))
+    n_series, n_weeks = demand.shape
+
+    def per_series(values):
+        return np.broadcast_to(np.asarray(values, dtype=np.float64), (n_series,))[:, None]
+
+    lead_weeks = per_series(lead_time_days) / 7
+    review_weeks = review_period_days / 7
+    sigma = np.asarray(sigma, dtype=np.float64)
+    sigma = sigma if sigma.ndim == 2 else per_series(sigma)
+    safety_stock = z_score(per_series(service_level)) * sigma * np.sqrt(lead_weeks + review_weeks)
+    safety_stock = np.broadcast_to(np.maximum(safety_stock, 0), demand.shape)
+    reorder_point = demand * lead_weeks + safety_stock
+    order_up_to = demand * (lead_weeks + review_weeks) + safety_stock
+
+    position = np.zeros(n_series) if on_hand is None else per_series(on_hand)[:, 0].copy()
+    order_quantity = np.empty_like(demand)
+    for week in range(n_weeks):
+        order_quantity[:, week] = np.maximum(order_up_to[:, week] - position, 0)
+        position += order_quantity[:, week] - demand[:, week]
+
+    plan = dict(zip(PLAN_COLUMNS, [safety_stock, reorder_point, order_up_to, order_quantity]))
+    return {name: np.ceil(values).astype(np.int64) for name, values in plan.items()}
+
+
+def optimize_inventory(forecasts, sigma=None, lead_times=None, service_level=DEFAULT_SERVICE_LEVEL,
+                       review_period_days=REVIEW_PERIOD_DAYS, on_hand=None):
+    """
+    Inventory plan of every series in a forecast table.
+
+    Args:
+        forecasts: Product_ID, Store_ID, Week_Start and Forecasted_Sales rows,
+            the same number of weeks for every series; weeks with P10 and
+            P90 forecast quantiles get their sigma from those (quantile_sigma())
+        sigma: Product_ID, Store_ID and Sigma per series (e.g. from
+            forecast_error_sigma(), or the RMSE column of the forecast metrics)
+            for the weeks without quantiles
+        lead_times: mapping of Store_ID to lead time in days (see store_lead_times())
+        service_level, review_period_days: see inventory_plan()
+        on_hand: Product_ID, Store_ID and On_Hand per series; series without one start empty
+
+    Returns:
+        ``forecasts`` sorted by series and week with the PLAN_COLUMNS added
+    """
+    forecasts = forecasts.astype({'Product_ID': str, 'Store_ID': str}).sort_values(SERIES_KEYS + ['Week_Start'])
+    series = forecasts[SERIES_KEYS].drop_duplicates()
+    n_weeks, remainder = divmod(len(forecasts), max(len(series), 1))
+    if remainder:
+        raise ValueError("Every series needs the same number of forecast weeks")
+
+    def per_series(table, column):
+        table = table.astype({'Product_ID': str, 'Store_ID': str})
+        return series.merge(table[SERIES_KEYS + [column]], on=SERIES_KEYS, how='left')[column].to_numpy(np.float64)
+
+    sigmas = np.full((len(series), n_weeks), np.nan)
+    if {'P10', 'P90'} <= set(forecasts.columns):
+        sigmas = quantile_sigma(forecasts['P10'].to_numpy(np.float64),
+                                forecasts['P90'].to_numpy(np.float64)).reshape(len(series), n_weeks)
+    if sigma is not None:
+        sigmas = np.where(np.isnan(sigmas), per_series(sigma, 'Sigma')[:, None], sigmas)
+    if np.isnan(sigmas).any():
+        raise ValueError(f"No forecast error sigma for {np.isnan(sigmas).any(axis=1).sum()} series")
+    plan = inventory_plan(
+        forecasts['Forecasted_Sales'].to_numpy(np.float64).reshape(len(series), n_weeks), sigmas,
+        store_lead_times(series['Store_ID'], lead_times), service_level, review_period_days,
+        None if on_hand is None else np.nan_to_num(per_series(on_hand, 'On_Hand')))
+    return forecasts.assign(**{name: values.ravel() for name, values in plan.items()}).reset_index(drop=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Plan reorder points and order quantities for the catalog")
+    parser.add_argument('--forecasts', default=FORECAST_PATH, help="Consolidated forecast table")
+    parser.add_argument('--metrics', default=METRICS_PATH,
+                        help="Per-series test metrics with RMSE, for forecasts without quantiles")
+    parser.add_argument('--service-level', type=float, default=DEFAULT_SERVICE_LEVEL)
+    parser.add_argument('--review-days', type=float, default=REVIEW_PERIOD_DAYS)
+    parser.add_argument('--output', default=INVENTORY_PATH)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from src.data_loader import load_forecast_results, load_processed
+
+    args = parse_args(argv)
+    forecasts = load_forecast_results(args.forecasts)
+    sigma = pd.read_csv(args.metrics, dtype={'Product_ID': str, 'Store_ID': str}).rename(columns={'RMSE': 'Sigma'})
+    latest = load_processed(columns=SERIES_KEYS + ['Week_Start', 'Inventory_Level'])
+    on_hand = latest.groupby(SERIES_KEYS, observed=True).tail(1).rename(columns={'Inventory_Level': 'On_Hand'})
+
+    plan = optimize_inventory(forecasts, sigma, service_level=args.service_level,
+                              review_period_days=args.review_days, on_hand=on_hand)
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    plan.to_csv(args.output, index=False)
+    print(f"Inventory plan for {len(plan[SERIES_KEYS].drop_duplicates())} series saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Registry of trained per-series models.
+
+Each product-store model is stored together with its fitted scaler in one
+compressed joblib file (``<root>/<Product_ID>/<Store_ID>.joblib``), and a
+single ``manifest.json`` describes every entry: feature list, scaler
+parameters, training window, test metrics, storage options and a version
+number that increases with every save. Listing or inspecting models only
+reads the manifest.
+
+Loaded models are kept in a bounded LRU cache, so a serving process only
+deserializes the series it is asked for. Models saved with ``compress=0``
+are loaded with ``mmap_mode='r'``, so plain NumPy arrays in the artifact are
+memory-mapped rather than read into memory (sklearn tree nodes are still
+copied when the trees are rebuilt).
+"""
+import json
+import os
+from collections import OrderedDict
+
+import joblib
+import pandas as pd
+
+REGISTRY_DIR = 'models/registry'
+MANIFEST_FILE = 'manifest.json'
+
+
+def _entry_key(product_id, store_id):
+    return f'{product_id}/{store_id}'
+
+
+class ModelRegistry:
+    """Manifest plus joblib files of per-series models, with an LRU cache of loaded models"""
+
+    def __init__(self, root=REGISTRY_DIR, cache_size=128, compress=3):
+        """
+        Args:
+            root: registry directory
+            cache_size: maximum number of loaded models kept in memory
+            compress: joblib compression level for saved models (0 stores
+                them uncompressed so they can be memory-mapped)
+        """
+        self.root = root
+        self.cache_size = cache_size
+        self.compress = compress
+        self._cache = OrderedDict()
+        self.manifest = self._read_manifest()
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.root, MANIFEST_FILE)
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {'models': {}}
+        with open(self.manifest_path) as f:
+            return json.load(f)
+
+    def reload(self):
+        """Re-read the manifest, e.g. after another process saved models"""
+        self.manifest = self._read_manifest()
+        return self
+
+    def flush(self):
+        """Write the manifest"""
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def __len__(self):
+        return len(self.manifest['models'])
+
+    def __contains__(self, key):
+        return _entry_key(*key) in self.manifest['models']
+
+    def keys(self):
+        """(Product_ID, Store_ID) pairs of the registered models"""
+        return [tuple(key.split('/', 1)) for key in self.manifest['models']]
+
+    def entry(self, product_id, store_id):
+        """Manifest entry of one model"""
+        return self.manifest['models'][_entry_key(product_id, store_id)]
+
+    def save(self, product_id, store_id, model, scaler, features, training_window=None, metrics=None,
+             flush=True):
+        """
+        Store a model with its scaler and describe it in the manifest.
+
+        Pass ``flush=False`` when saving many models and call flush() once at
+        the end, so the manifest is written only once.
+        """
+        key = _entry_key(product_id, store_id)
+        relative_path = os.path.join(str(product_id), f'{store_id}.joblib')
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        joblib.dump({'model': model, 'scaler': scaler}, tmp_path, compress=self.compress)
+        os.replace(tmp_path, path)
+
+        previous = self.manifest['models'].get(key, {})
+        self.manifest['models'][key] = {
+            'path': relative_path,
+            'version': previous.get('version', 0) + 1,
+            'saved_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+            'model_type': type(model).__name__,
+            'compress': self.compress,
+            'features': list(features),
+            'scaler': {'mean': [float(v) for v in scaler.mean_], 'scale': [float(v) for v in scaler.scale_]},
+            'training_window': training_window or {},
+            'metrics': {name: float(value) for name, value in (metrics or {}).items()},
+        }
+        self._cache.pop(key, None)
+        if flush:
+            self.flush()
+        return self.manifest['models'][key]
+
+    def load(self, product_id, store_id):
+        """(model, scaler) of one series, from the LRU cache when possible"""
+        key = _entry_key(product_id, store_id)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        entry = self.manifest['models'][key]
+        mmap_mode = 'r' if entry.get('compress', self.compress) == 0 else None
+        artifact = joblib.load(os.path.join(self.root, entry['path']), mmap_mode=mmap_mode)
+        loaded = (artifact['model'], artifact['scaler'])
+        self._cache[key] = loaded
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return loaded
+
+    def predictor(self, product_id, store_id):
+        """Function mapping raw feature rows to predictions of one series' model"""
+        model, scaler = self.load(product_id, store_id)
+        return lambda X: model.predict(scaler.transform(X))
+
+    @property
+    def cached_keys(self):
+        """Keys of the models currently held in memory, least recently used first"""
+        return [tuple(key.split('/', 1)) for key in self._cache]
@@ -0,0 +1,79 @@
+"""
+Process-pool scheduler for training one model per product-store series.
+
+Series are split into chunks and sent to a ``ProcessPoolExecutor``. Only the
+series keys travel to the workers: each worker opens the memory-mapped
+feature cache (see feature_cache.py) once in its initializer and slices its
+series from the shared pages, so no DataFrames are pickled per task.
+
+Cores are shared between the pool and sklearn: with ``W`` workers on a
+machine with ``C`` cores each model is fitted with ``n_jobs = C // W``, so
+the total number of busy threads stays close to ``C``.
+"""
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.feature_cache import CACHE_DIR, FeatureCache
+
+# Chunks per worker: enough to even out slow series without per-task overhead dominating
+CHUNKS_PER_WORKER = 4
+
+_worker_state = {}
+
+
+def plan_workers(n_workers=None, n_series=None, n_cpus=None):
+    """
+    Split the available cores between pool workers and sklearn threads.
+
+    ``n_workers`` of None or -1 means one worker per core. Returns
+    (workers, n_jobs per model).
+    """
+    n_cpus = n_cpus or os.cpu_count() or 1
+    workers = n_cpus if n_workers in (None, -1) else max(1, n_workers)
+    if n_series is not None:
+        workers = max(1, min(workers, n_series))
+    return workers, max(1, n_cpus // workers)
+
+
+def chunk_series(pairs, workers, chunks_per_worker=CHUNKS_PER_WORKER):
+    """Split series keys into contiguous chunks of (start position, keys)"""
+    size = max(1, math.ceil(len(pairs) / (workers * chunks_per_worker)))
+    return [(start, pairs[start:start + size]) for start in range(0, len(pairs), size)]
+
+
+def _init_worker(cache_dir, train_fn, train_kwargs):
+    _worker_state['cache'] = FeatureCache(cache_dir).open()
+    _worker_state['train_fn'] = train_fn
+    _worker_state['train_kwargs'] = train_kwargs
+
+
+def _train_chunk(pairs):
+    cache = _worker_state['cache']
+    train_fn = _worker_state['train_fn']
+    return [train_fn(cache, product_id, store_id, **_worker_state['train_kwargs'])
+            for product_id, store_id in pairs]
+
+
+def train_parallel(train_fn, pairs, cache_dir=CACHE_DIR, n_workers=None, **train_kwargs):
+    """
+    Run ``train_fn(feature_cache, product_id, store_id, n_jobs=..., **train_kwargs)``
+    for every pair in a process pool.
+
+    ``train_fn`` must be a module-level function so it can be sent to the
+    workers. Returns the results in the order of ``pairs``.
+    """
+    pairs = [tuple(pair) for pair in pairs]
+    workers, n_jobs = plan_workers(n_workers, len(pairs))
+    train_kwargs = {**train_kwargs, 'n_jobs': n_jobs}
+
+    results = [None] * len(pairs)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cache_dir, train_fn, train_kwargs)) as pool:
+        futures = {pool.submit(_train_chunk, chunk): start
+                   for start, chunk in chunk_series(pairs, workers)}
+        for future in as_completed(futures):
+            start = futures[future]
+            chunk_results = future.result()
+            results[start:start + len(chunk_results)] = chunk_results
+    return results
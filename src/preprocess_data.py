@@ -1,181 +1,278 @@
+"""
+Preprocessing pipeline: raw daily sales -> weekly features -> train/test split.
+
+Every stage is a function that takes and returns DataFrames, and
+``preprocess()`` chains them together. Plotting is optional and imports
+matplotlib only when requested, so the pipeline can be reused in-process
+(run_all.py, tests, notebooks) without the plotting cost.
+
+Run as a script to reproduce the original behaviour, including the plots:
+
+    python src/preprocess_data.py
+"""
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-from datetime import datetime
-
-# Set plotting style
-plt.style.use('seaborn-v0_8-whitegrid')
-sns.set_palette('Set2')
-plt.rcParams['figure.figsize'] = (12, 8)
-plt.rcParams['font.size'] = 12
-
-# Create directories if they don't exist
-os.makedirs('images', exist_ok=True)
-os.makedirs('data/processed', exist_ok=True)
-
-print("Loading raw data...")
-# Load the sales data
-sales_data = pd.read_csv('data/raw/sales_inventory_data.csv')
-product_data = pd.read_csv('data/raw/product_data.csv')
-store_data = pd.read_csv('data/raw/store_data.csv')
-
-# Convert date column to datetime
-sales_data['Date'] = pd.to_datetime(sales_data['Date'])
-
-# Display basic information
-print(f"Dataset shape: {sales_data.shape}")
-print(f"Date range: {sales_data['Date'].min()} to {sales_data['Date'].max()}")
-print(f"Number of products: {sales_data['Product_ID'].nunique()}")
-print(f"Number of stores: {sales_data['Store_ID'].nunique()}")
-
-# Merge with product and store data
-sales_data = sales_data.merge(product_data, on='Product_ID', how='left')
-sales_data = sales_data.merge(store_data, on='Store_ID', how='left')
-
-# Extract date features
-sales_data['Year'] = sales_data['Date'].dt.year
-sales_data['Month'] = sales_data['Date'].dt.month
-sales_data['Day'] = sales_data['Date'].dt.day
-sales_data['DayOfWeek'] = sales_data['Date'].dt.dayofweek
-sales_data['Quarter'] = sales_data['Date'].dt.quarter
-sales_data['WeekOfYear'] = sales_data['Date'].dt.isocalendar().week
-
-# Create a flag for weekends
-sales_data['IsWeekend'] = sales_data['DayOfWeek'].apply(lambda x: 1 if x >= 5 else 0)
-
-# Aggregate data to weekly level for time series forecasting
-print("Aggregating data to weekly level...")
-weekly_data = sales_data.groupby(['Year', 'WeekOfYear', 'Product_ID', 'Store_ID', 'Category', 'Region'])[
-    ['Sales_Quantity', 'Inventory_Level', 'Price', 'Cost']
-].agg({
-    'Sales_Quantity': 'sum',
-    'Inventory_Level': 'mean',
-    'Price': 'mean',
-    'Cost': 'mean'
-}).reset_index()
-
-# Create a date column for the week
-weekly_data['Week_Start'] = weekly_data.apply(
-    lambda row: pd.to_datetime(f"{row['Year']}-W{row['WeekOfYear']:02d}-1", format='%Y-W%W-%w'),
-    axis=1
-)
-
-# Create lag features for each product-store combination
-print("Creating lag features...")
-def create_lag_features(group, lags=[1, 2, 3, 4]):
-    for lag in lags:
-        group[f'Sales_Lag_{lag}'] = group['Sales_Quantity'].shift(lag)
-    return group
-
-# Apply the function to each product-store group
-weekly_with_lags = weekly_data.sort_values(['Product_ID', 'Store_ID', 'Week_Start']).groupby(['Product_ID', 'Store_ID']).apply(create_lag_features).reset_index(drop=True)
-
-# Create rolling mean features
-print("Creating rolling mean features...")
-def create_rolling_features(group, windows=[2, 4, 8]):
-    for window in windows:
-        group[f'Sales_Rolling_{window}'] = group['Sales_Quantity'].shift(1).rolling(window=window, min_periods=1).mean()
-    return group
-
-# Apply the function to each product-store group
-weekly_features = weekly_with_lags.sort_values(['Product_ID', 'Store_ID', 'Week_Start']).groupby(['Product_ID', 'Store_ID']).apply(create_rolling_features).reset_index(drop=True)
-
-# Calculate inventory turnover
-weekly_features['Inventory_Turnover'] = weekly_features['Sales_Quantity'] / weekly_features['Inventory_Level'].replace(0, 1)
-
-# Calculate gross margin
-weekly_features['Gross_Margin'] = (weekly_features['Price'] - weekly_features['Cost']) * weekly_features['Sales_Quantity']
-
-# Drop rows with NaN values (first few weeks for each product-store combination)
-weekly_features = weekly_features.dropna()
-
-# Save the processed data
-print("Saving processed data...")
-weekly_features.to_csv('data/processed/weekly_data.csv', index=False)
-
-# Split the data into training and testing sets
-print("Splitting data into train and test sets...")
-# Sort by date
-weekly_features = weekly_features.sort_values('Week_Start')
-
-# Determine the split point (use the last 8 weeks for testing)
-split_date = weekly_features['Week_Start'].max() - pd.Timedelta(weeks=8)
-
-# Split the data
-train_data = weekly_features[weekly_features['Week_Start'] <= split_date]
-test_data = weekly_features[weekly_features['Week_Start'] > split_date]
-
-print(f"Training data shape: {train_data.shape}")
-print(f"Testing data shape: {test_data.shape}")
-
-# Save the train and test datasets
-train_data.to_csv('data/processed/train_data.csv', index=False)
-test_data.to_csv('data/processed/test_data.csv', index=False)
-
-# Generate some visualizations
-print("Generating visualizations...")
-
-# 1. Total sales over time
-plt.figure(figsize=(15, 6))
-sales_by_date = sales_data.groupby('Date')['Sales_Quantity'].sum().reset_index()
-plt.plot(sales_by_date['Date'], sales_by_date['Sales_Quantity'])
-plt.title('Daily Total Sales')
-plt.xlabel('Date')
-plt.ylabel('Sales Quantity')
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('images/daily_sales.png')
-
-# 2. Sales by product category
-plt.figure(figsize=(12, 6))
-category_sales = sales_data.groupby('Category')['Sales_Quantity'].sum().sort_values(ascending=False).reset_index()
-sns.barplot(x='Category', y='Sales_Quantity', data=category_sales)
-plt.title('Total Sales by Category')
-plt.xlabel('Category')
-plt.ylabel('Sales Quantity')
-plt.xticks(rotation=45)
-plt.grid(True, axis='y')
-plt.tight_layout()
-plt.savefig('images/category_sales.png')
-
-# 3. Sales by region
-plt.figure(figsize=(10, 6))
-region_sales = sales_data.groupby('Region')['Sales_Quantity'].sum().sort_values(ascending=False).reset_index()
-sns.barplot(x='Region', y='Sales_Quantity', data=region_sales)
-plt.title('Total Sales by Region')
-plt.xlabel('Region')
-plt.ylabel('Sales Quantity')
-plt.grid(True, axis='y')
-plt.tight_layout()
-plt.savefig('images/region_sales.png')
-
-# 4. Inventory vs Sales scatter plot
-plt.figure(figsize=(10, 6))
-sns.scatterplot(x='Sales_Quantity', y='Inventory_Level', data=sales_data.sample(1000, random_state=42), alpha=0.6)
-plt.title('Sales Quantity vs Inventory Level')
-plt.xlabel('Sales Quantity')
-plt.ylabel('Inventory Level')
-plt.grid(True)
-plt.tight_layout()
-plt.savefig('images/sales_vs_inventory.png')
-
-# 5. Weekly sales patterns
-plt.figure(figsize=(10, 6))
-day_of_week_sales = sales_data.groupby('DayOfWeek')['Sales_Quantity'].mean().reset_index()
-day_of_week_sales['DayName'] = day_of_week_sales['DayOfWeek'].map({
-    0: 'Monday', 1: 'Tuesday', 2: 'Wednesday', 3: 'Thursday', 
-    4: 'Friday', 5: 'Saturday', 6: 'Sunday'
-})
-sns.barplot(x='DayName', y='Sales_Quantity', data=day_of_week_sales)
-plt.title('Average Sales by Day of Week')
-plt.xlabel('Day of Week')
-plt.ylabel('Average Sales Quantity')
-plt.grid(True, axis='y')
-plt.tight_layout()
-plt.savefig('images/day_of_week_sales.png')
-
-print("Data preprocessing complete!")
-print("Processed data saved to data/processed/")
-print("Visualizations saved to images/")
+import sys
+import time
+
+if __package__ in (None, ''):
+    # Allow running as `python src/preprocess_data.py` from the project root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_loader import align_categories, load_product_data, load_sales_data, load_store_data
+from src.feature_engineering import (DEFAULT_LAGS, DEFAULT_WINDOWS, add_lag_rolling_features,
+                                     week_start_from_year_week)
+from src.processed_store import STORE_DIRNAME, WeeklyStore
+
+DEFAULT_RAW_PATHS = {
+    'sales': 'data/raw/sales_inventory_data.csv',
+    'products': 'data/raw/product_data.csv',
+    'stores': 'data/raw/store_data.csv',
+}
+
+WEEKLY_KEYS = ['Year', 'WeekOfYear', 'Product_ID', 'Store_ID', 'Category', 'Region']
+
+
+def load_raw_data(raw_paths=None):
+    """Load the raw sales, product and store tables"""
+    paths = {**DEFAULT_RAW_PATHS, **(raw_paths or {})}
+    sales_data = load_sales_data(paths['sales'])
+    product_data = load_product_data(paths['products'])
+    store_data = load_store_data(paths['stores'])
+    return sales_data, product_data, store_data
+
+
+def join_metadata(sales_data, product_data, store_data):
+    """Merge product and store metadata into the daily sales and add calendar features"""
+    # Share the ID categories so the merges join on integer codes
+    product_data = align_categories(product_data, sales_data, ['Product_ID'])
+    store_data = align_categories(store_data, sales_data, ['Store_ID'])
+    sales_data = sales_data.merge(product_data, on='Product_ID', how='left')
+    sales_data = sales_data.merge(store_data, on='Store_ID', how='left')
+
+    # Extract date features
+    sales_data['Year'] = sales_data['Date'].dt.year
+    sales_data['Month'] = sales_data['Date'].dt.month
+    sales_data['Day'] = sales_data['Date'].dt.day
+    sales_data['DayOfWeek'] = sales_data['Date'].dt.dayofweek
+    sales_data['Quarter'] = sales_data['Date'].dt.quarter
+    sales_data['WeekOfYear'] = sales_data['Date'].dt.isocalendar().week
+
+    # Create a flag for weekends
+    sales_data['IsWeekend'] = (sales_data['DayOfWeek'] >= 5).astype(int)
+    return sales_data
+
+
+def aggregate_weekly(sales_data):
+    """Aggregate daily sales to one row per product, store and week"""
+    weekly_data = sales_data.groupby(WEEKLY_KEYS, observed=True)[
+        ['Sales_Quantity', 'Inventory_Level', 'Price', 'Cost']
+    ].agg({
+        'Sales_Quantity': 'sum',
+        'Inventory_Level': 'mean',
+        'Price': 'mean',
+        'Cost': 'mean'
+    }).reset_index()
+
+    # Create a date column for the week
+    weekly_data['Week_Start'] = week_start_from_year_week(weekly_data['Year'], weekly_data['WeekOfYear'])
+    return weekly_data
+
+
+def build_features(weekly_data, lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS):
+    """Add lag, rolling mean, turnover and margin features and drop incomplete rows"""
+    weekly_features = add_lag_rolling_features(weekly_data, lags=lags, windows=windows)
+
+    # Calculate inventory turnover
+    weekly_features['Inventory_Turnover'] = weekly_features['Sales_Quantity'] / weekly_features['Inventory_Level'].replace(0, 1)
+
+    # Calculate gross margin
+    weekly_features['Gross_Margin'] = (weekly_features['Price'] - weekly_features['Cost']) * weekly_features['Sales_Quantity']
+
+    # Drop rows with NaN values (first few weeks for each product-store combination)
+    return weekly_features.dropna()
+
+
+def split_train_test(weekly_features, test_weeks=8):
+    """Split on time: the last ``test_weeks`` weeks are the test set"""
+    # Sort by date
+    weekly_features = weekly_features.sort_values('Week_Start')
+
+    # Determine the split point
+    split_date = weekly_features['Week_Start'].max() - pd.Timedelta(weeks=test_weeks)
+
+    train_data = weekly_features[weekly_features['Week_Start'] <= split_date]
+    test_data = weekly_features[weekly_features['Week_Start'] > split_date]
+    return train_data, test_data
+
+
+def save_processed(weekly_features, out_dir='data/processed', test_weeks=8, csv_export=False):
+    """
+    Write the weekly features once to the week-partitioned columnar store.
+
+    The train/test split is recorded in the store as a cutoff date rather than
+    written out as copies. ``csv_export`` additionally writes weekly_data.csv
+    for tools that still expect it.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    WeeklyStore(os.path.join(out_dir, STORE_DIRNAME)).write(weekly_features, test_weeks)
+    if csv_export:
+        weekly_features.to_csv(os.path.join(out_dir, 'weekly_data.csv'), index=False)
+
+
+def plot_raw_data(sales_data, images_dir='images'):
+    """Render the exploratory charts of the daily sales data"""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    # Set plotting style
+    plt.style.use('seaborn-v0_8-whitegrid')
+    sns.set_palette('Set2')
+    plt.rcParams['figure.figsize'] = (12, 8)
+    plt.rcParams['font.size'] = 12
+
+    os.makedirs(images_dir, exist_ok=True)
+
+    # 1. Total sales over time
+    plt.figure(figsize=(15, 6))
+    sales_by_date = sales_data.groupby('Date')['Sales_Quantity'].sum().reset_index()
+    plt.plot(sales_by_date['Date'], sales_by_date['Sales_Quantity'])
+    plt.title('Daily Total Sales')
+    plt.xlabel('Date')
+    plt.ylabel('Sales Quantity')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(images_dir, 'daily_sales.png'))
+    plt.close()
+
+    # 2. Sales by product category
+    plt.figure(figsize=(12, 6))
+    category_sales = sales_data.groupby('Category', observed=True)['Sales_Quantity'].sum().sort_values(ascending=False).reset_index()
+    sns.barplot(x='Category', y='Sales_Quantity', data=category_sales)
+    plt.title('Total Sales by Category')
+    plt.xlabel('Category')
+    plt.ylabel('Sales Quantity')
+    plt.xticks(rotation=45)
+    plt.grid(True, axis='y')
+    plt.tight_layout()
+    plt.savefig(os.path.join(images_dir, 'category_sales.png'))
+    plt.close()
+
+    # 3. Sales by region
+    plt.figure(figsize=(10, 6))
+    region_sales = sales_data.groupby('Region', observed=True)['Sales_Quantity'].sum().sort_values(ascending=False).reset_index()
+    sns.barplot(x='Region', y='Sales_Quantity', data=region_sales)
+    plt.title('Total Sales by Region')
+    plt.xlabel('Region')
+    plt.ylabel('Sales Quantity')
+    plt.grid(True, axis='y')
+    plt.tight_layout()
+    plt.savefig(os.path.join(images_dir, 'region_sales.png'))
+    plt.close()
+
+    # 4. Inventory vs Sales scatter plot
+    plt.figure(figsize=(10, 6))
+    sns.scatterplot(x='Sales_Quantity', y='Inventory_Level', data=sales_data.sample(1000, random_state=42), alpha=0.6)
+    plt.title('Sales Quantity vs Inventory Level')
+    plt.xlabel('Sales Quantity')
+    plt.ylabel('Inventory Level')
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(os.path.join(images_dir, 'sales_vs_inventory.png'))
+    plt.close()
+
+    # 5. Weekly sales patterns
+    plt.figure(figsize=(10, 6))
+    day_of_week_sales = sales_data.groupby('DayOfWeek')['Sales_Quantity'].mean().reset_index()
+    day_of_week_sales['DayName'] = day_of_week_sales['DayOfWeek'].map({
+        0: 'Monday', 1: 'Tuesday', 2: 'Wednesday', 3: 'Thursday',
+        4: 'Friday', 5: 'Saturday', 6: 'Sunday'
+    })
+    sns.barplot(x='DayName', y='Sales_Quantity', data=day_of_week_sales)
+    plt.title('Average Sales by Day of Week')
+    plt.xlabel('Day of Week')
+    plt.ylabel('Average Sales Quantity')
+    plt.grid(True, axis='y')
+    plt.tight_layout()
+    plt.savefig(os.path.join(images_dir, 'day_of_week_sales.png'))
+    plt.close()
+
+
+def preprocess(raw_paths=None, out_dir='data/processed', *, make_plots=False, images_dir='images',
+               test_weeks=8, lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS, save=True, csv_export=False,
+               verbose=True):
+    """
+    Run the full preprocessing pipeline in-process.
+
+    Args:
+        raw_paths: optional dict overriding the 'sales', 'products' and 'stores' CSV paths
+        out_dir: directory holding the processed store (``out_dir/weekly_store``)
+        make_plots: also render the exploratory charts into ``images_dir``
+        test_weeks: number of most recent weeks held out as the test set
+        lags, windows: lag and rolling window sizes for the sales features
+        save: write the processed store to ``out_dir``
+        csv_export: also write weekly_data.csv
+        verbose: print progress messages
+
+    Returns:
+        dict with the 'sales', 'weekly', 'features', 'train' and 'test'
+        DataFrames and the wall-clock seconds of each stage under 'timings'.
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    timings = {}
+
+    def timed(stage, func, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings[stage] = time.perf_counter() - start
+        return result
+
+    log("Loading raw data...")
+    sales_data, product_data, store_data = timed('load', load_raw_data, raw_paths)
+
+    # Display basic information
+    log(f"Dataset shape: {sales_data.shape}")
+    log(f"Date range: {sales_data['Date'].min()} to {sales_data['Date'].max()}")
+    log(f"Number of products: {sales_data['Product_ID'].nunique()}")
+    log(f"Number of stores: {sales_data['Store_ID'].nunique()}")
+
+    sales_data = timed('join', join_metadata, sales_data, product_data, store_data)
+
+    log("Aggregating data to weekly level...")
+    weekly_data = timed('aggregate', aggregate_weekly, sales_data)
+
+    log("Creating lag and rolling mean features...")
+    weekly_features = timed('features', build_features, weekly_data, lags, windows)
+
+    log("Splitting data into train and test sets...")
+    train_data, test_data = timed('split', split_train_test, weekly_features, test_weeks)
+    log(f"Training data shape: {train_data.shape}")
+    log(f"Testing data shape: {test_data.shape}")
+
+    if save:
+        log("Saving processed data...")
+        timed('save', save_processed, weekly_features, out_dir, test_weeks, csv_export)
+
+    if make_plots:
+        log("Generating visualizations...")
+        timed('plot', plot_raw_data, sales_data, images_dir)
+
+    return {
+        'sales': sales_data,
+        'weekly': weekly_data,
+        'features': weekly_features,
+        'train': train_data,
+        'test': test_data,
+        'timings': timings,
+    }
+
+
+def main():
+    preprocess(make_plots=True)
+    print("Data preprocessing complete!")
+    print("Processed data saved to data/processed/")
+    print("Visualizations saved to images/")
+
+
+if __name__ == "__main__":
+    main()
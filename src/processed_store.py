@@ -0,0 +1,186 @@
+"""
+Columnar store for the processed weekly features.
+
+Holds a single copy of the weekly feature rows as a Parquet dataset
+partitioned by week (hive-style ``week=YYYY-MM-DD`` directories). The
+train/test split is not materialised: the store records the split date in
+``_metadata.json`` and readers ask for ``split='train'`` or ``split='test'``.
+Reads push column projection and week/series predicates down to pyarrow, so
+only the needed columns and partitions are scanned, and upserts rewrite only
+the week partitions they touch.
+"""
+import json
+import os
+import shutil
+
+import pandas as pd
+
+from src.feature_engineering import sort_series_frame
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+STORE_DIRNAME = 'weekly_store'
+STORE_DIR = os.path.join('data/processed', STORE_DIRNAME)
+METADATA_FILE = '_metadata.json'
+PARTITION_FIELD = 'week'
+ROW_KEYS = ['Year', 'WeekOfYear', 'Product_ID', 'Store_ID']
+STRING_COLUMNS = ['Product_ID', 'Store_ID', 'Category', 'Region']
+INTEGER_COLUMNS = {'Year': 'int32', 'WeekOfYear': 'int32', 'Sales_Quantity': 'int64'}
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError("pyarrow is required for the processed store (pip install pyarrow)")
+
+
+def _arrow_schema(columns):
+    """Fixed Arrow types so every partition file shares one schema"""
+    fields = []
+    for col in columns:
+        if col in STRING_COLUMNS:
+            fields.append(pa.field(col, pa.string()))
+        elif col in INTEGER_COLUMNS:
+            fields.append(pa.field(col, pa.type_for_alias(INTEGER_COLUMNS[col])))
+        elif col == 'Week_Start':
+            fields.append(pa.field(col, pa.timestamp('ns')))
+        else:
+            fields.append(pa.field(col, pa.float64()))
+    return pa.schema(fields)
+
+
+class WeeklyStore:
+    """Week-partitioned Parquet dataset of weekly features with a recorded train/test cutoff"""
+
+    def __init__(self, root=STORE_DIR):
+        _require_pyarrow()
+        self.root = root
+
+    @property
+    def metadata_path(self):
+        return os.path.join(self.root, METADATA_FILE)
+
+    def exists(self):
+        return os.path.exists(self.metadata_path)
+
+    def metadata(self):
+        with open(self.metadata_path) as f:
+            return json.load(f)
+
+    @property
+    def split_date(self):
+        return pd.Timestamp(self.metadata()['split_date'])
+
+    def _partition_dir(self, week):
+        return os.path.join(self.root, f'{PARTITION_FIELD}={pd.Timestamp(week):%Y-%m-%d}')
+
+    def _write_partition(self, week, rows, schema):
+        partition_dir = self._partition_dir(week)
+        os.makedirs(partition_dir, exist_ok=True)
+        table = pa.Table.from_pandas(rows.astype({col: str for col in STRING_COLUMNS if col in rows}),
+                                     schema=schema, preserve_index=False)
+        # Write then rename so readers never see a half-written partition;
+        # dataset discovery skips the dot-prefixed temporary file
+        tmp_path = os.path.join(partition_dir, '.part-0.parquet.tmp')
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, os.path.join(partition_dir, 'part-0.parquet'))
+
+    def _write_metadata(self, columns, weeks, test_weeks):
+        weeks = sorted(pd.Timestamp(week) for week in weeks)
+        split_date = weeks[-1] - pd.Timedelta(weeks=test_weeks)
+        metadata = {
+            'columns': list(columns),
+            'weeks': [f'{week:%Y-%m-%d}' for week in weeks],
+            'split_date': f'{split_date:%Y-%m-%d}',
+            'test_weeks': test_weeks,
+        }
+        tmp_path = self.metadata_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+        os.replace(tmp_path, self.metadata_path)
+
+    def write(self, weekly_features, test_weeks=8):
+        """Replace the store contents with ``weekly_features``"""
+        if os.path.isdir(self.root):
+            shutil.rmtree(self.root)
+        os.makedirs(self.root)
+        schema = _arrow_schema(weekly_features.columns)
+        for week, rows in weekly_features.groupby('Week_Start', sort=True):
+            self._write_partition(week, rows, schema)
+        self._write_metadata(weekly_features.columns, weekly_features['Week_Start'].unique(), test_weeks)
+
+    def upsert(self, rows, test_weeks=None):
+        """Insert or replace rows keyed by (Year, WeekOfYear, Product_ID, Store_ID), touching only their weeks"""
+        metadata = self.metadata()
+        test_weeks = metadata['test_weeks'] if test_weeks is None else test_weeks
+        columns = metadata['columns']
+        schema = _arrow_schema(columns)
+        rows = rows[columns]
+
+        for week, new_rows in rows.groupby('Week_Start', sort=True):
+            partition_file = os.path.join(self._partition_dir(week), 'part-0.parquet')
+            if os.path.exists(partition_file):
+                existing = pq.read_table(partition_file).to_pandas()
+                new_keys = pd.MultiIndex.from_frame(new_rows[ROW_KEYS].astype({'Product_ID': str, 'Store_ID': str}))
+                stale = pd.MultiIndex.from_frame(existing[ROW_KEYS]).isin(new_keys)
+                new_rows = pd.concat([existing[~stale], new_rows], ignore_index=True)
+            self._write_partition(week, new_rows, schema)
+
+        weeks = set(pd.to_datetime(metadata['weeks'])) | set(rows['Week_Start'].unique())
+        self._write_metadata(columns, weeks, test_weeks)
+
+    def _filter(self, split, start, end, products, stores):
+        """Build a pyarrow filter; week bounds go on the partition field so whole partitions are pruned"""
+        bounds = []
+        if split == 'train':
+            bounds.append(('<=', self.split_date))
+        elif split == 'test':
+            bounds.append(('>', self.split_date))
+        elif split is not None:
+            raise ValueError("split must be 'train', 'test' or None")
+        if start is not None:
+            bounds.append(('>=', pd.Timestamp(start)))
+        if end is not None:
+            bounds.append(('<=', pd.Timestamp(end)))
+
+        expression = None
+        week = ds.field(PARTITION_FIELD)
+        for op, value in bounds:
+            value = f'{value:%Y-%m-%d}'
+            term = {'<=': week <= value, '>': week > value, '>=': week >= value}[op]
+            expression = term if expression is None else expression & term
+        for col, values in [('Product_ID', products), ('Store_ID', stores)]:
+            if values is not None:
+                term = ds.field(col).isin([str(value) for value in values])
+                expression = term if expression is None else expression & term
+        return expression
+
+    def read(self, columns=None, split=None, start=None, end=None, products=None, stores=None, sort=True):
+        """
+        Read weekly features.
+
+        Args:
+            columns: columns to load (projection pushdown); all columns when None
+            split: 'train' (weeks up to the split date), 'test' (weeks after it) or None
+            start, end: inclusive Week_Start bounds
+            products, stores: only load these product / store IDs
+            sort: order rows by Product_ID, Store_ID and Week_Start like weekly_data.csv
+        """
+        partitioning = ds.partitioning(pa.schema([(PARTITION_FIELD, pa.string())]), flavor='hive')
+        dataset = ds.dataset(self.root, format='parquet', partitioning=partitioning)
+        all_columns = self.metadata()['columns']
+        columns = all_columns if columns is None else list(columns)
+        load_columns = list(columns)
+        if sort:
+            load_columns += [col for col in ['Product_ID', 'Store_ID', 'Week_Start'] if col not in load_columns]
+
+        table = dataset.to_table(columns=load_columns,
+                                 filter=self._filter(split, start, end, products, stores))
+        frame = table.to_pandas()
+        if sort and len(frame):
+            frame = sort_series_frame(frame)
+        return frame[columns]
@@ -0,0 +1,63 @@
+"""
+Quantile forecasts from a trained Random Forest, without retraining.
+
+A forest's prediction is the mean of its trees, and the spread of the tree
+predictions is a cheap estimate of the predictive distribution. For a
+multi-week forecast every tree runs its own recursive path: its prediction
+of one week becomes the lag of the next, so the uncertainty of early weeks
+carries over into later ones. All (tree, series) paths advance together
+through RecursiveForecaster, so each step is one batched call that stacks
+the outputs of ``estimators_`` over the rows of their own paths.
+
+The quantiles of each series and week (P10/P50/P90 by default) are taken
+across the tree paths.
+"""
+import numpy as np
+
+from src.recursive_forecast import RecursiveForecaster
+
+QUANTILES = (0.1, 0.5, 0.9)
+QUANTILE_COLUMNS = [f'P{round(q * 100)}' for q in QUANTILES]
+
+
+def tree_paths(model, scaler, features, history, last_weeks, n_weeks=4):
+    """
+    Recursive forecast of every tree of ``model`` for every series.
+
+    Args:
+        model: fitted RandomForestRegressor (any ensemble with ``estimators_``)
+        scaler: fitted scaler applied to the raw features before the trees
+        features: model feature names
+        history, last_weeks: as for RecursiveForecaster.forecast()
+
+    Returns:
+        (paths, weeks): paths of shape (n_trees, n_series, n_weeks) and the
+        forecast weeks of shape (n_series, n_weeks)
+    """
+    trees = model.estimators_
+    history = np.atleast_2d(np.asarray(history, dtype=np.float64))
+    n_series = len(history)
+
+    def predict_fn(X):
+        # Rows are grouped by tree: rows t * n_series ... (t + 1) * n_series - 1 follow tree t
+        X = scaler.transform(X).astype(np.float32).reshape(len(trees), n_series, -1)
+        return np.concatenate([tree.predict(X[t], check_input=False) for t, tree in enumerate(trees)])
+
+    forecaster = RecursiveForecaster(predict_fn, features)
+    paths, weeks = forecaster.forecast(np.tile(history, (len(trees), 1)),
+                                       np.tile(np.asarray(last_weeks), len(trees)), n_weeks)
+    return paths.reshape(len(trees), n_series, n_weeks), weeks[:n_series]
+
+
+def forecast_quantiles(model, scaler, features, history, last_weeks, n_weeks=4, quantiles=QUANTILES):
+    """
+    Forecast quantiles of every series and week from the forest's tree paths.
+
+    Returns:
+        (quantile_forecasts, weeks) where ``quantile_forecasts`` maps the
+        column name of each quantile (e.g. 'P90') to an array of shape
+        (n_series, n_weeks)
+    """
+    paths, weeks = tree_paths(model, scaler, features, history, last_weeks, n_weeks)
+    values = np.quantile(paths, quantiles, axis=0)
+    return {f'P{round(q * 100)}': value for q, value in zip(quantiles, values)}, weeks
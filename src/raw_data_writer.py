@@ -0,0 +1,162 @@
+"""
+Streaming writer for generated raw sales data.
+
+Each chunk coming out of SalesDataGenerator is appended to
+sales_inventory_data.csv and, optionally, written straight to a columnar
+dataset partitioned by year/month (hive-style ``year=YYYY/month=MM``
+directories). The quick-test ``sample_data.csv`` is built with reservoir
+sampling while the chunks go by, so no step ever needs the full dataset in
+memory.
+"""
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+COLUMNAR_FORMATS = ('parquet', 'feather')
+
+
+class ReservoirSampler:
+    """
+    Uniform random sample of fixed size over a stream of DataFrame chunks.
+
+    Implements Algorithm R with the replacement draws for a whole chunk taken
+    in one vectorized call. Rows are held as one NumPy array per column.
+    """
+
+    def __init__(self, size, seed=42):
+        self.size = size
+        self.seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._columns = None
+        self._filled = 0
+
+    def update(self, chunk):
+        """Offer every row of ``chunk`` to the reservoir"""
+        n_rows = len(chunk)
+        if n_rows == 0 or self.size == 0:
+            self.seen += n_rows
+            return
+
+        if self._columns is None:
+            self._columns = {col: np.empty(self.size, dtype=chunk[col].to_numpy().dtype)
+                             for col in chunk.columns}
+
+        # Fill phase: the first `size` rows of the stream go straight in
+        take = min(self.size - self._filled, n_rows)
+        if take > 0:
+            for col, values in self._columns.items():
+                values[self._filled:self._filled + take] = chunk[col].to_numpy()[:take]
+            self._filled += take
+
+        # Replacement phase: row t of the stream replaces slot j ~ U[0, t] when j < size
+        if take < n_rows:
+            stream_pos = self.seen + np.arange(take, n_rows)
+            slots = self._rng.integers(0, stream_pos + 1)
+            rows = np.arange(take, n_rows)
+            keep = slots < self.size
+            slots, rows = slots[keep], rows[keep]
+            if len(slots):
+                # When a slot is hit more than once in a chunk the latest row wins
+                _, last = np.unique(slots[::-1], return_index=True)
+                slots, rows = slots[::-1][last], rows[::-1][last]
+                for col, values in self._columns.items():
+                    values[slots] = chunk[col].to_numpy()[rows]
+
+        self.seen += n_rows
+
+    def result(self):
+        """Return the current sample as a DataFrame"""
+        if self._columns is None:
+            return pd.DataFrame()
+        return pd.DataFrame({col: values[:self._filled] for col, values in self._columns.items()})
+
+
+class StreamingRawWriter:
+    """
+    Write generated sales chunks to CSV and to a partitioned columnar dataset.
+
+    Use as a context manager::
+
+        with StreamingRawWriter('data/raw') as writer:
+            for chunk in generator.iter_chunks():
+                writer.write(chunk)
+    """
+
+    def __init__(self, output_dir, columnar_format='parquet', write_csv=True,
+                 sample_size=10000, seed=42, name='sales_inventory_data'):
+        if columnar_format is not None and columnar_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"columnar_format must be one of {COLUMNAR_FORMATS} or None")
+        if columnar_format is not None and pa is None:
+            raise ImportError(f"pyarrow is required for {columnar_format} output "
+                              "(pip install pyarrow) or use columnar_format=None")
+
+        self.output_dir = output_dir
+        self.columnar_format = columnar_format
+        self.write_csv = write_csv
+        self.csv_path = os.path.join(output_dir, f'{name}.csv')
+        self.dataset_dir = os.path.join(output_dir, name)
+        self.sample_path = os.path.join(output_dir, 'sample_data.csv')
+        self.sampler = ReservoirSampler(sample_size, seed=seed)
+        self.rows_written = 0
+        self._csv_file = None
+        self._chunk_no = 0
+
+    def __enter__(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        # Start from an empty dataset, just like the CSV is overwritten
+        if self.columnar_format is not None and os.path.isdir(self.dataset_dir):
+            shutil.rmtree(self.dataset_dir)
+        if self.write_csv:
+            self._csv_file = open(self.csv_path, 'w', newline='')
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(write_sample=exc_type is None)
+
+    def write(self, chunk):
+        """Append one chunk to every configured output"""
+        if self._csv_file is not None:
+            chunk.to_csv(self._csv_file, header=self.rows_written == 0, index=False,
+                         date_format='%Y-%m-%d')
+        if self.columnar_format is not None:
+            self._write_partitions(chunk)
+        self.sampler.update(chunk)
+        self.rows_written += len(chunk)
+        self._chunk_no += 1
+
+    def _write_partitions(self, chunk):
+        """Split a chunk by year/month and write one part file per partition"""
+        dates = pd.DatetimeIndex(chunk['Date'])
+        period_key = dates.year.values * 100 + dates.month.values
+        # Chunks are date-ordered, so partitions are contiguous runs of the key
+        boundaries = np.flatnonzero(np.diff(period_key)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(chunk)]))
+
+        for start, end in zip(starts, ends):
+            year, month = divmod(int(period_key[start]), 100)
+            partition_dir = os.path.join(self.dataset_dir, f'year={year}', f'month={month:02d}')
+            os.makedirs(partition_dir, exist_ok=True)
+            table = pa.Table.from_pandas(chunk.iloc[start:end], preserve_index=False)
+            part_path = os.path.join(partition_dir, f'part-{self._chunk_no:05d}.{self.columnar_format}')
+            if self.columnar_format == 'parquet':
+                pq.write_table(table, part_path)
+            else:
+                feather.write_feather(table, part_path)
+
+    def close(self, write_sample=True):
+        """Close the CSV file and write the reservoir sample"""
+        if self._csv_file is not None:
+            self._csv_file.close()
+            self._csv_file = None
+        if write_sample and self.sampler.seen:
+            self.sampler.result().to_csv(self.sample_path, index=False, date_format='%Y-%m-%d')
@@ -0,0 +1,158 @@
+"""
+Batched recursive multi-step forecasting.
+
+Every series carries a short window of its most recent weekly sales. At each
+horizon step the model features of all series are built from those windows
+with array operations, one ``predict_fn`` call predicts the next week for
+every series, and the predictions are appended to the windows:
+
+- ``Sales_Lag_k`` is the sales value k weeks back,
+- ``Sales_Rolling_w`` is the mean of the last w weeks (shorter histories use
+  what exists, like ``rolling(min_periods=1)`` in preprocessing),
+- ``Month`` and ``WeekOfYear`` come from the forecast week's Week_Start and
+  ``IsWeekend`` stays 0 for weekly rows.
+
+The model only ever sees raw feature values; any scaling belongs inside
+``predict_fn``.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from src.feature_cache import MODEL_FEATURES, TARGET
+from src.feature_engineering import SERIES_KEYS, series_starts, sort_series_frame
+
+_LAG = re.compile(r'Sales_Lag_(\d+)$')
+_ROLLING = re.compile(r'Sales_Rolling_(\d+)$')
+
+
+def history_length(features=MODEL_FEATURES):
+    """Number of past weeks the lag and rolling features of ``features`` need"""
+    spans = [int(match.group(1)) for match in (_LAG.match(col) or _ROLLING.match(col) for col in features)
+             if match]
+    return max(spans, default=1)
+
+
+def sales_history(y, first_lags, length):
+    """
+    The last ``length`` weekly sales of one series, left-padded with NaN.
+
+    ``y`` holds the target of the series' feature rows in week order and
+    ``first_lags`` the Sales_Lag_1..k values of its first row, which are the
+    weeks before it that preprocessing dropped, most recent first.
+    """
+    known = np.concatenate([np.asarray(first_lags, dtype=np.float64)[::-1], np.asarray(y, dtype=np.float64)])
+    history = np.full(length, np.nan)
+    tail = known[-length:]
+    history[length - len(tail):] = tail
+    return history
+
+
+def lag_columns(features=MODEL_FEATURES):
+    """Positions of Sales_Lag_1, Sales_Lag_2, ... in ``features`` (consecutive lags only)"""
+    columns = []
+    while f'Sales_Lag_{len(columns) + 1}' in features:
+        columns.append(features.index(f'Sales_Lag_{len(columns) + 1}'))
+    return columns
+
+
+def history_matrix(data, length, lags=None, key_columns=()):
+    """
+    Recent weekly sales of every series in ``data``, one row per series.
+
+    ``data`` holds weekly feature rows with the series keys, Week_Start, the
+    target and the Sales_Lag_1..k columns. Series with fewer than ``length``
+    rows are extended with the lags of their first row and then NaN-padded.
+
+    Returns (keys, history, last_weeks) where ``keys`` is a frame of the
+    series keys in sorted order, plus any ``key_columns`` (e.g. Category)
+    taken from each series' last row.
+    """
+    data = sort_series_frame(data)
+    lags = lag_columns(list(data.columns)) if lags is None else lags
+    starts = np.flatnonzero(series_starts(data))
+    ends = np.append(starts[1:], len(data))
+    series = np.repeat(np.arange(len(starts)), ends - starts)
+    from_end = np.repeat(ends, ends - starts) - 1 - np.arange(len(data))
+
+    history = np.full((len(starts), length), np.nan)
+    recent = from_end < length
+    history[series[recent], length - 1 - from_end[recent]] = data[TARGET].to_numpy(dtype=np.float64)[recent]
+
+    # Weeks before the first row are only known through its lags
+    n_rows = ends - starts
+    for k, col in enumerate(lags, start=1):
+        column = length - n_rows - k
+        known = column >= 0
+        history[known, column[known]] = data.iloc[starts[known], col].to_numpy(dtype=np.float64)
+
+    key_columns = [col for col in key_columns if col not in SERIES_KEYS]
+    keys = data.iloc[ends - 1][SERIES_KEYS + key_columns].reset_index(drop=True)
+    last_weeks = data['Week_Start'].to_numpy()[ends - 1]
+    return keys, history, last_weeks
+
+
+def feature_matrix(history, weeks, features=MODEL_FEATURES):
+    """Model features of the week ``weeks`` for each series from its sales ``history``"""
+    calendar = pd.DatetimeIndex(weeks)
+    X = np.empty((len(history), len(features)))
+    for j, col in enumerate(features):
+        lag, rolling = _LAG.match(col), _ROLLING.match(col)
+        if lag:
+            X[:, j] = history[:, -int(lag.group(1))]
+        elif rolling:
+            window = history[:, -int(rolling.group(1)):]
+            X[:, j] = np.nansum(window, axis=1) / np.maximum((~np.isnan(window)).sum(axis=1), 1)
+        elif col == 'Month':
+            X[:, j] = calendar.month
+        elif col == 'WeekOfYear':
+            X[:, j] = calendar.isocalendar().week.to_numpy()
+        elif col == 'IsWeekend':
+            X[:, j] = 0
+        else:
+            raise ValueError(f"Don't know how to roll feature {col!r} forward")
+    return X
+
+
+class RecursiveForecaster:
+    """Forecast many series step by step with one batched predict per step"""
+
+    def __init__(self, predict_fn, features=MODEL_FEATURES):
+        """
+        Args:
+            predict_fn: maps a 2-D array (one row per series, columns ordered
+                like ``features``) to one prediction per row
+            features: model feature names
+        """
+        self.predict_fn = predict_fn
+        self.features = list(features)
+        self.length = history_length(self.features)
+
+    def forecast(self, history, last_weeks, n_weeks=4):
+        """
+        Forecast ``n_weeks`` after ``last_weeks`` for every series.
+
+        Args:
+            history: 2-D array of recent weekly sales per series (oldest first,
+                NaN-padded on the left); only the last columns that the
+                features need are used
+            last_weeks: Week_Start of each series' last observed week
+
+        Returns:
+            (predictions, weeks): arrays of shape (n_series, n_weeks)
+        """
+        history = np.asarray(history, dtype=np.float64)
+        if history.shape[1] < self.length:
+            padding = np.full((len(history), self.length - history.shape[1]), np.nan)
+            history = np.hstack([padding, history])
+        history = history[:, -self.length:].copy()
+
+        last_weeks = np.asarray(last_weeks, dtype='datetime64[ns]')
+        weeks = last_weeks[:, None] + np.arange(1, n_weeks + 1) * np.timedelta64(7, 'D')
+        predictions = np.empty((len(history), n_weeks))
+        for step in range(n_weeks):
+            predictions[:, step] = self.predict_fn(feature_matrix(history, weeks[:, step], self.features))
+            history = np.roll(history, -1, axis=1)
+            history[:, -1] = predictions[:, step]
+        return predictions, weeks
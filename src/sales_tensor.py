@@ -0,0 +1,174 @@
+"""
+Dense product x store x week tensor of the weekly data.
+
+The long weekly table has one row per (Product_ID, Store_ID, Week_Start).
+The catalog is close to a full grid, so the same values fit in dense arrays
+of shape (n_products, n_stores, n_weeks) over a complete weekly calendar,
+with a boolean mask of the cells that have a row. Weeks without a row hold
+NaN.
+
+On the tensor, series-wise operations need no groupby:
+
+- a lag is a slice of the week axis shifted by k,
+- a rolling mean is a difference of cumulative sums of the observed values
+  and of their counts along the week axis, so its cost does not grow with
+  the window,
+- product, store and weekly totals are sums over the other axes.
+
+Lags are by calendar week, so they agree with the row-based
+add_lag_rolling_features() for series without gaps and leave NaN where a
+week is missing instead of reaching back past it.
+
+    tensor = SalesTensor.from_frame(weekly_data)
+    tensor.product_totals().nlargest(5)
+    tensor.to_long(tensor.lag_rolling_features())
+"""
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering import DEFAULT_LAGS, DEFAULT_WINDOWS
+
+WEEK = np.timedelta64(7, 'D')
+
+
+class SalesTensor:
+    """Dense (product, store, week) arrays of weekly values plus the mask of observed cells"""
+
+    def __init__(self, products, stores, weeks, values, mask):
+        """
+        Args:
+            products, stores: labels of the first two axes
+            weeks: Week_Start of every position on the week axis, 7 days apart
+            values: dict of column name -> float64 array of shape (products, stores, weeks)
+            mask: bool array of the same shape, True where the long data has a row
+        """
+        self.products = pd.Index(products, name='Product_ID')
+        self.stores = pd.Index(stores, name='Store_ID')
+        self.weeks = pd.DatetimeIndex(weeks, name='Week_Start')
+        self.values = dict(values)
+        self.mask = mask
+
+    @classmethod
+    def from_frame(cls, data, value_columns=('Sales_Quantity',)):
+        """
+        Scatter long weekly rows into the dense tensor.
+
+        Every (Product_ID, Store_ID, Week_Start) may appear at most once and
+        the weeks must lie on one 7-day calendar.
+        """
+        product_codes, products = pd.factorize(data['Product_ID'].astype(str), sort=True)
+        store_codes, stores = pd.factorize(data['Store_ID'].astype(str), sort=True)
+        week_values = data['Week_Start'].to_numpy(dtype='datetime64[ns]')
+        if len(data):
+            first = week_values.min()
+            offsets = week_values - first
+            if (offsets % WEEK).any():
+                raise ValueError("Week_Start values are not on one weekly calendar")
+            week_codes = (offsets // WEEK).astype(np.int64)
+            weeks = first + np.arange(week_codes.max() + 1) * WEEK
+        else:
+            week_codes = np.zeros(0, dtype=np.int64)
+            weeks = np.zeros(0, dtype='datetime64[ns]')
+
+        shape = (len(products), len(stores), len(weeks))
+        flat = np.ravel_multi_index((product_codes, store_codes, week_codes), shape)
+        if len(np.unique(flat)) != len(flat):
+            raise ValueError("Duplicate (Product_ID, Store_ID, Week_Start) rows")
+
+        mask = np.zeros(shape, dtype=bool)
+        mask.flat[flat] = True
+        values = {}
+        for column in value_columns:
+            cells = np.full(shape, np.nan)
+            cells.flat[flat] = data[column].to_numpy(dtype=np.float64)
+            values[column] = cells
+        return cls(products, stores, weeks, values, mask)
+
+    @property
+    def shape(self):
+        return self.mask.shape
+
+    def lag(self, k, column='Sales_Quantity'):
+        """Value ``k`` weeks earlier in the same series (NaN before the first week or for missing weeks)"""
+        values = self.values[column]
+        shifted = np.full_like(values, np.nan)
+        if k < values.shape[2]:
+            shifted[:, :, k:] = values[:, :, :values.shape[2] - k]
+        return shifted
+
+    def rolling_mean(self, window, column='Sales_Quantity'):
+        """
+        Mean of the observed values among the ``window`` previous weeks.
+
+        Matches ``shift(1).rolling(window, min_periods=1).mean()`` per series
+        (NaN when none of those weeks is observed).
+        """
+        values = self.values[column]
+        observed = ~np.isnan(values)
+        # Cumulative sums and counts with a leading zero: position t holds weeks 0..t-1
+        zeros = np.zeros(values.shape[:2] + (1,))
+        sums = np.concatenate([zeros, np.cumsum(np.where(observed, values, 0.0), axis=2)], axis=2)
+        counts = np.concatenate([zeros, np.cumsum(observed, axis=2)], axis=2)
+        # The window of week t covers weeks t-window..t-1
+        end = np.arange(values.shape[2])
+        start = np.maximum(end - window, 0)
+        window_sums = sums[:, :, end] - sums[:, :, start]
+        window_counts = counts[:, :, end] - counts[:, :, start]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(window_counts > 0, window_sums / window_counts, np.nan)
+
+    def lag_rolling_features(self, lags=DEFAULT_LAGS, windows=DEFAULT_WINDOWS, column='Sales_Quantity',
+                             prefix='Sales'):
+        """Dict of ``{prefix}_Lag_{k}`` and ``{prefix}_Rolling_{w}`` tensors, named like add_lag_rolling_features()"""
+        features = {f'{prefix}_Lag_{k}': self.lag(k, column) for k in sorted(lags)}
+        features.update({f'{prefix}_Rolling_{w}': self.rolling_mean(w, column) for w in sorted(windows)})
+        return features
+
+    def weekly_totals(self, column='Sales_Quantity'):
+        """Sum over all series of every week that has data"""
+        totals = pd.Series(np.nansum(self.values[column], axis=(0, 1)), index=self.weeks, name=column)
+        return totals[self.mask.any(axis=(0, 1))]
+
+    def product_totals(self, column='Sales_Quantity'):
+        """Sum over all stores and weeks of every product"""
+        return pd.Series(np.nansum(self.values[column], axis=(1, 2)), index=self.products, name=column)
+
+    def store_totals(self, column='Sales_Quantity'):
+        """Sum over all products and weeks of every store"""
+        return pd.Series(np.nansum(self.values[column], axis=(0, 2)), index=self.stores, name=column)
+
+    def total(self, column='Sales_Quantity'):
+        """Sum of ``column`` over every observed cell"""
+        return float(np.nansum(self.values[column]))
+
+    def mean(self, column='Sales_Quantity'):
+        """Mean of ``column`` over the observed cells"""
+        return float(np.nanmean(self.values[column][self.mask]))
+
+    def series(self, product_id, store_id, columns=None):
+        """Observed weeks of one series in week order, with Week_Start and the value columns"""
+        p, s = self.products.get_loc(str(product_id)), self.stores.get_loc(str(store_id))
+        observed = self.mask[p, s]
+        columns = list(self.values) if columns is None else list(columns)
+        frame = pd.DataFrame({'Week_Start': self.weeks[observed]})
+        for column in columns:
+            frame[column] = self.values[column][p, s, observed]
+        return frame
+
+    def to_long(self, features=None):
+        """
+        Long frame of the observed cells, sorted by series and week.
+
+        ``features`` is an optional dict of extra tensors of the same shape
+        (e.g. from lag_rolling_features()) added as columns.
+        """
+        p, s, w = np.nonzero(self.mask)
+        frame = pd.DataFrame({
+            'Product_ID': pd.Categorical.from_codes(p, categories=self.products),
+            'Store_ID': pd.Categorical.from_codes(s, categories=self.stores),
+            'Week_Start': self.weeks[w],
+        })
+        for name, cells in {**self.values, **(features or {})}.items():
+            frame[name] = cells[p, s, w]
+        # np.nonzero walks the cells in C order, which is already (product, store, week) order
+        return frame
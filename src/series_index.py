@@ -0,0 +1,66 @@
+"""
+Per-series index over weekly data for O(1) product-store lookups.
+
+The data is sorted by (Product_ID, Store_ID, Week_Start) once and the start
+and end row offsets of every series are recorded. Looking a series up is then
+a dict lookup plus a positional slice, which returns a view of the sorted
+frame instead of scanning and sorting the whole table.
+
+    index = SeriesIndex(weekly_data)
+    history = index.get('P001', 'S01')
+"""
+import numpy as np
+import pandas as pd
+
+from src.feature_engineering import SERIES_KEYS, series_starts, sort_series_frame
+
+
+class SeriesIndex:
+    """Sorted frame plus the [start, end) row offsets of each series"""
+
+    def __init__(self, data, group_cols=SERIES_KEYS, time_col='Week_Start', presorted=False):
+        """
+        Args:
+            data: frame with the ``group_cols`` key columns and ``time_col``
+            presorted: ``data`` is already ordered by ``group_cols`` and ``time_col``
+                (e.g. frames read with load_processed()), so it is not sorted again
+        """
+        self.group_cols = list(group_cols)
+        self.data = data.reset_index(drop=True) if presorted else sort_series_frame(data, self.group_cols, time_col)
+        self.starts = np.flatnonzero(series_starts(self.data, self.group_cols))
+        self.ends = np.append(self.starts[1:], len(self.data))
+
+        first_rows = self.data.iloc[self.starts]
+        self._keys = list(zip(*(first_rows[col].astype(str) for col in self.group_cols)))
+        self._positions = {key: i for i, key in enumerate(self._keys)}
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return tuple(str(value) for value in key) in self._positions
+
+    def keys(self):
+        """Series keys in sorted order"""
+        return list(self._keys)
+
+    def bounds(self, *key):
+        """[start, end) row offsets of one series in ``self.data``"""
+        i = self._positions[tuple(str(value) for value in key)]
+        return int(self.starts[i]), int(self.ends[i])
+
+    def get(self, *key):
+        """Rows of one series ordered by time, as a view of the sorted frame"""
+        start, end = self.bounds(*key)
+        return self.data.iloc[start:end]
+
+    def get_many(self, keys):
+        """Dict of key -> rows for a batch of series; keys that are not indexed are skipped"""
+        return {tuple(key): self.get(*key) for key in keys if key in self}
+
+    def offsets(self):
+        """Frame of series keys with their start and end row offsets"""
+        offsets = pd.DataFrame(self._keys, columns=self.group_cols)
+        offsets['start'] = self.starts
+        offsets['end'] = self.ends
+        return offsets
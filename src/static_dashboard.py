@@ -1,10 +1,18 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 import os
+import sys
 from datetime import datetime, timedelta
 
+if __package__ in (None, ''):
+    # Allow running as `python src/static_dashboard.py` from the project root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.data_loader import load_processed
+from src.forecast_store import load_series_forecast
+from src.sales_tensor import SalesTensor
+
 def generate_dashboard():
     """Generate a static dashboard with visualizations"""
     print("Generating static dashboard...")
@@ -14,15 +22,14 @@ def generate_dashboard():
     
     # Load data
     try:
-        weekly_data = pd.read_csv("data/processed/weekly_data.csv")
-        weekly_data['Week_Start'] = pd.to_datetime(weekly_data['Week_Start'])
+        weekly_data = load_processed(columns=['Product_ID', 'Store_ID', 'Week_Start',
+                                              'Sales_Quantity', 'Inventory_Level'])
+        # Dense product x store x week arrays; aggregates are array sums, not groupbys
+        sales_tensor = SalesTensor.from_frame(weekly_data, value_columns=('Sales_Quantity', 'Inventory_Level'))
         
-        forecast_path = "data/processed/forecast_results_P001_S01.csv"
-        if os.path.exists(forecast_path):
-            forecast_data = pd.read_csv(forecast_path)
-            forecast_data['Week_Start'] = pd.to_datetime(forecast_data['Week_Start'])
-        else:
-            forecast_data = None
+        # Materialized forecasts when available; the single-series CSV otherwise
+        forecast_data = load_series_forecast('P001', 'S01',
+                                             fallback_path="data/processed/forecast_results_P001_S01.csv")
             
         print("Data loaded successfully")
     except Exception as e:
@@ -38,7 +45,7 @@ def generate_dashboard():
     # 1. Weekly Sales Trend
     print("Generating weekly sales trend...")
     plt.figure(figsize=(12, 6))
-    sales_by_week = weekly_data.groupby('Week_Start')['Sales_Quantity'].sum().reset_index()
+    sales_by_week = sales_tensor.weekly_totals().reset_index()
     plt.plot(sales_by_week['Week_Start'], sales_by_week['Sales_Quantity'], marker='o')
     plt.title('Weekly Sales Trend', fontsize=16)
     plt.xlabel('Date', fontsize=14)
@@ -52,8 +59,8 @@ def generate_dashboard():
     # 2. Top Products by Sales
     print("Generating top products chart...")
     plt.figure(figsize=(12, 6))
-    product_sales = weekly_data.groupby('Product_ID')['Sales_Quantity'].sum().sort_values(ascending=False)
-    sns.barplot(x=product_sales.index[:5], y=product_sales.values[:5])
+    product_sales = sales_tensor.product_totals().sort_values(ascending=False)
+    sns.barplot(x=product_sales.index[:5].astype(str), y=product_sales.values[:5])
     plt.title('Top 5 Products by Sales', fontsize=16)
     plt.xlabel('Product ID', fontsize=14)
     plt.ylabel('Total Sales', fontsize=14)
@@ -65,8 +72,8 @@ def generate_dashboard():
     # 3. Top Stores by Sales
     print("Generating top stores chart...")
     plt.figure(figsize=(12, 6))
-    store_sales = weekly_data.groupby('Store_ID')['Sales_Quantity'].sum().sort_values(ascending=False)
-    sns.barplot(x=store_sales.index, y=store_sales.values)
+    store_sales = sales_tensor.store_totals().sort_values(ascending=False)
+    sns.barplot(x=store_sales.index.astype(str), y=store_sales.values)
     plt.title('Stores by Sales', fontsize=16)
     plt.xlabel('Store ID', fontsize=14)
     plt.ylabel('Total Sales', fontsize=14)
@@ -91,35 +98,41 @@ def generate_dashboard():
     # 5. Forecast Visualization (if available)
     if forecast_data is not None:
         print("Generating forecast visualization...")
-        plt.figure(figsize=(12, 6))
         
         # Get historical data for P001 and S01
-        historical_data = weekly_data[(weekly_data['Product_ID'] == 'P001') & 
-                                     (weekly_data['Store_ID'] == 'S01')].sort_values('Week_Start')
-        
-        # Plot historical data (last 12 weeks)
-        plt.plot(historical_data['Week_Start'].tail(12), 
-                historical_data['Sales_Quantity'].tail(12), 
-                marker='o', color='blue', label='Historical Sales')
+        try:
+            historical_data = sales_tensor.series('P001', 'S01')
+        except KeyError:
+            historical_data = None
+        has_history = historical_data is not None and not historical_data.empty
+        if not has_history:
+            print("No sales history for Product P001 at Store S01, skipping the forecast plot")
+        else:
+            plt.figure(figsize=(12, 6))
+            
+            # Plot historical data (last 12 weeks)
+            plt.plot(historical_data['Week_Start'].tail(12), 
+                    historical_data['Sales_Quantity'].tail(12), 
+                    marker='o', color='blue', label='Historical Sales')
         
-        # Plot forecast
-        plt.plot(forecast_data['Week_Start'], 
-                forecast_data['Forecasted_Sales'], 
-                marker='s', linestyle='--', color='red', label='Forecasted Sales')
+            # Plot forecast
+            plt.plot(forecast_data['Week_Start'], 
+                    forecast_data['Forecasted_Sales'], 
+                    marker='s', linestyle='--', color='red', label='Forecasted Sales')
         
-        # Add vertical line to separate historical and forecasted data
-        last_date = historical_data['Week_Start'].max()
-        plt.axvline(x=last_date, color='gray', linestyle='--')
+            # Add vertical line to separate historical and forecasted data
+            last_date = historical_data['Week_Start'].max()
+            plt.axvline(x=last_date, color='gray', linestyle='--')
         
-        plt.title('Sales Forecast for Product P001 at Store S01', fontsize=16)
-        plt.xlabel('Date', fontsize=14)
-        plt.ylabel('Sales Quantity', fontsize=14)
-        plt.legend(fontsize=12)
-        plt.grid(True)
-        plt.xticks(rotation=45)
-        plt.tight_layout()
-        plt.savefig('reports/dashboard/sales_forecast.png', dpi=300)
-        plt.close()
+            plt.title('Sales Forecast for Product P001 at Store S01', fontsize=16)
+            plt.xlabel('Date', fontsize=14)
+            plt.ylabel('Sales Quantity', fontsize=14)
+            plt.legend(fontsize=12)
+            plt.grid(True)
+            plt.xticks(rotation=45)
+            plt.tight_layout()
+            plt.savefig('reports/dashboard/sales_forecast.png', dpi=300)
+            plt.close()
         
         # 6. Optimal Inventory Visualization
         print("Generating optimal inventory visualization...")
@@ -237,15 +250,15 @@ def generate_dashboard():
 
         <div class="metrics-container">
             <div class="metric-card">
-                <div class="metric-value">{weekly_data['Sales_Quantity'].sum():,.0f}</div>
+                <div class="metric-value">{sales_tensor.total('Sales_Quantity'):,.0f}</div>
                 <div class="metric-label">Total Sales</div>
             </div>
             <div class="metric-card">
-                <div class="metric-value">{weekly_data['Inventory_Level'].mean():,.1f}</div>
+                <div class="metric-value">{sales_tensor.mean('Inventory_Level'):,.1f}</div>
                 <div class="metric-label">Average Inventory</div>
             </div>
             <div class="metric-card">
-                <div class="metric-value">{weekly_data['Product_ID'].nunique()}</div>
+                <div class="metric-value">{len(sales_tensor.products)}</div>
                 <div class="metric-label">Number of Products</div>
             </div>
         </div>
@@ -279,12 +292,15 @@ def generate_dashboard():
     if forecast_data is not None:
         html_content += """
         <h2>Demand Forecasting</h2>
-        
+        """
+        if has_history:
+            html_content += """
         <div class="visualization">
             <img src="sales_forecast.png" alt="Sales Forecast">
             <p class="caption">Historical and forecasted sales for Product P001 at Store S01</p>
         </div>
-
+        """
+        html_content += """
         <div class="visualization">
             <img src="optimal_inventory.png" alt="Optimal Inventory">
             <p class="caption">Forecasted sales and recommended optimal inventory levels</p>
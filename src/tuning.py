@@ -0,0 +1,206 @@
+"""
+Hyperparameter search for the per-series Random Forest.
+
+Candidates are sampled from a parameter grid and scored by the rolling-origin
+backtest (backtesting.py) with successive halving: every candidate is first
+scored on a small random subset of the series, only the best 1/eta move on
+to a subset eta times larger, and so on until the survivors are scored on
+all series. With R = ceil(log_eta(n_candidates)) rungs each rung costs about
+the same, so total work grows like n_candidates * budget / eta^R, i.e.
+roughly with log(n_candidates) rather than linearly.
+
+The feature cache, the fold cutoffs and the series order are fixed once and
+shared by every candidate, series scored at an earlier rung are not scored
+again, and all (candidate, fold, series chunk) tasks of a rung run in one
+process pool. The leaderboard lists every candidate with the rung it
+reached and its backtest errors there; the best parameters are written as
+JSON for ``forecast_model.py --params``.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+if __package__ in (None, ''):
+    # Allow running as `python src/tuning.py` from the project root
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.backtesting import fold_metrics, init_fold_worker, rolling_origins, run_fold, run_fold_task
+from src.feature_cache import load_feature_cache
+from src.forecast_model import DEFAULT_RF_PARAMS, select_series
+from src.parallel_training import chunk_series, plan_workers
+
+LEADERBOARD_PATH = 'data/processed/tuning_leaderboard.csv'
+BEST_PARAMS_PATH = 'models/best_params.json'
+PARAM_GRID = {
+    'n_estimators': [50, 100, 200],
+    'max_depth': [None, 8, 16],
+    'min_samples_leaf': [1, 3, 5],
+    'max_features': [1.0, 0.5, 'sqrt'],
+}
+
+
+def sample_candidates(grid=PARAM_GRID, n_candidates=20, random_state=42):
+    """
+    Up to ``n_candidates`` distinct parameter dicts sampled from ``grid``.
+
+    The current setting (DEFAULT_RF_PARAMS over the Random Forest defaults)
+    comes first when the grid contains it, so the search always compares
+    against it.
+    """
+    names = sorted(grid)
+    combinations = list(itertools.product(*(grid[name] for name in names)))
+    current_params = {**RandomForestRegressor().get_params(), **DEFAULT_RF_PARAMS}
+    current = tuple(current_params[name] for name in names)
+    rng = np.random.default_rng(random_state)
+    order = [i for i in rng.permutation(len(combinations)) if combinations[i] != current]
+    if current in combinations:
+        combinations.append(current)
+        order.insert(0, len(combinations) - 1)
+    return [dict(zip(names, combinations[i])) for i in order[:n_candidates]]
+
+
+def halving_schedule(n_candidates, n_units, eta=3, min_units=1):
+    """
+    (candidates, units) evaluated at each rung of successive halving.
+
+    The last rung evaluates its ceil(n / eta^R) survivors on all ``n_units``
+    units and every earlier rung keeps 1/eta of the candidates on 1/eta of
+    the units, never fewer than ``min_units``.
+    """
+    n_rungs = max(1, math.ceil(math.log(n_candidates, eta)) + 1) if n_candidates > 1 else 1
+    schedule = []
+    for rung in range(n_rungs):
+        candidates = max(1, math.ceil(n_candidates / eta ** rung))
+        units = max(min(min_units, n_units), math.ceil(n_units / eta ** (n_rungs - 1 - rung)))
+        schedule.append((candidates, units))
+        if candidates == 1:
+            break
+    schedule[-1] = (schedule[-1][0], n_units)
+    return schedule
+
+
+def tune(products=None, stores=None, grid=PARAM_GRID, n_candidates=20, n_folds=3, horizon=4, eta=3,
+         min_series=2, n_workers=1, output_path=LEADERBOARD_PATH, best_params_path=BEST_PARAMS_PATH,
+         random_state=42, verbose=True):
+    """
+    Successive-halving search of Random Forest parameters over the backtest folds.
+
+    Args:
+        products, stores: only tune on these product / store IDs (all when None)
+        grid: parameter values to sample candidates from
+        n_candidates: number of sampled candidates
+        n_folds, horizon: backtest folds (see rolling_origins())
+        eta: keep 1/eta of the candidates at each rung
+        min_series: series in the first rung's subset at least
+        n_workers: worker processes (-1 for one per core); 1 runs in-process
+        output_path, best_params_path: leaderboard CSV and best-parameter JSON (skipped when None)
+
+    Returns:
+        (leaderboard, stats)
+    """
+    log = print if verbose else (lambda *args, **kwargs: None)
+    feature_cache = load_feature_cache()
+    pairs = select_series(feature_cache.keys(), products, stores)
+    if not pairs:
+        raise ValueError("No product-store series match the given filters")
+    cutoffs = rolling_origins(feature_cache.week_start, n_folds, horizon)
+    # One fixed random order, so each rung's subset extends the previous one
+    rng = np.random.default_rng(random_state)
+    pairs = [pairs[i] for i in rng.permutation(len(pairs))]
+
+    candidates = sample_candidates(grid, n_candidates, random_state)
+    schedule = halving_schedule(len(candidates), len(pairs), eta, min_series)
+    workers, n_jobs = plan_workers(n_workers, len(candidates) * min(schedule[0][1], len(pairs)) * n_folds)
+    pool = None if n_workers == 1 else ProcessPoolExecutor(
+        max_workers=workers, initializer=init_fold_worker, initargs=(feature_cache.cache_dir,))
+
+    predictions = {i: [] for i in range(len(candidates))}
+    scored = {i: 0 for i in range(len(candidates))}
+    board = {i: {} for i in range(len(candidates))}
+    alive = list(range(len(candidates)))
+    start = time.perf_counter()
+    fits = 0
+    try:
+        for rung, (n_keep, n_series) in enumerate(schedule):
+            alive = sorted(alive, key=lambda i: board[i].get('MAE', 0))[:n_keep]
+            tasks = [(i, fold, cutoff, chunk) for i in alive for fold, cutoff in enumerate(cutoffs)
+                     for _, chunk in chunk_series(pairs[scored[i]:n_series], workers)]
+            if pool is None:
+                parts = [run_fold(feature_cache, fold, cutoff, chunk, horizon, 'random_forest', candidates[i])
+                         for i, fold, cutoff, chunk in tasks]
+            else:
+                futures = [pool.submit(run_fold_task, fold, cutoff, chunk, horizon, 'random_forest',
+                                       candidates[i], n_jobs) for i, fold, cutoff, chunk in tasks]
+                parts = [future.result() for future in futures]
+            fits += sum(len(chunk) for _, _, _, chunk in tasks)
+
+            for (i, _, _, _), part in zip(tasks, parts):
+                if part is not None:
+                    predictions[i].append(part)
+            for i in alive:
+                scored[i] = n_series
+                metrics = fold_metrics(pd.concat(predictions[i], ignore_index=True), cutoffs, 'random_forest')
+                board[i] = {'Rung': rung, 'Series': n_series,
+                            **metrics[['MAE', 'RMSE', 'MAPE']].astype(np.float64).mean().to_dict()}
+            log(f"Rung {rung}: {len(alive)} candidates on {n_series} series, "
+                f"best MAE {min(board[i]['MAE'] for i in alive):.3f}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    elapsed = time.perf_counter() - start
+
+    leaderboard = pd.DataFrame([{'Candidate': i, **candidates[i], **board[i]} for i in range(len(candidates))])
+    leaderboard = leaderboard.sort_values(['Rung', 'MAE'], ascending=[False, True], ignore_index=True)
+    leaderboard.insert(0, 'Rank', np.arange(1, len(leaderboard) + 1))
+    for name in grid:
+        # Keep integer settings integral next to None (e.g. max_depth)
+        if all(value is None or isinstance(value, int) for value in grid[name]):
+            leaderboard[name] = leaderboard[name].astype('Int64')
+    best = candidates[leaderboard['Candidate'].iloc[0]]
+
+    if output_path is not None:
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        leaderboard.to_csv(output_path, index=False, float_format='%.4f')
+    if best_params_path is not None:
+        os.makedirs(os.path.dirname(best_params_path) or '.', exist_ok=True)
+        with open(best_params_path, 'w') as f:
+            json.dump(best, f, indent=2)
+
+    exhaustive = len(candidates) * len(pairs) * n_folds
+    stats = {'candidates': len(candidates), 'rungs': len(schedule), 'fits': fits, 'seconds': elapsed,
+             'exhaustive_fits': exhaustive, 'best_params': best}
+    log(f"Tuned {len(candidates)} candidates with {fits} fits ({exhaustive} for a full search) "
+        f"in {elapsed:.2f}s; best: {best}")
+    return leaderboard, stats
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Tune the Random Forest with successive halving over backtest folds")
+    parser.add_argument('--products', nargs='+', help="Only tune on these product IDs")
+    parser.add_argument('--stores', nargs='+', help="Only tune on these store IDs")
+    parser.add_argument('--candidates', type=int, default=20, help="Number of sampled parameter settings")
+    parser.add_argument('--folds', type=int, default=3, help="Backtest cutoffs")
+    parser.add_argument('--horizon', type=int, default=4, help="Weeks forecast after each cutoff")
+    parser.add_argument('--eta', type=int, default=3, help="Keep 1/eta of the candidates at each rung")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes (-1 for one per CPU core)")
+    parser.add_argument('--output', default=LEADERBOARD_PATH, help="Leaderboard CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    tune(args.products, args.stores, n_candidates=args.candidates, n_folds=args.folds, horizon=args.horizon,
+         eta=args.eta, n_workers=args.workers, output_path=args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,32 @@
 import unittest
+import json
 import os
+import tempfile
 import pandas as pd
 import numpy as np
-from src.forecast_model import main as forecast_main
+from src.forecast_model import main as forecast_main, evaluate, evaluate_by_series, forecast_all, forecast_global, forecast_series, forecast_tiered
+from src.data_generator import SalesDataGenerator, daily_demand_factor
+from src.raw_data_writer import ReservoirSampler, StreamingRawWriter
+from src.feature_engineering import add_lag_rolling_features, week_start_from_year_week
+from src.preprocess_data import preprocess
+from src.incremental_preprocess import preprocess_incremental
+from src.data_loader import load_sales_data, load_weekly_data
+from src.processed_store import WeeklyStore
+from src.series_index import SeriesIndex
+from src.sales_tensor import SalesTensor
+from src.hierarchical import aggregate, forecast_hierarchy, hierarchy, reconcile
+from src.direct_forecast import DirectForecaster, shifted_targets
+from src.recursive_forecast import RecursiveForecaster, history_matrix, sales_history
+from src.model_registry import ModelRegistry
+from src.forecast_server import ForecastService
+from src.backtesting import backtest, backtest_series, rolling_origins
+from src.tuning import halving_schedule, sample_candidates, tune
+from src.baseline_models import exponential_smoothing, forecast_baselines, forecast_chosen, route_by_volume, seasonal_naive
+from src.inventory_optimization import calculate_optimal_inventory, inventory_plan, optimize_inventory, quantile_sigma, z_score
+from src.quantile_forecast import forecast_quantiles, tree_paths
+from src.forecast_store import ForecastStore, refresh as refresh_forecasts, series_watermarks
+from src.parallel_training import chunk_series, plan_workers
+from src.feature_cache import MODEL_FEATURES, add_calendar_features, load_feature_cache
 
 class TestForecastModel(unittest.TestCase):
     """Test cases for the forecasting model"""
@@ -14,9 +38,10 @@ class TestForecastModel(unittest.TestCase):
         os.makedirs('models', exist_ok=True)
         os.makedirs('images', exist_ok=True)
         
-        # Check if test data exists
-        self.data_exists = os.path.exists('data/processed/train_data.csv') and \
-                          os.path.exists('data/processed/test_data.csv')
+        # Check if test data exists (columnar store or legacy CSVs)
+        self.data_exists = os.path.exists('data/processed/weekly_store/_metadata.json') or \
+                          (os.path.exists('data/processed/train_data.csv') and
+                           os.path.exists('data/processed/test_data.csv'))
     
     def test_data_files_exist(self):
         """Test if necessary data files exist"""
@@ -91,5 +116,1052 @@ class TestForecastModel(unittest.TestCase):
             self.assertTrue(os.path.exists(img_path), 
                            f"Expected visualization file {img_path} not found")
 
+class TestSalesDataGenerator(unittest.TestCase):
+    """Test cases for the vectorized synthetic data generator"""
+
+    def test_chunking_preserves_row_order(self):
+        """Test that chunked output follows the date x product x store order"""
+        generator = SalesDataGenerator(n_products=4, n_stores=3, start_date='2022-01-01',
+                                       end_date='2022-01-05', chunk_rows=5)
+        chunks = list(generator.iter_chunks())
+        self.assertTrue(all(len(chunk) <= 5 for chunk in chunks))
+
+        data = pd.concat(chunks, ignore_index=True)
+        self.assertEqual(len(data), generator.n_rows)
+        expected = [(date, product_id, store_id)
+                    for date in generator.dates
+                    for product_id in generator.product_ids
+                    for store_id in generator.store_ids]
+        actual = list(zip(data['Date'], data['Product_ID'].astype(str), data['Store_ID'].astype(str)))
+        self.assertEqual(actual, expected)
+
+    def test_same_seed_is_reproducible(self):
+        """Test that two generators with the same seed produce identical data"""
+        first = SalesDataGenerator(n_products=3, n_stores=2, end_date='2022-02-01', seed=7).generate()
+        second = SalesDataGenerator(n_products=3, n_stores=2, end_date='2022-02-01', seed=7).generate()
+        pd.testing.assert_frame_equal(first, second)
+        self.assertTrue((first['Sales_Quantity'] >= 0).all())
+        self.assertTrue((first['Inventory_Level'] >= 0).all())
+
+    def test_demand_model_matches_original_formula(self):
+        """Test the weekend and holiday effects of the vectorized demand model"""
+        dates = pd.to_datetime(['2022-03-07', '2022-03-12', '2022-12-20'])
+        factors = daily_demand_factor(dates)
+        for date, factor in zip(dates, factors):
+            base_sales = 50 + 30 * np.sin(2 * np.pi * date.dayofyear / 365)
+            weekend_factor = 1.2 if date.weekday() >= 5 else 1.0
+            holiday_factor = 1.5 if (date.month == 12 and date.day >= 15) or (date.month == 11 and date.day >= 25) else 1.0
+            self.assertAlmostEqual(factor, base_sales * weekend_factor * holiday_factor)
+
+class TestStreamingRawWriter(unittest.TestCase):
+    """Test cases for the streaming raw data writer"""
+
+    def test_reservoir_sample_is_uniform(self):
+        """Test that every stream position is equally likely to be sampled"""
+        hits = np.zeros(100)
+        for seed in range(300):
+            sampler = ReservoirSampler(10, seed=seed)
+            for start in range(0, 100, 7):
+                sampler.update(pd.DataFrame({'pos': np.arange(start, min(start + 7, 100))}))
+            sample = sampler.result()['pos'].values
+            self.assertEqual(len(np.unique(sample)), 10)
+            hits[sample] += 1
+        # Each position is expected 30 times; allow generous sampling noise
+        self.assertTrue(hits.min() > 10 and hits.max() < 55)
+
+    def test_streamed_outputs_match_generated_data(self):
+        """Test that CSV, partitioned Parquet and the sample agree with the generator"""
+        generator = SalesDataGenerator(n_products=3, n_stores=2, start_date='2022-01-20',
+                                       end_date='2022-03-10', chunk_rows=50)
+        with tempfile.TemporaryDirectory() as tmp:
+            with StreamingRawWriter(tmp, sample_size=40) as writer:
+                for chunk in generator.iter_chunks():
+                    writer.write(chunk)
+
+            expected = generator.generate()
+            csv_data = pd.read_csv(writer.csv_path, parse_dates=['Date'])
+            self.assertEqual(len(csv_data), len(expected))
+            self.assertTrue((csv_data['Sales_Quantity'].values == expected['Sales_Quantity'].values).all())
+
+            months = sorted(os.listdir(os.path.join(writer.dataset_dir, 'year=2022')))
+            self.assertEqual(months, ['month=01', 'month=02', 'month=03'])
+            parquet_data = pd.read_parquet(writer.dataset_dir).sort_values(['Date', 'Product_ID', 'Store_ID'])
+            self.assertEqual(parquet_data['Sales_Quantity'].sum(), expected['Sales_Quantity'].sum())
+
+            sample = pd.read_csv(writer.sample_path)
+            self.assertEqual(len(sample), 40)
+
+class TestWeekStart(unittest.TestCase):
+    """Regression tests for the vectorized Week_Start derivation"""
+
+    @staticmethod
+    def legacy_week_start(frame):
+        """The original row-wise string formatting and parsing"""
+        return frame.apply(
+            lambda row: pd.to_datetime(f"{row['Year']}-W{row['WeekOfYear']:02d}-1", format='%Y-W%W-%w'),
+            axis=1
+        )
+
+    def test_matches_legacy_for_all_iso_weeks(self):
+        """Test every ISO week number over several decades"""
+        years, weeks = np.meshgrid(np.arange(1995, 2036), np.arange(1, 54))
+        frame = pd.DataFrame({'Year': years.ravel(), 'WeekOfYear': weeks.ravel()})
+        expected = pd.DatetimeIndex(self.legacy_week_start(frame))
+        actual = week_start_from_year_week(frame['Year'], frame['WeekOfYear'])
+        self.assertTrue((actual == expected).all())
+
+    def test_matches_legacy_for_daily_dates(self):
+        """Test year/week keys derived from daily dates exactly like the preprocessing does"""
+        dates = pd.Series(pd.date_range('2019-12-20', '2024-01-10', freq='D'))
+        frame = pd.DataFrame({'Year': dates.dt.year, 'WeekOfYear': dates.dt.isocalendar().week}).drop_duplicates()
+        expected = pd.DatetimeIndex(self.legacy_week_start(frame))
+        actual = week_start_from_year_week(frame['Year'], frame['WeekOfYear'])
+        self.assertTrue((actual == expected).all())
+
+class TestLagRollingFeatures(unittest.TestCase):
+    """Test cases for the single-pass lag and rolling feature engine"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        rows = []
+        # Series of different lengths, shuffled, to exercise the series boundaries
+        for product_id, store_id, n_weeks in [('P001', 'S01', 12), ('P001', 'S02', 3), ('P002', 'S01', 1), ('P003', 'S01', 9)]:
+            for week in pd.date_range('2023-01-02', periods=n_weeks, freq='W-MON'):
+                rows.append((product_id, store_id, week, int(rng.integers(0, 100))))
+        self.weekly = pd.DataFrame(rows, columns=['Product_ID', 'Store_ID', 'Week_Start', 'Sales_Quantity'])
+        self.weekly = self.weekly.sample(frac=1.0, random_state=1).reset_index(drop=True)
+
+    def legacy_features(self, lags, windows):
+        """Per-series reference implementation using pandas shift/rolling"""
+        data = self.weekly.sort_values(['Product_ID', 'Store_ID', 'Week_Start']).reset_index(drop=True)
+        grouped = data.groupby(['Product_ID', 'Store_ID'])['Sales_Quantity']
+        for lag in lags:
+            data[f'Sales_Lag_{lag}'] = grouped.shift(lag)
+        for window in windows:
+            data[f'Sales_Rolling_{window}'] = grouped.transform(
+                lambda s: s.shift(1).rolling(window=window, min_periods=1).mean())
+        return data
+
+    def test_matches_per_series_pandas(self):
+        """Test the default lags and windows against pandas shift/rolling"""
+        expected = self.legacy_features([1, 2, 3, 4], [2, 4, 8])
+        actual = add_lag_rolling_features(self.weekly)
+        self.assertEqual(list(actual.columns), list(expected.columns))
+        pd.testing.assert_frame_equal(actual, expected)
+
+    def test_configurable_lags_and_windows(self):
+        """Test custom lags and windows, including ones longer than some series"""
+        expected = self.legacy_features([2, 5], [3, 10])
+        actual = add_lag_rolling_features(self.weekly, lags=[2, 5], windows=[3, 10])
+        pd.testing.assert_frame_equal(actual, expected)
+
+class TestPreprocessPipeline(unittest.TestCase):
+    """Test cases for the in-process preprocessing API"""
+
+    def setUp(self):
+        if not os.path.exists('data/raw/sales_inventory_data.csv'):
+            self.skipTest("Raw data not found, skipping test")
+
+    def test_preprocess_in_process(self):
+        """Test that preprocess() returns the stage DataFrames and writes the CSVs"""
+        with tempfile.TemporaryDirectory() as tmp:
+            result = preprocess(out_dir=tmp, make_plots=False, verbose=False)
+            store = WeeklyStore(os.path.join(tmp, 'weekly_store'))
+            self.assertTrue(store.exists())
+            self.assertFalse(os.path.exists(os.path.join(tmp, 'train_data.csv')))
+            stored = store.read()
+
+        features = result['features']
+        self.assertEqual(len(stored), len(features))
+        self.assertEqual(len(result['train']) + len(result['test']), len(features))
+        self.assertLess(result['train']['Week_Start'].max(), result['test']['Week_Start'].min())
+        self.assertFalse(features.isna().any().any())
+        self.assertNotIn('plot', result['timings'])
+        self.assertTrue({'load', 'join', 'aggregate', 'features', 'split', 'save'} <= set(result['timings']))
+
+class TestIncrementalPreprocess(unittest.TestCase):
+    """Test cases for incremental preprocessing"""
+
+    def setUp(self):
+        if not os.path.exists('data/raw/sales_inventory_data.csv'):
+            self.skipTest("Raw data not found, skipping test")
+
+    def test_incremental_matches_full_run(self):
+        """Test that appending days in several runs gives the same weekly data as one full run"""
+        raw = pd.read_csv('data/raw/sales_inventory_data.csv')
+        cutoffs = ['2023-10-15', '2023-11-02', '2023-11-03']
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = {'sales': os.path.join(tmp, 'sales.csv'),
+                     'products': 'data/raw/product_data.csv',
+                     'stores': 'data/raw/store_data.csv'}
+            raw[raw['Date'] <= cutoffs[0]].to_csv(paths['sales'], index=False)
+            result = preprocess_incremental(paths, os.path.join(tmp, 'incremental'), verbose=False)
+            self.assertEqual(result['mode'], 'bootstrap')
+
+            bounds = cutoffs[1:] + [raw['Date'].max()]
+            for start, end in zip(cutoffs, bounds):
+                new_days = raw[(raw['Date'] > start) & (raw['Date'] <= end)]
+                new_days.to_csv(paths['sales'], mode='a', header=False, index=False)
+                result = preprocess_incremental(paths, os.path.join(tmp, 'incremental'), verbose=False)
+                self.assertEqual(result['mode'], 'incremental')
+                self.assertEqual(result['new_rows'], len(new_days))
+
+            result = preprocess_incremental(paths, os.path.join(tmp, 'incremental'), verbose=False)
+            self.assertEqual(result['mode'], 'noop')
+
+            preprocess(paths, os.path.join(tmp, 'full'), verbose=False)
+            incremental_store = WeeklyStore(os.path.join(tmp, 'incremental', 'weekly_store'))
+            full_store = WeeklyStore(os.path.join(tmp, 'full', 'weekly_store'))
+            pd.testing.assert_frame_equal(incremental_store.read(), full_store.read())
+            self.assertEqual(incremental_store.split_date, full_store.split_date)
+
+    def test_backfilled_rows(self):
+        """Test that late rows for past dates are merged, or trigger a rebuild when too old for the tail"""
+        raw = pd.read_csv('data/raw/sales_inventory_data.csv')
+        cutoff = '2023-11-02'
+        recent = raw[(raw['Date'] >= '2023-10-16') & (raw['Date'] <= '2023-10-22')
+                     & (raw['Product_ID'] == 'P001') & (raw['Store_ID'] == 'S01')]
+        old = raw[(raw['Date'] >= '2022-03-07') & (raw['Date'] <= '2022-03-13')
+                  & (raw['Product_ID'] == 'P002') & (raw['Store_ID'] == 'S03')]
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = {'sales': os.path.join(tmp, 'sales.csv'),
+                     'products': 'data/raw/product_data.csv',
+                     'stores': 'data/raw/store_data.csv'}
+            initial = raw[raw['Date'] <= cutoff].drop(recent.index).drop(old.index)
+            initial.to_csv(paths['sales'], index=False)
+            preprocess_incremental(paths, os.path.join(tmp, 'incremental'), verbose=False)
+
+            for rows, mode in [(recent, 'incremental'), (old, 'bootstrap'),
+                               (raw[raw['Date'] > cutoff], 'incremental')]:
+                rows.to_csv(paths['sales'], mode='a', header=False, index=False)
+                result = preprocess_incremental(paths, os.path.join(tmp, 'incremental'), verbose=False)
+                self.assertEqual(result['mode'], mode)
+
+            preprocess(paths, os.path.join(tmp, 'full'), verbose=False)
+            incremental_store = WeeklyStore(os.path.join(tmp, 'incremental', 'weekly_store'))
+            full_store = WeeklyStore(os.path.join(tmp, 'full', 'weekly_store'))
+            pd.testing.assert_frame_equal(incremental_store.read(), full_store.read())
+
+class TestDataLoader(unittest.TestCase):
+    """Test cases for the schema-driven data loaders"""
+
+    def test_weekly_schema(self):
+        """Test that weekly data loads with categorical IDs, compact numerics and parsed dates"""
+        if not os.path.exists('data/processed/weekly_data.csv'):
+            self.skipTest("weekly_data.csv not found, skipping test")
+        weekly_data = load_weekly_data('data/processed/weekly_data.csv')
+        plain = pd.read_csv('data/processed/weekly_data.csv')
+
+        for col in ['Product_ID', 'Store_ID', 'Category', 'Region']:
+            self.assertIsInstance(weekly_data[col].dtype, pd.CategoricalDtype)
+        self.assertEqual(weekly_data['Sales_Quantity'].dtype, np.int32)
+        self.assertEqual(weekly_data['Sales_Lag_1'].dtype, np.float32)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(weekly_data['Week_Start']))
+        self.assertLess(weekly_data.memory_usage(deep=True).sum(), plain.memory_usage(deep=True).sum() / 2)
+        np.testing.assert_allclose(weekly_data['Sales_Rolling_8'], plain['Sales_Rolling_8'], rtol=1e-6)
+
+    def test_sales_schema_with_usecols(self):
+        """Test that the sales schema applies only to the requested columns"""
+        if not os.path.exists('data/raw/sales_inventory_data.csv'):
+            self.skipTest("Raw data not found, skipping test")
+        sales_data = load_sales_data(usecols=['Date', 'Product_ID', 'Sales_Quantity'], nrows=100)
+        self.assertEqual(list(sales_data.columns), ['Date', 'Product_ID', 'Sales_Quantity'])
+        self.assertIsInstance(sales_data['Product_ID'].dtype, pd.CategoricalDtype)
+        self.assertTrue(pd.api.types.is_datetime64_any_dtype(sales_data['Date']))
+
+class TestWeeklyStore(unittest.TestCase):
+    """Test cases for the columnar processed store"""
+
+    def setUp(self):
+        if not os.path.exists('data/processed/weekly_data.csv'):
+            self.skipTest("weekly_data.csv not found, skipping test")
+        self.weekly = pd.read_csv('data/processed/weekly_data.csv', parse_dates=['Week_Start'])
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = WeeklyStore(os.path.join(self.tmp.name, 'weekly_store'))
+        self.store.write(self.weekly, test_weeks=8)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_split_matches_legacy_csvs(self):
+        """Test that the recorded cutoff reproduces train_data.csv and test_data.csv"""
+        for split, path in [('train', 'data/processed/train_data.csv'), ('test', 'data/processed/test_data.csv')]:
+            expected = pd.read_csv(path, parse_dates=['Week_Start'])
+            actual = self.store.read(split=split)
+            self.assertEqual(len(actual), len(expected))
+            self.assertEqual(actual['Sales_Quantity'].sum(), expected['Sales_Quantity'].sum())
+        partitions = [name for name in os.listdir(self.store.root) if name.startswith('week=')]
+        self.assertEqual(len(partitions), self.weekly['Week_Start'].nunique())
+
+    def test_projection_and_predicates(self):
+        """Test column projection plus week and series filters"""
+        frame = self.store.read(columns=['Week_Start', 'Sales_Quantity'], start='2023-06-05',
+                                end='2023-07-03', products=['P002'], stores=['S03'])
+        self.assertEqual(list(frame.columns), ['Week_Start', 'Sales_Quantity'])
+        self.assertEqual(len(frame), 5)
+        self.assertTrue(frame['Week_Start'].is_monotonic_increasing)
+
+    def test_upsert_replaces_rows(self):
+        """Test that upserted rows replace existing keys and new weeks move the cutoff"""
+        last_week = self.weekly['Week_Start'].max()
+        updated = self.weekly[self.weekly['Week_Start'] == last_week].copy()
+        updated['Sales_Quantity'] = 0
+        added = updated.copy()
+        added['Week_Start'] = last_week + pd.Timedelta(weeks=1)
+        added['WeekOfYear'] = added['WeekOfYear'] + 1
+        self.store.upsert(pd.concat([updated, added]))
+
+        frame = self.store.read(start=last_week)
+        self.assertEqual(len(frame), 2 * len(updated))
+        self.assertEqual(frame['Sales_Quantity'].sum(), 0)
+        self.assertEqual(self.store.split_date, last_week + pd.Timedelta(weeks=1) - pd.Timedelta(weeks=8))
+
+class TestFeatureCache(unittest.TestCase):
+    """Test cases for the memory-mapped feature matrix cache"""
+
+    def setUp(self):
+        if not (os.path.exists('data/processed/train_data.csv') and os.path.exists('data/processed/test_data.csv')):
+            self.skipTest("train/test data not found, skipping test")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.tmp.name, 'feature_cache')
+        self.store_dir = os.path.join(self.tmp.name, 'missing_store')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_series_slices_match_filtered_frames(self):
+        """Test that cached slices equal the per-series rows of the train/test CSVs"""
+        cache = load_feature_cache(self.cache_dir, self.store_dir)
+        for split, path in [('train', 'data/processed/train_data.csv'), ('test', 'data/processed/test_data.csv')]:
+            data = add_calendar_features(pd.read_csv(path, parse_dates=['Week_Start']))
+            expected = data[(data['Product_ID'] == 'P003') & (data['Store_ID'] == 'S02')].sort_values('Week_Start')
+            X, y, weeks = cache.get('P003', 'S02', split)
+            self.assertIsInstance(X, np.memmap)
+            np.testing.assert_array_equal(X, expected[MODEL_FEATURES].to_numpy(dtype=np.float32))
+            np.testing.assert_array_equal(y, expected['Sales_Quantity'].to_numpy())
+            np.testing.assert_array_equal(weeks, expected['Week_Start'].to_numpy())
+
+    def test_reused_until_source_changes(self):
+        """Test that the cache is reused and rebuilt only when rebuild is requested or the data changes"""
+        load_feature_cache(self.cache_dir, self.store_dir)
+        x_path = os.path.join(self.cache_dir, 'X.npy')
+        built = os.stat(x_path).st_mtime_ns
+        load_feature_cache(self.cache_dir, self.store_dir)
+        self.assertEqual(os.stat(x_path).st_mtime_ns, built)
+        cache = load_feature_cache(self.cache_dir, self.store_dir, rebuild=True)
+        self.assertEqual(len(cache.keys()), 50)
+        with self.assertRaises(ValueError):
+            cache.rows('P001', 'S01', split='validation')
+
+class TestSeriesIndex(unittest.TestCase):
+    """Test cases for the per-series index"""
+
+    def setUp(self):
+        if not os.path.exists('data/processed/weekly_data.csv'):
+            self.skipTest("weekly_data.csv not found, skipping test")
+        self.weekly = load_weekly_data()
+
+    def test_get_matches_filter_and_sort(self):
+        """Test that lookups equal the mask-and-sort scan and return views"""
+        index = SeriesIndex(self.weekly.sample(frac=1, random_state=0))
+        series = index.get('P003', 'S02')
+        expected = self.weekly[(self.weekly['Product_ID'] == 'P003') &
+                               (self.weekly['Store_ID'] == 'S02')].sort_values('Week_Start')
+        pd.testing.assert_frame_equal(series.reset_index(drop=True), expected.reset_index(drop=True))
+        self.assertTrue(np.shares_memory(series['Sales_Quantity'].to_numpy(),
+                                         index.data['Sales_Quantity'].to_numpy()))
+
+    def test_offsets_and_batches(self):
+        """Test the offsets table and batch lookups"""
+        index = SeriesIndex(self.weekly, presorted=True)
+        offsets = index.offsets()
+        self.assertEqual(len(index), 50)
+        self.assertEqual(offsets['end'].iloc[-1], len(self.weekly))
+        self.assertTrue((offsets['start'].iloc[1:].to_numpy() == offsets['end'].iloc[:-1].to_numpy()).all())
+        batch = index.get_many([('P001', 'S01'), ('P010', 'S05'), ('P999', 'S01')])
+        self.assertEqual(list(batch), [('P001', 'S01'), ('P010', 'S05')])
+        self.assertTrue((batch[('P010', 'S05')]['Store_ID'] == 'S05').all())
+
+class TestBatchForecast(unittest.TestCase):
+    """Test cases for batch forecasting over many product-store series"""
+
+    def setUp(self):
+        if not (os.path.exists('data/processed/train_data.csv') and os.path.exists('data/processed/test_data.csv')):
+            self.skipTest("train/test data not found, skipping test")
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_filtered_batch_writes_consolidated_table(self):
+        """Test that a filtered batch forecasts each selected series and registers the models"""
+        output_path = os.path.join(self.tmp.name, 'forecast_results.csv')
+        forecasts, metrics, stats = forecast_all(products=['P001'], stores=['S01', 'S02'], n_weeks=3,
+                                                 registry_dir=self.tmp.name,
+                                                 output_path=output_path, metrics_path=None, verbose=False)
+        self.assertEqual(stats['series'], 2)
+        self.assertGreater(stats['series_per_second'], 0)
+        self.assertEqual(len(forecasts), 6)
+        self.assertEqual(list(metrics['Store_ID']), ['S01', 'S02'])
+        self.assertEqual(sorted(ModelRegistry(self.tmp.name).keys()), [('P001', 'S01'), ('P001', 'S02')])
+
+        saved = pd.read_csv(output_path, parse_dates=['Week_Start'])
+        self.assertEqual(list(saved.columns), ['Product_ID', 'Store_ID', 'Week_Start',
+                                               'Forecasted_Sales', 'P10', 'P50', 'P90', 'Optimal_Inventory',
+                                               'Optimal_Inventory_P90'])
+        self.assertTrue(((saved['P10'] <= saved['P50']) & (saved['P50'] <= saved['P90'])).all())
+        single = forecast_series(load_feature_cache(), 'P001', 'S01', n_weeks=3)['forecast']
+        first = saved[saved['Store_ID'] == 'S01'].reset_index(drop=True)
+        np.testing.assert_allclose(first['Forecasted_Sales'], single['Forecasted_Sales'])
+        np.testing.assert_allclose(first['P90'], single['P90'])
+        # Optimal_Inventory keeps the fixed safety factor everywhere; the quantile level has its own column
+        np.testing.assert_array_equal(first['Optimal_Inventory'], calculate_optimal_inventory(first['Forecasted_Sales']))
+        np.testing.assert_array_equal(first['Optimal_Inventory_P90'],
+                                      calculate_optimal_inventory(first['Forecasted_Sales'], upper_demand=first['P90']))
+
+    def test_process_pool_matches_sequential(self):
+        """Test that parallel training returns the sequential forecasts in series order"""
+        kwargs = dict(products=['P002'], stores=['S01', 'S02', 'S03'], registry_dir=self.tmp.name,
+                      output_path=None, metrics_path=None, verbose=False)
+        sequential, _, _ = forecast_all(n_workers=1, **kwargs)
+        parallel, _, stats = forecast_all(n_workers=2, **kwargs)
+        self.assertEqual(stats['series'], 3)
+        pd.testing.assert_frame_equal(parallel, sequential)
+
+    def test_worker_planning(self):
+        """Test that pool workers and sklearn threads share the cores"""
+        self.assertEqual(plan_workers(4, n_cpus=8), (4, 2))
+        self.assertEqual(plan_workers(-1, n_series=3, n_cpus=8), (3, 2))
+        self.assertEqual(plan_workers(16, n_cpus=8), (16, 1))
+        chunks = chunk_series([('P001', f'S{i:02d}') for i in range(10)], workers=2, chunks_per_worker=2)
+        self.assertEqual([start for start, _ in chunks], [0, 3, 6, 9])
+        self.assertEqual(sum(len(keys) for _, keys in chunks), 10)
+
+    def test_unknown_filter_raises(self):
+        """Test that filters matching no series raise an error"""
+        with self.assertRaises(ValueError):
+            forecast_all(products=['P999'], verbose=False)
+
+class TestGlobalModel(unittest.TestCase):
+    """Test cases for the global model shared by all series"""
+
+    def setUp(self):
+        if not (os.path.exists('data/processed/train_data.csv') and os.path.exists('data/processed/test_data.csv')):
+            self.skipTest("train/test data not found, skipping test")
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_batched_forecast_for_selected_series(self):
+        """Test that one model forecasts every selected series for every week"""
+        forecasts, metrics, stats = forecast_global(products=['P001', 'P002'], stores=['S01', 'S02'], n_weeks=3,
+                                                    model_dir=self.tmp.name, output_path=None,
+                                                    metrics_path=None, verbose=False, max_iter=20)
+        self.assertEqual(stats['series'], 4)
+        self.assertEqual(len(forecasts), 12)
+        self.assertEqual(len(metrics), 4)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp.name, 'global_model.pkl')))
+        self.assertTrue((forecasts['Optimal_Inventory'] >= forecasts['Forecasted_Sales']).all())
+        first = forecasts[(forecasts['Product_ID'] == 'P001') & (forecasts['Store_ID'] == 'S01')]
+        self.assertEqual(list(first['Week_Start']), list(pd.date_range('2024-01-01', periods=3, freq='7D')))
+
+    def test_metrics_by_series_match_evaluate(self):
+        """Test that vectorized per-series metrics equal evaluate() on each series"""
+        test_data = load_weekly_data('data/processed/test_data.csv')
+        y_pred = test_data['Sales_Lag_1'].to_numpy(dtype=np.float64)
+        metrics = evaluate_by_series(test_data, y_pred).set_index(['Product_ID', 'Store_ID'])
+        mask = ((test_data['Product_ID'] == 'P004') & (test_data['Store_ID'] == 'S03')).to_numpy()
+        expected = evaluate(test_data.loc[mask, 'Sales_Quantity'].to_numpy(dtype=np.float64), y_pred[mask])
+        for name, value in expected.items():
+            self.assertAlmostEqual(metrics.loc[('P004', 'S03'), name], value)
+
+class TestRecursiveForecast(unittest.TestCase):
+    """Test cases for the batched recursive forecaster"""
+
+    def test_features_roll_forward(self):
+        """Test lag, rolling and calendar updates against hand-computed values"""
+        seen = []
+
+        def predict_fn(X):
+            seen.append(X.copy())
+            return X[:, 0] + 1  # next week = last week + 1
+
+        forecaster = RecursiveForecaster(predict_fn)
+        history = np.array([[1, 2, 3, 4, 5, 6, 7, 8], [np.nan, np.nan, np.nan, np.nan, 0, 0, 0, 10]], dtype=float)
+        weeks = np.array(['2023-12-25', '2023-12-25'], dtype='datetime64[ns]')
+        predictions, future_weeks = forecaster.forecast(history, weeks, n_weeks=2)
+
+        np.testing.assert_array_equal(predictions, [[9, 10], [11, 12]])
+        self.assertEqual(pd.Timestamp(future_weeks[0, 1]), pd.Timestamp('2024-01-08'))
+        # Lags 1-4, rolling 2/4/8, Month, WeekOfYear, IsWeekend for the second step of the first series
+        np.testing.assert_allclose(seen[1][0], [9, 8, 7, 6, 8.5, 7.5, 5.5, 1, 2, 0])
+        # Short histories average only the weeks that exist
+        self.assertAlmostEqual(seen[0][1][6], 2.5)
+        self.assertEqual(seen[0][0][7], 1)
+
+    def test_history_from_weekly_rows(self):
+        """Test that histories use the target and, for short series, the first row's lags"""
+        weekly = load_weekly_data()
+        keys, history, last_weeks = history_matrix(weekly, 8)
+        self.assertEqual(len(keys), 50)
+        series = weekly[(weekly['Product_ID'] == 'P001') & (weekly['Store_ID'] == 'S01')]
+        np.testing.assert_array_equal(history[0], series['Sales_Quantity'].tail(8))
+
+        short = series.head(3)
+        _, short_history, _ = history_matrix(short, 8)
+        lags = short[['Sales_Lag_1', 'Sales_Lag_2', 'Sales_Lag_3', 'Sales_Lag_4']].to_numpy()[0]
+        expected = sales_history(short['Sales_Quantity'], lags, 8)
+        np.testing.assert_array_equal(short_history[0], expected)
+        self.assertTrue(np.isnan(expected[0]))
+        np.testing.assert_array_equal(expected[1:], list(lags[::-1]) + list(short['Sales_Quantity']))
+
+class TestDirectForecast(unittest.TestCase):
+    """Test cases for direct multi-horizon forecasting"""
+
+    def test_shifted_targets(self):
+        """Test that targets look ahead within a series over consecutive weeks only"""
+        data = pd.DataFrame({
+            'Product_ID': ['P001'] * 4 + ['P002'] * 2,
+            'Store_ID': ['S01'] * 6,
+            'Week_Start': pd.to_datetime(['2023-01-02', '2023-01-09', '2023-01-23', '2023-01-30',
+                                          '2023-01-02', '2023-01-09']),
+            'Sales_Quantity': [1, 2, 3, 4, 5, 6],
+        })
+        targets = shifted_targets(data, 3)
+        np.testing.assert_array_equal(targets[:, 0], [1, 2, 3, 4, 5, 6])
+        np.testing.assert_array_equal(targets[:, 1], [2, np.nan, 4, np.nan, 6, np.nan])
+        self.assertTrue(np.isnan(targets[:, 2]).all())
+
+    def test_forecast_all_horizons_in_one_call(self):
+        """Test that every horizon of every series comes from a single predict call"""
+        if not os.path.exists('data/processed/weekly_data.csv'):
+            self.skipTest("weekly_data.csv not found, skipping test")
+        weekly = load_weekly_data()
+        weekly = weekly[weekly['Product_ID'].isin(['P001', 'P002'])]
+        model = DirectForecaster(horizon=3, n_estimators=10).fit(weekly)
+
+        calls = []
+        predict = model.model.predict
+        model.model.predict = lambda X: calls.append(len(X)) or predict(X)
+        forecasts = model.forecast(weekly, n_weeks=2)
+        self.assertEqual(calls, [10])
+        self.assertEqual(len(forecasts), 20)
+        self.assertEqual(forecasts['Week_Start'].min(), weekly['Week_Start'].max() + pd.Timedelta(weeks=1))
+        self.assertEqual(model.predict(weekly.head(5)).shape, (5,))
+        with self.assertRaises(ValueError):
+            model.forecast(weekly, n_weeks=4)
+
+class TestModelRegistry(unittest.TestCase):
+    """Test cases for the model registry"""
+
+    def setUp(self):
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+        rng = np.random.default_rng(0)
+        self.X = rng.normal(10, 3, size=(40, 3))
+        y = self.X @ [1.0, 2.0, -1.0]
+        self.scaler = StandardScaler().fit(self.X)
+        self.model = RandomForestRegressor(n_estimators=5, random_state=0).fit(self.scaler.transform(self.X), y)
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip_with_manifest(self):
+        """Test that the model and its scaler are saved, described and loaded back"""
+        registry = ModelRegistry(self.tmp.name)
+        registry.save('P001', 'S01', self.model, self.scaler, ['a', 'b', 'c'],
+                      {'start': '2022-01-31', 'end': '2023-10-30', 'rows': 40}, {'MAE': 1.5})
+        entry = ModelRegistry(self.tmp.name).entry('P001', 'S01')
+        self.assertEqual(entry['features'], ['a', 'b', 'c'])
+        self.assertEqual(entry['training_window']['rows'], 40)
+        np.testing.assert_allclose(entry['scaler']['mean'], self.scaler.mean_)
+        self.assertEqual(entry['version'], 1)
+
+        predict = ModelRegistry(self.tmp.name).predictor('P001', 'S01')
+        np.testing.assert_allclose(predict(self.X), self.model.predict(self.scaler.transform(self.X)))
+        self.assertEqual(registry.save('P001', 'S01', self.model, self.scaler, ['a', 'b', 'c'])['version'], 2)
+
+    def test_lru_cache_and_mmap(self):
+        """Test that only recently used models stay loaded and uncompressed models load back"""
+        registry = ModelRegistry(self.tmp.name, cache_size=2, compress=0)
+        for store_id in ['S01', 'S02', 'S03']:
+            registry.save('P001', store_id, self.model, self.scaler, ['a', 'b', 'c'], flush=False)
+        registry.flush()
+
+        registry = ModelRegistry(self.tmp.name, cache_size=2)
+        self.assertEqual(len(registry), 3)
+        registry.load('P001', 'S01')
+        registry.load('P001', 'S02')
+        self.assertIs(registry.load('P001', 'S01'), registry.load('P001', 'S01'))
+        registry.load('P001', 'S03')
+        self.assertEqual(registry.cached_keys, [('P001', 'S01'), ('P001', 'S03')])
+        model, scaler = registry.load('P001', 'S03')
+        self.assertEqual(registry.entry('P001', 'S03')['compress'], 0)
+        np.testing.assert_allclose(model.predict(scaler.transform(self.X)),
+                                   self.model.predict(self.scaler.transform(self.X)))
+
+class TestForecastServer(unittest.TestCase):
+    """Test cases for the forecast serving API (in-process, no network)"""
+
+    @classmethod
+    def setUpClass(cls):
+        if not (os.path.exists('data/processed/train_data.csv') and os.path.exists('data/processed/test_data.csv')):
+            raise unittest.SkipTest("train/test data not found, skipping test")
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.forecasts, _, _ = forecast_all(products=['P001'], stores=['S01', 'S02'], n_weeks=4,
+                                           registry_dir=cls.tmp.name, output_path=None, metrics_path=None,
+                                           verbose=False)
+        cls.service = ForecastService(cls.tmp.name, batch_window=0.01)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_forecast_matches_batch_forecast(self):
+        """Test that served forecasts match the batch forecasts of the registered models"""
+        status, payload = self.service.handle('GET', '/forecast', {'product': 'P001', 'store': 'S02', 'horizon': '4'})
+        self.assertEqual(status, 200)
+        expected = self.forecasts[self.forecasts['Store_ID'] == 'S02']
+        np.testing.assert_allclose([week['Forecasted_Sales'] for week in payload['forecast']],
+                                   expected['Forecasted_Sales'])
+        self.assertEqual(payload['forecast'][0]['Week_Start'], f"{expected['Week_Start'].iloc[0]:%Y-%m-%d}")
+
+    def test_batch_inventory_and_stats(self):
+        """Test the batch endpoint, inventory levels, latency stats and error responses"""
+        status, payload = self.service.handle('POST', '/forecast/batch', body={
+            'series': [{'product': 'P001', 'store': 'S01'}, {'product': 'P001', 'store': 'S02'}], 'horizon': 2})
+        self.assertEqual(status, 200)
+        self.assertEqual([len(item['forecast']) for item in payload['forecasts']], [2, 2])
+
+        status, payload = self.service.handle('GET', '/inventory', {'product': 'P001', 'store': 'S01'})
+        self.assertEqual(status, 200)
+        self.assertTrue(all(week['Optimal_Inventory'] >= week['Forecasted_Sales'] for week in payload['forecast']))
+        self.assertTrue(all(week['Reorder_Point'] >= week['Safety_Stock'] > 0 for week in payload['forecast']))
+        self.assertEqual(self.service.handle('GET', '/inventory', {'product': 'P001', 'store': 'S01',
+                                                                   'service_level': '1.5'})[0], 400)
+
+        self.assertEqual(self.service.handle('GET', '/forecast', {'product': 'P999', 'store': 'S01'})[0], 404)
+        self.assertEqual(self.service.handle('GET', '/forecast', {'product': 'P001', 'store': 'S01',
+                                                                  'horizon': 'x'})[0], 400)
+        stats = self.service.handle('GET', '/stats')[1]
+        self.assertGreaterEqual(stats['/inventory']['count'], 1)
+        self.assertGreaterEqual(stats['/forecast']['p99_ms'], stats['/forecast']['p50_ms'])
+
+    def test_concurrent_requests_share_a_batch(self):
+        """Test that concurrent single-series requests are micro-batched into one forecast call"""
+        from concurrent.futures import ThreadPoolExecutor
+        calls = []
+        forecast_batch = self.service.batcher.forecast_batch
+        self.service.batcher.forecast_batch = lambda keys, horizon: (calls.append(keys), forecast_batch(keys, horizon))[1]
+        try:
+            with ThreadPoolExecutor(4) as pool:
+                results = list(pool.map(lambda store: self.service.forecast('P001', store, 3), ['S01', 'S02'] * 4))
+        finally:
+            self.service.batcher.forecast_batch = forecast_batch
+        self.assertLess(len(calls), 8)
+        self.assertEqual(results[0], results[2])
+
+    def test_unexpected_failure_returns_500(self):
+        """Test that a prediction failure becomes a JSON 500 response and is still timed"""
+        def failing_batch(keys, horizon):
+            raise RuntimeError("model file missing")
+        before = self.service.stats().get('/forecast', {}).get('count', 0)
+        forecast_batch = self.service.batcher.forecast_batch
+        self.service.batcher.forecast_batch = failing_batch
+        try:
+            status, payload = self.service.handle('GET', '/forecast', {'product': 'P001', 'store': 'S01'})
+        finally:
+            self.service.batcher.forecast_batch = forecast_batch
+        self.assertEqual(status, 500)
+        self.assertIn('model file missing', payload['error'])
+        self.assertEqual(self.service.stats()['/forecast']['count'], before + 1)
+
+class TestForecastStore(unittest.TestCase):
+    """Test cases for the materialized forecast store"""
+
+    def setUp(self):
+        if not (os.path.exists('data/processed/train_data.csv') and os.path.exists('data/processed/test_data.csv')):
+            self.skipTest("train/test data not found, skipping test")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.registry_dir = os.path.join(self.tmp.name, 'registry')
+        self.store_dir = os.path.join(self.tmp.name, 'forecast_store')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_refresh_only_invalidated_series(self):
+        """Test that unchanged series are cache hits and a new model version refreshes only its series"""
+        forecasts, _, _ = forecast_all(products=['P001'], stores=['S01', 'S02'], n_weeks=3,
+                                       registry_dir=self.registry_dir, output_path=None, metrics_path=None,
+                                       verbose=False)
+        kwargs = dict(products=['P001'], stores=['S01', 'S02'], n_weeks=3, registry_dir=self.registry_dir,
+                      root=self.store_dir, verbose=False)
+        self.assertEqual(refresh_forecasts(**kwargs), {'series': 2, 'hits': 0, 'refreshed': 2})
+        self.assertEqual(refresh_forecasts(**kwargs), {'series': 2, 'hits': 2, 'refreshed': 0})
+
+        stored = ForecastStore(self.store_dir).read()
+        self.assertEqual(list(stored['Horizon']), [1, 2, 3] * 2)
+        np.testing.assert_allclose(stored['Forecasted_Sales'], forecasts['Forecasted_Sales'])
+
+        registry = ModelRegistry(self.registry_dir)
+        model, scaler = registry.load('P001', 'S02')
+        registry.save('P001', 'S02', model, scaler, registry.entry('P001', 'S02')['features'])
+        self.assertEqual(refresh_forecasts(**kwargs)['refreshed'], 1)
+        self.assertEqual(set(ForecastStore(self.store_dir).read(stores=['S02'])['Model_Version']), {2})
+        self.assertEqual(refresh_forecasts(**dict(kwargs, n_weeks=4))['refreshed'], 2)
+
+    def test_watermark_tracks_series_data(self):
+        """Test that the watermark changes with new weeks and revised sales of that series only"""
+        data = pd.DataFrame({
+            'Product_ID': ['P001'] * 3 + ['P002'] * 2,
+            'Store_ID': 'S01',
+            'Week_Start': pd.to_datetime(['2024-01-01', '2024-01-08', '2024-01-15', '2024-01-01', '2024-01-08']),
+            'Sales_Quantity': [10, 12, 11, 5, 6],
+        })
+        before = series_watermarks(data)
+        revised = data.assign(Sales_Quantity=[10, 13, 11, 5, 6])
+        after = series_watermarks(revised)
+        self.assertNotEqual(before['Watermark'][0], after['Watermark'][0])
+        self.assertEqual(before['Watermark'][1], after['Watermark'][1])
+        self.assertEqual(list(before['As_Of_Week'].dt.strftime('%Y-%m-%d')), ['2024-01-15', '2024-01-08'])
+        self.assertNotEqual(series_watermarks(data.iloc[:2])['Watermark'][0], before['Watermark'][0])
+
+class TestInventoryOptimization(unittest.TestCase):
+    """Test cases for the vectorized inventory optimization"""
+
+    def test_plan_matches_formulas(self):
+        """Test safety stock, reorder points and order-up-to levels against the closed-form policy"""
+        demand = np.array([[70.0, 70.0], [14.0, 28.0]])
+        plan = inventory_plan(demand, sigma=[10.0, 0.0], lead_time_days=[7, 21], service_level=0.95)
+        z = 1.6448536269514722
+        self.assertAlmostEqual(z_score(0.95), z)
+        np.testing.assert_array_equal(plan['Safety_Stock'], np.ceil([[z * 10 * 2 ** 0.5] * 2, [0, 0]]))
+        np.testing.assert_array_equal(plan['Reorder_Point'], np.ceil([[70 + z * 10 * 2 ** 0.5] * 2, [42, 84]]))
+        np.testing.assert_array_equal(plan['Order_Up_To'][1], [56, 112])
+        # Starting empty: the first order fills up to the level, later orders replace the demand
+        np.testing.assert_array_equal(plan['Order_Quantity'][1], [56, 112 - 42])
+
+    def test_catalog_plan_uses_store_lead_times_and_on_hand(self):
+        """Test that a forecast table gets per-store lead times, per-series sigma and on-hand stock"""
+        forecasts = pd.DataFrame({
+            'Product_ID': ['P001'] * 4, 'Store_ID': ['S02', 'S02', 'S01', 'S01'],
+            'Week_Start': pd.to_datetime(['2024-01-01', '2024-01-08'] * 2),
+            'Forecasted_Sales': [7.0, 7.0, 7.0, 7.0],
+        })
+        sigma = pd.DataFrame({'Product_ID': ['P001', 'P001'], 'Store_ID': ['S01', 'S02'], 'Sigma': [0.0, 0.0]})
+        on_hand = pd.DataFrame({'Product_ID': ['P001'], 'Store_ID': ['S01'], 'On_Hand': [100.0]})
+        plan = optimize_inventory(forecasts, sigma, lead_times={'S02': 14}, on_hand=on_hand)
+        self.assertEqual(list(plan['Store_ID']), ['S01', 'S01', 'S02', 'S02'])
+        self.assertEqual(list(plan['Reorder_Point']), [3, 3, 14, 14])
+        self.assertEqual(list(plan['Order_Quantity']), [0, 0, 21, 7])
+        with self.assertRaises(ValueError):
+            optimize_inventory(forecasts, sigma.iloc[:1])
+
+    def test_fixed_factor_level_unchanged(self):
+        """Test that the fixed safety-factor inventory level keeps its rounding"""
+        demand = [10, 20.5, 0, 33.25]
+        expected = [round(d * (1 + 1.5 * 3 / 7)) for d in demand]
+        np.testing.assert_array_equal(calculate_optimal_inventory(demand), expected)
+
+    def test_quantiles_size_the_safety_stock(self):
+        """Test that P10/P90 forecast quantiles replace the fixed factor and the per-series sigma"""
+        np.testing.assert_array_equal(calculate_optimal_inventory([10.0, 20.0], lead_time_days=7, upper_demand=[15.0, 18.0]),
+                                      [20, 20])
+        self.assertAlmostEqual(float(quantile_sigma(10.0, 10.0 + 2 * 1.2815515655446004)), 1.0)
+
+        forecasts = pd.DataFrame({
+            'Product_ID': ['P001'] * 4, 'Store_ID': ['S01', 'S01', 'S02', 'S02'],
+            'Week_Start': pd.to_datetime(['2024-01-01', '2024-01-08'] * 2),
+            'Forecasted_Sales': [7.0] * 4,
+            'P10': [7.0, 7.0 - 1.2815515655446004, np.nan, np.nan],
+            'P90': [7.0, 7.0 + 1.2815515655446004, np.nan, np.nan],
+        })
+        sigma = pd.DataFrame({'Product_ID': ['P001', 'P001'], 'Store_ID': ['S01', 'S02'], 'Sigma': [50.0, 0.0]})
+        plan = optimize_inventory(forecasts, sigma, lead_times={'S01': 7, 'S02': 7}, service_level=0.95)
+        # Quantile weeks ignore the series' sigma; weeks without quantiles fall back to it
+        np.testing.assert_array_equal(plan['Safety_Stock'], [0, np.ceil(1.6448536269514722 * 2 ** 0.5), 0, 0])
+        with self.assertRaises(ValueError):
+            optimize_inventory(forecasts)
+
+class TestBacktesting(unittest.TestCase):
+    """Test cases for rolling-origin backtesting"""
+
+    def setUp(self):
+        if not (os.path.exists('data/processed/train_data.csv') and os.path.exists('data/processed/test_data.csv')):
+            self.skipTest("train/test data not found, skipping test")
+
+    def test_rolling_origins(self):
+        """Test that cutoffs step back from the last full horizon"""
+        weeks = pd.date_range('2023-01-02', periods=30, freq='7D')
+        cutoffs = rolling_origins(np.repeat(weeks.to_numpy(), 2), n_folds=3, horizon=4, step=2)
+        self.assertEqual(list(cutoffs), list(weeks[[21, 23, 25]]))
+        with self.assertRaises(ValueError):
+            rolling_origins(weeks, n_folds=10, horizon=4)
+
+    def test_naive_folds_forecast_last_training_week(self):
+        """Test that each fold only sees weeks up to its cutoff"""
+        cache = load_feature_cache()
+        _, y, weeks = cache.get('P001', 'S01')
+        cutoff = pd.Timestamp(weeks[-9])
+        horizons, actual, predicted = backtest_series(cache, 'P001', 'S01', cutoff, horizon=4, model='naive')
+        np.testing.assert_array_equal(horizons, [1, 2, 3, 4])
+        np.testing.assert_allclose(actual, y[-8:-4])
+        np.testing.assert_allclose(predicted, [y[-9]] * 4)
+
+    def test_parallel_folds_match_sequential(self):
+        """Test that the process pool returns the sequential per-fold metrics"""
+        kwargs = dict(products=['P001'], stores=['S01', 'S02'], n_folds=3, horizon=2, output_path=None,
+                      verbose=False, n_estimators=5)
+        sequential, stats = backtest(n_workers=1, **kwargs)
+        parallel, _ = backtest(n_workers=2, **kwargs)
+        self.assertEqual(stats['fits'], 6)
+        self.assertEqual(list(sequential.columns), ['Model', 'Fold', 'Cutoff', 'Product_ID', 'Store_ID',
+                                                    'Weeks', 'MAE', 'RMSE', 'MAPE'])
+        pd.testing.assert_frame_equal(parallel, sequential)
+
+class TestTuning(unittest.TestCase):
+    """Test cases for the successive-halving hyperparameter search"""
+
+    def test_halving_schedule(self):
+        """Test that each rung keeps 1/eta of the candidates on eta times more series"""
+        self.assertEqual(halving_schedule(20, 50), [(20, 2), (7, 6), (3, 17), (1, 50)])
+        self.assertEqual(halving_schedule(1, 50), [(1, 50)])
+        work = [sum(n * units for n, units in halving_schedule(n, 1000)) for n in (9, 27, 81)]
+        self.assertLess(work[2] / work[0], 9 / 2)
+
+    def test_candidates_start_with_current_setting(self):
+        """Test that sampled candidates are distinct and include the current Random Forest setting"""
+        candidates = sample_candidates(n_candidates=10)
+        self.assertEqual(candidates[0], {'max_depth': None, 'max_features': 1.0, 'min_samples_leaf': 1,
+                                         'n_estimators': 100})
+        self.assertEqual(len({tuple(c.values()) for c in candidates}), 10)
+
+    def test_tune_writes_leaderboard_and_best_params(self):
+        """Test that pruned candidates stop early and the winner is scored on every series"""
+        if not (os.path.exists('data/processed/train_data.csv') and os.path.exists('data/processed/test_data.csv')):
+            self.skipTest("train/test data not found, skipping test")
+        with tempfile.TemporaryDirectory() as tmp:
+            best_path = os.path.join(tmp, 'best_params.json')
+            leaderboard, stats = tune(products=['P001'], stores=['S01', 'S02', 'S03', 'S04'],
+                                      grid={'n_estimators': [5, 10], 'min_samples_leaf': [1, 5]},
+                                      n_candidates=4, n_folds=2, eta=2, min_series=1,
+                                      output_path=os.path.join(tmp, 'leaderboard.csv'),
+                                      best_params_path=best_path, verbose=False)
+            self.assertEqual(len(leaderboard), 4)
+            self.assertEqual(leaderboard['Series'].iloc[0], 4)
+            self.assertEqual(list(leaderboard['Rung']), sorted(leaderboard['Rung'], reverse=True))
+            self.assertLess(stats['fits'], stats['exhaustive_fits'])
+            with open(best_path) as f:
+                self.assertEqual(json.load(f), stats['best_params'])
+
+class TestBaselineModels(unittest.TestCase):
+    """Test cases for the vectorized baseline forecasters and volume routing"""
+
+    def test_exponential_smoothing_matches_recursion(self):
+        """Test that the closed-form level equals the smoothing recursion from the first observed week"""
+        rng = np.random.default_rng(0)
+        sales = rng.poisson(20, size=(3, 12)).astype(float)
+        sales[1, :5] = np.nan
+        forecast = exponential_smoothing(sales, 2, alpha=0.4)
+        for row in range(3):
+            observed = sales[row][~np.isnan(sales[row])]
+            level = observed[0]
+            for value in observed[1:]:
+                level = 0.4 * value + 0.6 * level
+            np.testing.assert_allclose(forecast[row], [level, level])
+
+    def test_seasonal_naive_and_selection(self):
+        """Test that seasonal series pick the seasonal naive forecast of the same week last season"""
+        weeks = np.arange(110)
+        seasonal = 50 + 30 * np.sin(2 * np.pi * weeks / 52)
+        flat = np.full(110, 10.0)
+        sales = np.vstack([seasonal, flat])
+        np.testing.assert_allclose(seasonal_naive(sales, 3)[0], seasonal[110 - 52:110 - 49])
+        predictions, chosen, _ = forecast_baselines(sales, 3)
+        self.assertEqual(chosen[0], 'seasonal_naive')
+        np.testing.assert_allclose(predictions[1], [10, 10, 10])
+        np.testing.assert_allclose(forecast_chosen(sales, 3, chosen), predictions)
+        np.testing.assert_allclose(forecast_chosen(sales, 3, ['moving_average'] * 2)[0], seasonal[-4:].mean())
+
+    def test_route_by_volume(self):
+        """Test that only series at or above the volume quantile get a Random Forest"""
+        sales = np.array([[1.0] * 13, [5.0] * 13, [50.0] * 13, [np.nan] * 10 + [100.0] * 3])
+        np.testing.assert_array_equal(route_by_volume(sales, quantile=0.5), [False, False, True, True])
+        np.testing.assert_array_equal(route_by_volume(sales, min_volume=5), [False, True, True, True])
+
+    def test_tiered_forecast(self):
+        """Test that tiered forecasting trains forests only for high-volume series"""
+        if not (os.path.exists('data/processed/train_data.csv') and os.path.exists('data/processed/test_data.csv')):
+            self.skipTest("train/test data not found, skipping test")
+        with tempfile.TemporaryDirectory() as tmp:
+            forecasts, metrics, stats = forecast_tiered(products=['P001'], n_weeks=3, registry_dir=tmp,
+                                                        output_path=None, metrics_path=None,
+                                                        volume_quantile=0.8, verbose=False)
+            self.assertEqual((stats['random_forest'], stats['baseline']), (1, 4))
+            self.assertEqual(len(ModelRegistry(tmp)), 1)
+        self.assertEqual(len(forecasts), 15)
+        self.assertEqual((metrics['Model'] == 'random_forest').sum(), 1)
+        self.assertTrue(forecasts['Forecasted_Sales'].notna().all())
+        self.assertTrue((forecasts['Optimal_Inventory'] >= forecasts['Forecasted_Sales']).all())
+
+class TestSalesTensor(unittest.TestCase):
+    """Test cases for the dense product x store x week tensor"""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        rows = []
+        # Series of different lengths and start weeks
+        for product_id, store_id, start, n_weeks in [('P001', 'S01', 0, 12), ('P001', 'S02', 4, 3),
+                                                     ('P002', 'S01', 2, 1), ('P003', 'S02', 1, 9)]:
+            for week in pd.date_range('2023-01-02', periods=n_weeks, freq='W-MON') + pd.Timedelta(weeks=start):
+                rows.append((product_id, store_id, week, int(rng.integers(0, 100)), float(rng.integers(0, 50))))
+        self.weekly = pd.DataFrame(rows, columns=['Product_ID', 'Store_ID', 'Week_Start', 'Sales_Quantity',
+                                                  'Inventory_Level']).sample(frac=1.0, random_state=1)
+        self.tensor = SalesTensor.from_frame(self.weekly, value_columns=('Sales_Quantity', 'Inventory_Level'))
+
+    def test_shape_and_round_trip(self):
+        """Test that the tensor covers every product, store and week and converts back to the long rows"""
+        self.assertEqual(self.tensor.shape, (3, 2, 12))
+        self.assertEqual(self.tensor.mask.sum(), len(self.weekly))
+        expected = self.weekly.sort_values(['Product_ID', 'Store_ID', 'Week_Start'], ignore_index=True)
+        long = self.tensor.to_long()
+        self.assertEqual(list(long['Product_ID'].astype(str)), list(expected['Product_ID']))
+        np.testing.assert_array_equal(long['Week_Start'], expected['Week_Start'])
+        np.testing.assert_array_equal(long['Sales_Quantity'], expected['Sales_Quantity'])
+
+    def test_features_match_add_lag_rolling_features(self):
+        """Test that tensor lags and rolling means equal the row-based features for gap-free series"""
+        expected = add_lag_rolling_features(self.weekly[['Product_ID', 'Store_ID', 'Week_Start', 'Sales_Quantity']],
+                                            lags=[1, 3], windows=[2, 8])
+        actual = self.tensor.to_long(self.tensor.lag_rolling_features(lags=[1, 3], windows=[2, 8]))
+        for column in ['Sales_Lag_1', 'Sales_Lag_3', 'Sales_Rolling_2', 'Sales_Rolling_8']:
+            np.testing.assert_allclose(actual[column], expected[column])
+
+    def test_missing_week_is_masked(self):
+        """Test that a missing week leaves a NaN lag instead of reaching back past the gap"""
+        weekly = self.weekly[self.weekly['Week_Start'] != pd.Timestamp('2023-01-16')]
+        tensor = SalesTensor.from_frame(weekly)
+        self.assertFalse(tensor.mask[0, 0, 2])
+        lag = tensor.lag(1)
+        self.assertTrue(np.isnan(lag[0, 0, 3]))
+        self.assertEqual(lag[0, 0, 2], tensor.values['Sales_Quantity'][0, 0, 1])
+        with self.assertRaises(ValueError):
+            SalesTensor.from_frame(pd.concat([weekly, weekly.head(1)]))
+
+    def test_totals_match_groupby(self):
+        """Test the weekly, product and store totals against pandas groupby sums"""
+        data = self.weekly
+        pd.testing.assert_series_equal(self.tensor.weekly_totals(),
+                                       data.groupby('Week_Start')['Sales_Quantity'].sum().astype(float),
+                                       check_freq=False)
+        pd.testing.assert_series_equal(self.tensor.product_totals(),
+                                       data.groupby('Product_ID')['Sales_Quantity'].sum().astype(float))
+        pd.testing.assert_series_equal(self.tensor.store_totals(),
+                                       data.groupby('Store_ID')['Sales_Quantity'].sum().astype(float))
+        self.assertAlmostEqual(self.tensor.mean('Inventory_Level'), data['Inventory_Level'].mean())
+        history = self.tensor.series('P001', 'S02')
+        self.assertEqual(len(history), 3)
+        self.assertEqual(history['Week_Start'].iloc[0], pd.Timestamp('2023-01-30'))
+
+
+class TestHierarchical(unittest.TestCase):
+    """Test cases for the summing matrix and forecast reconciliation"""
+
+    def setUp(self):
+        leaves = pd.DataFrame({'Product_ID': ['P1', 'P1', 'P2', 'P3', 'P3', 'P2'],
+                               'Store_ID': ['S1', 'S2', 'S1', 'S1', 'S2', 'S2']})
+        leaves['Category'] = leaves['Product_ID'].map({'P1': 'A', 'P2': 'A', 'P3': 'B'})
+        leaves['Region'] = leaves['Store_ID'].map({'S1': 'North', 'S2': 'South'})
+        self.leaves = leaves
+        self.nodes, self.S = hierarchy(leaves)
+        self.n_leaves = len(leaves)
+
+    def test_summing_matrix(self):
+        """Test that every node sums exactly the leaves that belong to it, with the leaves last in order"""
+        S = self.S.toarray()
+        self.assertEqual(S.shape, (1 + 2 + 2 + 4 + 3 + 2 + 6, 6))
+        np.testing.assert_array_equal(S[-6:], np.eye(6))
+        self.assertEqual(list(self.nodes['Key'].iloc[-6:]), list(self.leaves['Product_ID'] + '/' + self.leaves['Store_ID']))
+        keys = list(self.nodes['Key'])
+        np.testing.assert_array_equal(S[keys.index('Total')], np.ones(6))
+        np.testing.assert_array_equal(S[keys.index('A/South')], [0, 1, 0, 0, 0, 1])
+        np.testing.assert_array_equal(S[keys.index('P3')], [0, 0, 0, 1, 1, 0])
+
+    def test_reconcile_matches_dense_solution(self):
+        """Test bottom-up, OLS and diagonal MinT against the dense normal equations"""
+        rng = np.random.default_rng(0)
+        base = rng.gamma(2, 10, size=(self.S.shape[0], 3))
+        variances = rng.gamma(2, 1, size=self.S.shape[0])
+        S = self.S.toarray()
+        np.testing.assert_allclose(reconcile(base, self.S, 'bottom_up'), S @ base[-6:])
+        for method, weights in [('ols', np.ones(len(S))), ('mint_diag', 1 / variances)]:
+            W = np.diag(weights)
+            expected = S @ np.linalg.solve(S.T @ W @ S, S.T @ W @ base)
+            np.testing.assert_allclose(reconcile(base, self.S, method, variances), expected, rtol=1e-8)
+        # Coherent base forecasts are left alone
+        coherent = S @ base[-6:]
+        np.testing.assert_allclose(reconcile(coherent, self.S, 'mint_diag', variances), coherent, rtol=1e-8)
+        with self.assertRaises(ValueError):
+            reconcile(base, self.S, 'mint_diag')
+
+    def test_forecast_hierarchy(self):
+        """Test that node sales aggregate the leaves and the reconciled forecasts add up"""
+        rng = np.random.default_rng(1)
+        weeks = pd.date_range('2023-01-02', periods=30, freq='W-MON')
+        data = self.leaves.loc[self.leaves.index.repeat(len(weeks))].reset_index(drop=True)
+        data['Week_Start'] = np.tile(weeks, self.n_leaves)
+        data['Sales_Quantity'] = rng.poisson(20, size=len(data))
+        data = data.drop(index=[3, 40])
+
+        tensor = SalesTensor.from_frame(data)
+        leaf_sales = tensor.values['Sales_Quantity'].reshape(-1, len(weeks))
+        nodes, S = hierarchy(self.leaves.sort_values(['Product_ID', 'Store_ID']))
+        np.testing.assert_allclose(aggregate(S, leaf_sales)[0], data.groupby('Week_Start')['Sales_Quantity'].sum())
+
+        forecasts, nodes, S = forecast_hierarchy(data, n_weeks=2, method='mint_diag')
+        self.assertEqual(len(forecasts), len(nodes) * 2)
+        self.assertEqual(forecasts['Week_Start'].min(), weeks[-1] + pd.Timedelta(weeks=1))
+        reconciled = forecasts['Reconciled_Forecast'].to_numpy().reshape(len(nodes), 2)
+        np.testing.assert_allclose(reconciled, S @ reconciled[-S.shape[1]:], rtol=1e-8)
+
+
+class TestQuantileForecast(unittest.TestCase):
+    """Test cases for quantile forecasts from the trees of a Random Forest"""
+
+    def setUp(self):
+        from sklearn.ensemble import RandomForestRegressor
+        from sklearn.preprocessing import StandardScaler
+        rng = np.random.default_rng(0)
+        self.features = ['Sales_Lag_1', 'Sales_Lag_2', 'Sales_Rolling_2']
+        X = rng.gamma(4, 5, size=(200, 3))
+        y = X[:, 0] * 0.6 + X[:, 1] * 0.3 + rng.normal(0, 3, size=200)
+        self.scaler = StandardScaler().fit(X)
+        self.model = RandomForestRegressor(n_estimators=20, random_state=0).fit(self.scaler.transform(X), y)
+        self.history = rng.gamma(4, 5, size=(3, 4))
+        self.last_weeks = pd.to_datetime(['2024-01-01'] * 3).to_numpy()
+
+    def test_tree_paths_follow_each_tree(self):
+        """Test that every path is its tree's own recursive forecast and the first week averages to the forest"""
+        paths, weeks = tree_paths(self.model, self.scaler, self.features, self.history, self.last_weeks, 3)
+        self.assertEqual(paths.shape, (20, 3, 3))
+        self.assertEqual(weeks.shape, (3, 3))
+        point = RecursiveForecaster(lambda X: self.model.predict(self.scaler.transform(X)), self.features)
+        predictions, _ = point.forecast(self.history, self.last_weeks, 3)
+        np.testing.assert_allclose(paths[:, :, 0].mean(axis=0), predictions[:, 0])
+        tree = self.model.estimators_[7]
+        single = RecursiveForecaster(lambda X: tree.predict(self.scaler.transform(X)), self.features)
+        np.testing.assert_allclose(paths[7], single.forecast(self.history, self.last_weeks, 3)[0], rtol=1e-5)
+
+    def test_quantiles_are_ordered(self):
+        """Test that P10 <= P50 <= P90 for every series and week"""
+        quantiles, _ = forecast_quantiles(self.model, self.scaler, self.features, self.history, self.last_weeks, 4)
+        self.assertEqual(list(quantiles), ['P10', 'P50', 'P90'])
+        self.assertTrue((quantiles['P10'] <= quantiles['P50']).all())
+        self.assertTrue((quantiles['P50'] <= quantiles['P90']).all())
+        self.assertTrue((quantiles['P90'] > quantiles['P10']).any())
+
+
 if __name__ == '__main__':
     unittest.main()